@@ -0,0 +1,251 @@
+import argparse
+import functools
+import glob
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow `python benchmarks/e2e.py` as well as `python -m benchmarks.e2e`
+sys.path.append(ROOT)
+
+from benchmarks.stats import summarize
+
+# Offline end-to-end benchmark of /api/chat and /api/audio. The app runs
+# in-process (no network): the fake LLM answers, Audio2Face is not
+# configured so blendshapes come from the local estimator, and memory,
+# the TTS cache and the audio store live in a temporary directory.
+# Whisper, the emotion models and TTS are the real ones.
+#
+#   python benchmarks/e2e.py --concurrency 1,4,8 --requests 40
+#   python benchmarks/e2e.py --wavs ./clips --endpoints audio --out e2e.json
+#
+# Reports, per endpoint and concurrency level, request latency and
+# per-stage latency (p50/p95/p99, seconds) plus throughput as JSON, for
+# comparing releases. Stages are timed by wrapping the functions
+# server.py calls:
+#   memory         response cache lookup + long-term memory query
+#   llm            model call
+#   tts            speech synthesis
+#   decode         upload -> samples (ffmpeg)
+#   stt            Whisper
+#   emotion        audio emotion classifier
+#   blendshape     face animation
+#   audio_store    reply audio encoding + writing it to the audio store
+# Caches are bypassed unless --warm-caches, so every request pays for
+# the LLM and TTS.
+
+PROMPTS = [
+    {"text": "Hi AURA, how are you today?", "emotion": "happy"},
+    {"text": "I failed my exam and I feel terrible.", "emotion": "sad"},
+    {"text": "Can you recommend a book for the weekend?", "emotion": "neutral"},
+    {"text": "My cat knocked my coffee over again.", "emotion": "angry"},
+    {"text": "", "emotion": "happy", "gesture": "victory"},
+    {"text": "What should I cook for dinner tonight?", "emotion": "neutral"},
+    {"text": "I just got a new job offer!", "emotion": "surprised"},
+    {"text": "It's raining again and I'm bored.", "emotion": "sad"},
+]
+
+STAGES = ["memory", "llm", "tts", "decode", "stt", "emotion", "blendshape", "audio_store"]
+
+class StageTimes:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.times = {}
+
+    def reset(self):
+        with self.lock:
+            self.times = {}
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.times.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+        return timed
+
+    def wrap_async(self, stage, fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+        return timed
+
+    def summary(self):
+        with self.lock:
+            return {stage: summarize(self.times[stage]) for stage in STAGES if self.times.get(stage)}
+
+def configure_env(args, workdir):
+    # Must happen before server.py (and the singletons it imports) is loaded
+    os.environ["AURA_LLM_FAKE"] = "1"
+    os.environ["AURA_FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["AURA_TTS_PREWARM"] = "0"
+    os.environ.pop("AURA_A2F_URL", None)
+    os.environ.pop("AURA_MODEL_SERVER", None)
+    os.environ["AURA_MEMORY_PATH"] = os.path.join(workdir, "memory.db")
+    os.environ["AURA_TTS_CACHE_DIR"] = os.path.join(workdir, "tts_cache")
+    os.environ["AURA_AUDIO_STORE_DIR"] = os.path.join(workdir, "audio_store")
+    if not args.warm_caches:
+        os.environ["AURA_CACHE_SIZE"] = "0"
+
+def instrument(server, stages, warm_caches):
+    from src.core import brain
+    brain.lookup_cached = stages.wrap("memory", brain.lookup_cached)
+    brain.llm.generate = stages.wrap("llm", brain.llm.generate)
+    server.speech.speak = stages.wrap("tts", server.speech.speak)
+    server.decode_audio = stages.wrap("decode", server.decode_audio)
+    server.run_whisper = stages.wrap_async("stt", server.run_whisper)
+    server.run_audio_emotion = stages.wrap_async("emotion", server.run_audio_emotion)
+    server.ace_client.process_audio = stages.wrap("blendshape", server.ace_client.process_audio)
+    server.store_reply_audio = stages.wrap_async("audio_store", server.store_reply_audio)
+    if not warm_caches:
+        # The fake LLM has a handful of canned replies; without this every
+        # reply after the first few would be a TTS cache hit
+        server.tts_cache.get = lambda key: None
+
+def wait_ready(client, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get("/readyz").json()["models"]
+        if all(info["state"] in ("ready", "failed") for info in status.values()) or time.monotonic() > deadline:
+            return {name: info["state"] for name, info in status.items()}
+        time.sleep(0.5)
+
+def load_wavs(directory, models_state):
+    if directory:
+        clips = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+            with open(path, "rb") as f:
+                clips.append((os.path.basename(path), f.read()))
+        return clips, None
+    if models_state.get("tts") != "ready":
+        return [], "no --wavs given and TTS is unavailable to render clips"
+    from src.output.tts import synthesize
+    clips = []
+    for i, item in enumerate(p for p in PROMPTS if p["text"]):
+        wav = synthesize(item["text"])
+        if wav:
+            clips.append((f"prompt{i}.wav", wav))
+    return clips, None
+
+def run_level(client, endpoint, concurrency, requests, corpus, stages):
+    def one(i):
+        # Distinct sessions: turns of one session would cancel each other
+        session_id = f"bench-{endpoint}-{concurrency}-{i}"
+        started = time.perf_counter()
+        if endpoint == "chat":
+            payload = {**corpus[i % len(corpus)], "session_id": session_id}
+            response = client.post("/api/chat", json=payload)
+        else:
+            name, data = corpus[i % len(corpus)]
+            response = client.post("/api/audio", files={"file": (name, data, "audio/wav")},
+                                   data={"session_id": session_id})
+        return time.perf_counter() - started, response.status_code
+
+    stages.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ok = [seconds for seconds, status in results if status == 200]
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": requests - len(ok),
+        "status_codes": statuses,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "latency_s": summarize(ok) if ok else None,
+        "stages_s": stages.summary(),
+    }
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="aura-bench-")
+    configure_env(args, workdir)
+    os.chdir(ROOT)   # server.py mounts web/static and assets relative to the repo
+
+    from fastapi.testclient import TestClient
+    import server
+
+    stages = StageTimes()
+    instrument(server, stages, args.warm_caches)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    with TestClient(server.app) as client:
+        models_state = wait_ready(client, args.ready_timeout)
+        report = {
+            "config": {
+                "requests": args.requests,
+                "concurrency": levels,
+                "llm_latency_s": args.llm_latency,
+                "warm_caches": args.warm_caches,
+                "models": models_state,
+                "profiles": server.active_profiles,
+            },
+            "results": [],
+            "skipped": {},
+        }
+
+        corpora = {"chat": PROMPTS}
+        if "audio" in endpoints:
+            if models_state.get("whisper") != "ready":
+                report["skipped"]["audio"] = "Whisper is not available"
+            else:
+                clips, reason = load_wavs(args.wavs, models_state)
+                if clips:
+                    corpora["audio"] = clips
+                else:
+                    report["skipped"]["audio"] = reason or f"no .wav files in {args.wavs}"
+
+        for endpoint in endpoints:
+            if endpoint not in corpora:
+                continue
+            # Warm-up: first calls pay for lazy initialisation
+            run_level(client, endpoint, 1, args.warmup, corpora[endpoint], stages)
+            for concurrency in levels:
+                result = run_level(client, endpoint, concurrency, args.requests, corpora[endpoint], stages)
+                report["results"].append(result)
+                print(f"{endpoint} x{concurrency}: {result['throughput_rps']} req/s, "
+                      f"p50 {result['latency_s'] and result['latency_s']['p50']}s", file=sys.stderr)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark for /api/chat and /api/audio")
+    parser.add_argument("--endpoints", default="chat,audio", help="comma separated: chat,audio")
+    parser.add_argument("--concurrency", default="1,4", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--wavs", help="directory of recorded .wav prompts (default: rendered with TTS)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake LLM latency (s)")
+    parser.add_argument("--warm-caches", action="store_true", help="keep the response and TTS caches")
+    parser.add_argument("--ready-timeout", type=float, default=600, help="max wait for models to load (s)")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+    # main() changes into the repository directory
+    args.wavs = os.path.abspath(args.wavs) if args.wavs else None
+    args.out = os.path.abspath(args.out) if args.out else None
+
+    output = json.dumps(main(args), indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
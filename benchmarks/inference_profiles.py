@@ -0,0 +1,200 @@
+import argparse
+import gc
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+# Allow `python benchmarks/inference_profiles.py` as well as `python -m benchmarks.inference_profiles`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.perception.audio import (
+    SAMPLE_RATE, WHISPER_MODEL, AUDIO_EMOTION_MODEL, TEXT_EMOTION_MODEL, AUDIO_EMOTION_LABELS, decode_audio,
+)
+from benchmarks.stats import percentile
+from src.perception.inference import PROFILES, build_whisper, build_pipeline
+
+# Compares the inference profiles (fp32 / int8 / onnx / compile) of the
+# perception models on the same inputs: load time, per-item latency
+# (p50/p95), throughput, and accuracy - against labels where known and
+# as agreement with the fp32 outputs.
+#
+#   python benchmarks/inference_profiles.py --clips ./clips
+#   python benchmarks/inference_profiles.py --synthesize --threads 4
+#
+# --clips: a directory of audio files, optionally with manifest.json
+#   {"clip.wav": {"text": "...", "emotion": "happy"}, ...}
+# --synthesize: no recordings at hand - renders SENTENCES with the TTS
+#   model so Whisper has exact reference transcripts (emotion labels are
+#   then unknown and only fp32 agreement is reported).
+
+SENTENCES = [
+    "Hello Aura, how are you today?",
+    "I just got back from a long walk in the park.",
+    "Can you recommend a good book for the weekend?",
+    "My exam results came out and I passed everything.",
+    "The weather has been terrible all week.",
+    "Please remind me to call my sister tomorrow.",
+]
+
+# (text, expected label of the distilroberta emotion model)
+TEXT_SAMPLES = [
+    ("I can't believe I won the prize, this is the best day ever!", "joy"),
+    ("I miss my grandmother so much since she passed away.", "sadness"),
+    ("Stop touching my stuff, I am sick of this!", "anger"),
+    ("There's something moving in the dark hallway.", "fear"),
+    ("Wow, I did not expect that at all!", "surprise"),
+    ("That smell from the fridge is absolutely revolting.", "disgust"),
+    ("The meeting is scheduled for three o'clock.", "neutral"),
+    ("Thank you so much, you made my whole week.", "joy"),
+]
+
+def words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+def load_clips(directory):
+    manifest_path = os.path.join(directory, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        if name == "manifest.json":
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            samples = decode_audio(f.read())
+        if samples is not None:
+            clips.append({"name": name, "audio": samples, **manifest.get(name, {})})
+    return clips
+
+def synthesize_clips():
+    from src.output.tts import load_tts_model, synthesize
+    if not load_tts_model():
+        sys.exit("TTS model unavailable; pass --clips instead.")
+    clips = []
+    for i, sentence in enumerate(SENTENCES):
+        samples = decode_audio(synthesize(sentence))
+        clips.append({"name": f"tts_{i}.wav", "audio": samples, "text": sentence})
+    return clips
+
+def timed(fn, inputs, repeat):
+    outputs, latencies = [], []
+    for _ in range(repeat):
+        outputs = []
+        for item in inputs:
+            started = time.perf_counter()
+            outputs.append(fn(item))
+            latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+def build(model_name, profile):
+    if model_name == "whisper":
+        model, applied = build_whisper(WHISPER_MODEL, profile)
+        return (lambda audio: model.transcribe(audio, fp16=False)["text"]), applied
+    if model_name == "audio_emotion":
+        pipe, applied = build_pipeline("audio-classification", AUDIO_EMOTION_MODEL, profile)
+        def classify(audio):
+            label = pipe(audio)[0]["label"]
+            return AUDIO_EMOTION_LABELS.get(label, label)
+        return classify, applied
+    pipe, applied = build_pipeline("text-classification", TEXT_EMOTION_MODEL, profile, top_k=1)
+    return (lambda text: pipe(text)[0][0]["label"]), applied
+
+def run(model_name, profile, inputs, labels, repeat, reference=None):
+    started = time.perf_counter()
+    fn, applied = build(model_name, profile)
+    load_seconds = time.perf_counter() - started
+    fn(inputs[0])   # warm-up (compile happens here)
+    outputs, latencies = timed(fn, inputs, repeat)
+
+    result = {
+        "model": model_name,
+        "profile": profile,
+        "applied": applied,
+        "load_s": round(load_seconds, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "throughput_per_s": round(len(latencies) / sum(latencies), 2),
+    }
+    known = [(out, label) for out, label in zip(outputs, labels) if label]
+    if model_name == "whisper":
+        if known:
+            result["wer"] = round(statistics.fmean(word_error_rate(l, o) for o, l in known), 4)
+        if reference:
+            result["wer_vs_fp32"] = round(statistics.fmean(word_error_rate(r, o) for o, r in zip(outputs, reference)), 4)
+    else:
+        if known:
+            result["accuracy"] = round(sum(o == l for o, l in known) / len(known), 3)
+        if reference:
+            result["agreement_with_fp32"] = round(sum(o == r for o, r in zip(outputs, reference)) / len(outputs), 3)
+    return result, outputs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CPU inference profiles of the perception models")
+    parser.add_argument("--models", default="whisper,audio_emotion,text_emotion")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--clips", help="directory of audio clips (+ optional manifest.json)")
+    parser.add_argument("--synthesize", action="store_true", help="render reference clips with TTS")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, help="sets AURA_TORCH_THREADS / AURA_ONNX_THREADS")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    if args.threads:
+        os.environ["AURA_TORCH_THREADS"] = os.environ["AURA_ONNX_THREADS"] = str(args.threads)
+
+    model_names = [m.strip() for m in args.models.split(",") if m.strip()]
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    # fp32 first: it is the reference for the agreement columns
+    profiles = ["fp32"] + [p for p in profiles if p != "fp32"]
+
+    clips = []
+    if any(m in ("whisper", "audio_emotion") for m in model_names):
+        if args.clips:
+            clips = load_clips(args.clips)
+        elif args.synthesize:
+            clips = synthesize_clips()
+        else:
+            sys.exit("Audio models need --clips DIR or --synthesize.")
+        print(f"{len(clips)} clips, {sum(len(c['audio']) for c in clips) / SAMPLE_RATE:.1f}s of audio", file=sys.stderr)
+
+    report = []
+    for model_name in model_names:
+        if model_name == "text_emotion":
+            inputs = [text for text, _ in TEXT_SAMPLES]
+            labels = [label for _, label in TEXT_SAMPLES]
+        else:
+            inputs = [c["audio"] for c in clips]
+            labels = [c.get("text" if model_name == "whisper" else "emotion") for c in clips]
+        reference = None
+        for profile in profiles:
+            print(f"{model_name} / {profile}...", file=sys.stderr)
+            try:
+                result, outputs = run(model_name, profile, inputs, labels, args.repeat, reference)
+            except Exception as e:
+                result, outputs = {"model": model_name, "profile": profile, "error": str(e)}, None
+            if profile == "fp32":
+                reference = outputs
+            report.append(result)
+            gc.collect()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Allow `python benchmarks/llm_backends.py` as well as `python -m benchmarks.llm_backends`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stats import summarize
+from src.core.brain import build_query, candidates, system_instruction
+from src.core.llm_backends import create_backend
+from src.core.prompt import prompt_builder
+
+# Runs the same turns through each LLM backend and reports time to first
+# chunk and full-reply latency (p50/p95, seconds) as JSON.
+#   python benchmarks/llm_backends.py --backends fake,local --repeat 5
+
+INPUTS = [
+    {"text": "Hi AURA, how are you today?", "emotion": "happy", "gesture": "none"},
+    {"text": "I failed my exam and I feel terrible.", "emotion": "sad", "gesture": "none"},
+    {"text": "", "emotion": "neutral", "gesture": "victory"},
+    {"text": "Can you recommend a book for the weekend?", "emotion": "neutral", "gesture": "none"},
+    {"text": "My cat knocked my coffee over again.", "emotion": "angry", "gesture": "fist"},
+]
+
+def run_backend(name, repeat, warmup):
+    backend = create_backend(name, candidates, system_instruction)
+    prompts = [prompt_builder.build("", build_query(item)) for item in INPUTS]
+
+    for contents in prompts[:warmup]:
+        backend.generate(contents)
+
+    first_chunk, total, errors, replies = [], [], 0, []
+    for _ in range(repeat):
+        for contents in prompts:
+            started = time.perf_counter()
+            first = None
+            parts = []
+            try:
+                for text in backend.stream(contents):
+                    if first is None:
+                        first = time.perf_counter() - started
+                    parts.append(text)
+            except Exception as e:
+                errors += 1
+                print(f"[{name}] error: {e}", file=sys.stderr)
+                continue
+            total.append(time.perf_counter() - started)
+            first_chunk.append(first if first is not None else total[-1])
+            replies.append("".join(parts))
+
+    result = {"backend": name, "runs": len(total), "errors": errors}
+    if total:
+        result["first_chunk_s"] = summarize(first_chunk)
+        result["total_s"] = summarize(total)
+        result["reply_chars"] = round(statistics.fmean(len(r) for r in replies), 1)
+        result["sample_reply"] = replies[0]
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LLM backends on identical turns")
+    parser.add_argument("--backends", default="fake", help="comma separated: gemini,local,fake")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = [run_backend(name.strip(), args.repeat, args.warmup) for name in args.backends.split(",") if name.strip()]
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
@@ -0,0 +1,20 @@
+import statistics
+
+# Latency statistics shared by the benchmark scripts.
+
+def percentile(values, pct):
+    """
+    Percentile of a non-empty sequence without interpolation: the sorted
+    value at index round(pct / 100 * (n - 1)) (numpy's "nearest" method).
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": round(statistics.median(values), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "mean": round(statistics.fmean(values), 4),
+    }
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow `python benchmarks/tts_engines.py` as well as `python -m benchmarks.tts_engines`
+sys.path.append(ROOT)
+
+from benchmarks.stats import percentile
+
+# Compares TTS engines (see ENGINES in src/output/tts.py) on the same
+# sentences: load time, real-time factor (render time / audio duration,
+# below 1 is faster than real time), per-sentence latency and memory.
+#
+#   python benchmarks/tts_engines.py
+#   python benchmarks/tts_engines.py --engines tacotron2,vits,piper:./voices/en_US-lessac-medium.onnx --threads 4
+#   python benchmarks/tts_engines.py --target-rtf 0.3 --out tts.json
+#
+# Every engine runs in its own process, so its memory numbers are not
+# inflated by the models loaded before it. Memory is peak RSS (MB):
+# after imports, after loading the model and after synthesis.
+# meets_target compares the p95 per-sentence RTF with --target-rtf: with
+# streaming playback (one sentence of look-ahead) a sentence has to render
+# faster than the previous one plays.
+
+SENTENCES = [
+    "Hi!",
+    "Hello, how are you today?",
+    "That sounds like a really lovely idea.",
+    "I just got back from a long walk in the park, and the weather was perfect.",
+    "Can you recommend a good book for the weekend?",
+    "I'm sorry to hear that, exams can be stressful, but one result does not define you.",
+    "The meeting is at three o'clock on Thursday, the twelfth of March.",
+    "Let's take a deep breath together and think about what you could try next time, step by step.",
+]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def measure(spec, repeat):
+    """Runs in the worker process: loads one engine and renders SENTENCES."""
+    from src.output.tts import create_engine
+    engine = create_engine(spec)
+    result = {"spec": spec, "baseline_mb": peak_rss_mb()}
+
+    started = time.perf_counter()
+    engine.load()
+    result["load_s"] = round(time.perf_counter() - started, 2)
+    result["loaded_mb"] = peak_rss_mb()
+
+    engine.render(SENTENCES[1])   # warm-up: first call allocates buffers
+    latencies, rtfs = [], []
+    render_seconds = audio_seconds = 0.0
+    for _ in range(repeat):
+        for sentence in SENTENCES:
+            started = time.perf_counter()
+            samples = engine.render(sentence)
+            elapsed = time.perf_counter() - started
+            duration = len(samples) / engine.sample_rate
+            latencies.append(elapsed)
+            rtfs.append(elapsed / duration if duration else float("inf"))
+            render_seconds += elapsed
+            audio_seconds += duration
+
+    result.update(engine.stats())
+    result.update({
+        "peak_mb": peak_rss_mb(),
+        "rtf": round(render_seconds / audio_seconds, 3),
+        "rtf_p95": round(percentile(rtfs, 95), 3),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "audio_s": round(audio_seconds / repeat, 2),
+    })
+    return result
+
+def run_isolated(spec, args):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", spec, "--repeat", str(args.repeat)]
+    env = dict(os.environ)
+    if args.threads:
+        env["AURA_TORCH_THREADS"] = env["AURA_ONNX_THREADS"] = str(args.threads)
+    done = subprocess.run(command, capture_output=True, text=True, env=env, cwd=ROOT, timeout=args.timeout)
+    lines = [line for line in done.stdout.splitlines() if line.startswith("{")]
+    if done.returncode != 0 or not lines:
+        error = (done.stderr.strip().splitlines() or [f"exit code {done.returncode}"])[-1]
+        return {"spec": spec, "error": error}
+    return json.loads(lines[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark real-time factor and memory of the TTS engines")
+    parser.add_argument("--engines", default="tacotron2,glow_tts,speedy_speech,fast_pitch,vits",
+                        help="comma separated engine names, coqui:<model> or piper:<voice.onnx>")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--threads", type=int, help="sets AURA_TORCH_THREADS / AURA_ONNX_THREADS")
+    parser.add_argument("--target-rtf", type=float, default=0.5, help="real-time factor to meet (p95)")
+    parser.add_argument("--timeout", type=float, default=1800, help="per engine, including model download (s)")
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Model loading chatter goes to stderr; the result is the last stdout line
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = measure(args.worker, args.repeat)
+        stdout.write(json.dumps(result) + "\n")
+        sys.exit(0)
+
+    report = []
+    for spec in (s.strip() for s in args.engines.split(",") if s.strip()):
+        print(f"{spec}...", file=sys.stderr)
+        result = run_isolated(spec, args)
+        if "error" not in result:
+            result["meets_target"] = result["rtf_p95"] <= args.target_rtf
+            print(f"{spec}: rtf {result['rtf']} (p95 {result['rtf_p95']}), peak {result['peak_mb']} MB", file=sys.stderr)
+        report.append(result)
+
+    output = json.dumps({"target_rtf": args.target_rtf, "threads": args.threads, "engines": report}, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
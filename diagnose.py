@@ -72,8 +72,28 @@ try:
 except Exception as e:
     print(f"[FAIL] Gemini Configuration failed: {e}")
 
-# 4. Check Environment
-print("\n4. Checking Environment...")
+# 4. Check Session Isolation
+# Cached replies and conversation history must never cross sessions
+print("\n4. Checking Session Isolation...")
+try:
+    from src.core.response_cache import ResponseCache
+    cache = ResponseCache(shared=True)
+    question = {"text": "what is my name", "emotion": "neutral"}
+    cache.put({**question, "session_id": "alice"}, "", "Your name is Alice.")
+    leaked = cache.get({**question, "session_id": "bob"})
+    cache.put({**question, "session_id": "bob"}, "", "I don't know yet.", history=[("hi", "Hello!")])
+    stale = cache.get({**question, "session_id": "bob"}, history=[("hi", "Hello!"), ("I'm Bob", "Hi Bob!")])
+    if leaked is not None:
+        print(f"[FAIL] Session 'bob' was served session 'alice's reply: {leaked}")
+    elif stale is not None:
+        print(f"[FAIL] A reply cached earlier in the conversation was reused: {stale}")
+    else:
+        print("[OK] Sessions asking the same question get their own replies.")
+except Exception as e:
+    print(f"[FAIL] Session isolation check failed: {e}")
+
+# 5. Check Environment
+print("\n5. Checking Environment...")
 print(f"CWD: {os.getcwd()}")
 print(f"Python: {sys.version}")
 print("--- DIAGNOSTIC COMPLETE ---")
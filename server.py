@@ -1,21 +1,55 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-import shutil
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketState
+import asyncio
+import base64
+import functools
+import io
+import json
 import os
-import uuid
 from pydantic import BaseModel
+from typing import Dict, Optional
 
 # Import Aura modules
 # Ensure src is in path
 import sys
 sys.path.append(os.getcwd())
 
-from src.core.brain import process_input
-from src.output.tts import speak, load_tts_model
-from src.perception.audio import transcribe_audio_file, analyze_emotion_file, load_audio_models, load_text_emotion_model
+from src.core.brain import process_input, process_input_stream, GESTURE_PHRASES, llm
+from src.output import tts as local_tts
+from src.output.tts import load_tts_model, wav_to_pcm, SentenceBuffer, PcmStream
+from src.perception.audio import decode_audio, load_whisper_model, load_audio_emotion_model, load_text_emotion_model
+from src.perception.audio import whisper_batcher, audio_emotion_batcher, text_emotion_batcher, active_profiles
+from src.perception.streaming_asr import StreamingTranscriber
+from src.perception.fusion import perception
 from src.perception.nv_ace import ace_client
+from src.core.scheduler import scheduler, QueueFullError
+from src.core.readiness import models, ModelUnavailableError
+from src.core.response_cache import response_cache
+from src.core.memory import memory
+from src.core.session import sessions
+from src.core.turns import turns, TurnCancelled
+from src.core.tracing import tracer
+from src.core.metrics import metrics
+from src.output.tts_cache import tts_cache
+from src.output.audio_store import audio_store, cleanup_legacy_files, parse_range
+from src.output.audio_codec import negotiate, encode_reply, media_type
+from src.core.model_server import ModelServerClient
+
+# AURA_MODEL_SERVER=host:port (or a socket path): Whisper, the audio emotion
+# model and TTS run in a shared model server process (src/core/model_server.py)
+# instead of in every worker
+MODEL_SERVER = os.getenv("AURA_MODEL_SERVER")
+model_client = ModelServerClient(MODEL_SERVER) if MODEL_SERVER else None
+# synthesize / speak: through the model server, or in this process
+speech = model_client if model_client else local_tts
+if model_client:
+    # The model server evicts from the shared TTS cache directory
+    tts_cache.evict = False
 
 app = FastAPI()
 
@@ -33,42 +67,244 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Every /api POST is traced; "X-Aura-Profile: 1" also profiles it (when
+# profiling is enabled). The trace id comes back as X-Trace-Id.
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.method != "POST" or not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    profile = request.headers.get("x-aura-profile") == "1"
+    with tracer.trace(f"{request.method} {request.url.path}", profile=profile) as trace:
+        response = await call_next(request)
+        trace.attrs["status"] = response.status_code
+    response.headers["X-Trace-Id"] = trace.id
+    return response
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 app.mount("/assets", StaticFiles(directory="assets"), name="assets")
 
-# Load models on startup
+def start_memory():
+    if not memory.open():
+        return False
+    memory.start()
+    return True
+
+# Load models on startup, concurrently and in the background: the server
+# accepts connections immediately and /readyz reports when it can serve.
 @app.on_event("startup")
 async def startup_event():
-    print("Loading models...")
-    try:
-        load_tts_model()
-        load_audio_models()
-        load_text_emotion_model()
-        print("Models loaded.")
-    except Exception as e:
-        print(f"Error loading models: {e}")
+    print("Loading models in the background...")
+    if model_client:
+        # Loaded by the model server; ready once it reports them loaded
+        models.register("tts", functools.partial(model_client.wait_for, "tts"))
+        models.register("whisper", functools.partial(model_client.wait_for, "whisper"))
+        models.register("audio_emotion", functools.partial(model_client.wait_for, "audio_emotion"), required=False)
+        models.register("text_emotion", functools.partial(model_client.wait_for, "text_emotion"), required=False)
+    else:
+        models.register("tts", load_tts_model)
+        models.register("whisper", load_whisper_model)
+        # Optional: requests degrade without these
+        models.register("audio_emotion", load_audio_emotion_model, required=False)
+        models.register("text_emotion", load_text_emotion_model, required=False)
+    models.register("llm", llm.load)
+    models.register("memory", start_memory, required=False)
+    if response_cache.similarity > 0:
+        models.register("embedder", response_cache.load_embedder, required=False)
+    models.start()
+
+    removed = cleanup_legacy_files()
+    if removed:
+        print(f"Removed {removed} leftover audio files from the working directory.")
+    audio_store.start()
+
+    if os.getenv("AURA_TTS_PREWARM", "1") == "1":
+        asyncio.create_task(prewarm_tts_cache())
+
+async def prewarm_tts_cache():
+    if not await models.wait_async("tts", timeout=600):
+        return
+    # One phrase per job so real requests can interleave on the TTS pool
+    for phrase in GESTURE_PHRASES:
+        try:
+            await scheduler.run("tts", speech.synthesize, phrase)
+        except QueueFullError:
+            await asyncio.sleep(1)
+    print(f"TTS cache pre-warmed ({len(GESTURE_PHRASES)} phrases).")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler.shutdown()
+    models.shutdown()
+    audio_store.stop()
+    memory.close()
+
+# Model pools are bounded: when one is saturated, tell the client to back off
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"AURA is busy ({exc.pool_name}), try again shortly."},
+        headers={"Retry-After": "1"}
+    )
+
+# A component the request cannot do without is still loading (or failed)
+@app.exception_handler(ModelUnavailableError)
+async def model_unavailable_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"AURA is starting up ({exc.name} is {exc.state}), try again shortly."},
+        headers={"Retry-After": "5"}
+    )
+
+# A newer turn of the same session took over (barge-in)
+@app.exception_handler(TurnCancelled)
+async def turn_cancelled_handler(request, exc):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Superseded by a newer turn.", "cancelled": True, "turn_id": exc.turn_id}
+    )
+
+# Liveness: the process is up and serving HTTP
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# Readiness: every required model is loaded
+@app.get("/readyz")
+async def readyz():
+    ready = models.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "models": models.status(), "profiles": active_profiles}
+    )
+
+@app.get("/api/scheduler")
+async def scheduler_stats():
+    return scheduler.stats()
+
+@app.get("/api/batching")
+async def batching_stats():
+    return {
+        "whisper": whisper_batcher.stats(),
+        "audio_emotion": audio_emotion_batcher.stats(),
+        "text_emotion": text_emotion_batcher.stats(),
+    }
+
+@app.get("/api/llm")
+async def llm_stats():
+    return llm.stats()
+
+@app.get("/api/cache")
+async def cache_stats():
+    return {"responses": response_cache.stats(), "tts": tts_cache.stats()}
+
+@app.get("/api/memory")
+async def memory_stats():
+    return {"long_term": memory.stats(), "sessions": sessions.stats()}
+
+@app.get("/api/audio_store")
+async def audio_store_stats():
+    return audio_store.stats()
+
+@app.get("/api/turns")
+async def turn_stats():
+    return turns.stats()
+
+@app.get("/api/perception")
+async def perception_stats():
+    return perception.stats()
+
+@app.get("/api/perception/{session_id}")
+async def session_emotion(session_id: str):
+    state = perception.state(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No emotion recorded for this session")
+    return state
+
+@app.get("/api/traces")
+async def recent_traces(limit: int = 50):
+    return tracer.traces(limit)
+
+@app.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
+
+@app.get("/api/traces/{trace_id}/profile")
+async def get_profile(trace_id: str):
+    """Folded stacks (flamegraph.pl / speedscope input) of a profiled request."""
+    trace = tracer.get(trace_id)
+    if trace is None or trace.profile is None:
+        raise HTTPException(status_code=404, detail="No profile for this trace")
+    return PlainTextResponse(trace.profile)
+
+class ProfilingRequest(BaseModel):
+    enabled: bool
+
+@app.post("/api/profiling")
+async def set_profiling(request: ProfilingRequest):
+    # Runtime switch; requests opt in one at a time with X-Aura-Profile: 1
+    tracer.profiling = request.enabled
+    return {"enabled": tracer.profiling}
+
+@metrics.collector
+def runtime_metrics():
+    pools = scheduler.stats()
+    batchers = {"whisper": whisper_batcher, "audio_emotion": audio_emotion_batcher, "text_emotion": text_emotion_batcher}
+    batching = {name: batcher.stats() for name, batcher in batchers.items()}
+    responses, tts_files, store = response_cache.stats(), tts_cache.stats(), audio_store.stats()
+    llm_stats = llm.stats()
+    router_models = llm_stats.get("models", {})
+    return [
+        ("aura_pool_pending", "gauge", "Jobs queued or running per model pool",
+         [({"pool": name}, pool["pending"]) for name, pool in pools.items()]),
+        ("aura_pool_rejected_total", "counter", "Jobs rejected because the pool was full",
+         [({"pool": name}, pool["rejected"]) for name, pool in pools.items()]),
+        ("aura_batch_pending", "gauge", "Items waiting in a micro-batcher",
+         [({"model": name}, b["pending"]) for name, b in batching.items()]),
+        ("aura_batch_items_total", "counter", "Items run through a micro-batcher",
+         [({"model": name}, b["items"]) for name, b in batching.items()]),
+        ("aura_batches_total", "counter", "Batches run by a micro-batcher",
+         [({"model": name}, b["batches"]) for name, b in batching.items()]),
+        ("aura_cache_hits_total", "counter", "Cache hits",
+         [({"cache": "response"}, responses["hits"] + responses["semantic_hits"]), ({"cache": "tts"}, tts_files["hits"])]),
+        ("aura_cache_misses_total", "counter", "Cache misses",
+         [({"cache": "response"}, responses["misses"]), ({"cache": "tts"}, tts_files["misses"])]),
+        ("aura_cache_entries", "gauge", "Cache entries",
+         [({"cache": "response"}, responses["entries"]), ({"cache": "tts"}, tts_files["entries"])]),
+        ("aura_tts_cache_bytes", "gauge", "Size of the TTS audio cache", [({}, tts_files["bytes"])]),
+        ("aura_audio_store_bytes", "gauge", "Reply audio held by the audio store", [({}, store["bytes"])]),
+        ("aura_audio_store_entries", "gauge", "Reply audio files in the audio store", [({}, store["entries"])]),
+        ("aura_llm_fallbacks_total", "counter", "LLM calls moved on to another candidate model", [({}, llm_stats.get("fallbacks"))]),
+        ("aura_llm_hedges_total", "counter", "Hedged LLM calls", [({}, llm_stats.get("hedges"))]),
+        ("aura_llm_timeouts_total", "counter", "LLM calls past the deadline", [({}, llm_stats.get("timeouts"))]),
+        ("aura_llm_model_calls_total", "counter", "Calls per candidate model",
+         [({"model": name}, m["calls"]) for name, m in router_models.items()]),
+        ("aura_llm_model_errors_total", "counter", "Failed calls per candidate model",
+         [({"model": name}, m["errors"]) for name, m in router_models.items()]),
+        ("aura_llm_circuit_open", "gauge", "1 while a candidate model is backed off",
+         [({"model": name}, m["circuit"] == "open") for name, m in router_models.items()]),
+        ("aura_turns_superseded_total", "counter", "Turns cancelled by a newer turn (barge-in)", [({}, turns.superseded)]),
+        ("aura_model_ready", "gauge", "1 once a component has loaded",
+         [({"component": name}, info["state"] == "ready") for name, info in models.status().items()]),
+    ]
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 class ChatRequest(BaseModel):
     text: str
+    # Face emotion seen by the client (face-api); optionally all expression scores
     emotion: str = "neutral"
+    face_scores: Optional[Dict[str, float]] = None
     gesture: str = "none"
+    session_id: str = "default"
 
-@app.post("/api/chat")
-async def chat(request: ChatRequest):
-    print(f"Received chat: {request.text} ({request.emotion}), Gesture: {request.gesture}")
-    # Process input
-    response_text = process_input({"text": request.text, "emotion": request.emotion, "gesture": request.gesture})
-    
-    # Generate Audio
-    audio_file = speak(response_text, return_file=True)
-    
-    # Generate Face Animation using NVIDIA ACE
-    face_animation = None
-    if audio_file:
-        face_animation = ace_client.process_audio(audio_file)
-    
-    # Determine animations (list)
+def pick_animations(response_text, gesture="none", emotion=None):
     # Determine animations (list)
     animations = []
     lower_resp = response_text.lower()
@@ -76,27 +312,27 @@ async def chat(request: ChatRequest):
     # Priority: Gesture -> Keywords -> Default
     
     # 1. Gesture Mapping (Explicit Visual Feedback)
-    if "thumbs_up" in request.gesture:
+    if "thumbs_up" in gesture:
         animations.append("happy")
-    elif "victory" in request.gesture:
+    elif "victory" in gesture:
         animations.append("dance")
-    elif "wave" in request.gesture:
+    elif "wave" in gesture:
         animations.append("clap") # Fallback for wave
-    elif "clap" in request.gesture:
+    elif "clap" in gesture:
         animations.append("clap")
-    elif "dance" in request.gesture:
+    elif "dance" in gesture:
         animations.append("dance")
-    elif "hug" in request.gesture:
+    elif "hug" in gesture:
         animations.append("happy") # Fallback for hug
 
     # 1.5 Emotion Mapping (Visual Feedback for Face)
-    if request.emotion == "happy":
+    if emotion == "happy":
         animations.append("happy")
-    elif request.emotion == "sad":
+    elif emotion == "sad":
         animations.append("sad")
-    elif request.emotion == "surprised":
+    elif emotion == "surprised":
         animations.append("happy") # Or some surprise animation if we had one
-    elif request.emotion == "angry":
+    elif emotion == "angry":
         animations.append("sad") # Or angry behavior if defined
         
     # 2. Keyword Mapping (if no gesture specific animation or to add more)
@@ -113,65 +349,335 @@ async def chat(request: ChatRequest):
     # or "talk" if we had one.
     if not animations:
         animations = ["idle"]
+    return animations
+
+# Whisper and the audio emotion model run through micro-batchers so
+# concurrent voice turns share one forward pass; with a model server the
+# batching happens there
+async def run_whisper(samples):
+    with tracer.span("stt"):
+        if model_client:
+            return await scheduler.run("whisper", model_client.transcribe_audio, samples)
+        return await whisper_batcher.run(samples)
+
+async def run_audio_emotion(samples):
+    with tracer.span("emotion"):
+        if model_client:
+            return await scheduler.run("audio_emotion", model_client.audio_emotion_scores, samples)
+        return await audio_emotion_batcher.run(samples)
+
+async def run_text_emotion(text):
+    with tracer.span("text_emotion"):
+        if model_client:
+            return await scheduler.run("text_emotion", model_client.text_emotion_scores, text)
+        return await text_emotion_batcher.run(text)
+
+async def perceive(session_id, text=None, audio_scores=None, face=None, face_scores=None):
+    """Fused user emotion of a turn (see fusion.py); a failing source is left out."""
+    text_scores = None
+    if text and text.strip() and models.ready("text_emotion"):
+        text_scores = perception.cached_text_scores(session_id, text)
+        if text_scores is None:
+            try:
+                text_scores = await run_text_emotion(text)
+            except Exception as e:
+                print(f"Text emotion analysis failed: {e}")
+    return perception.fuse(session_id, text=text, text_scores=text_scores, audio_scores=audio_scores,
+                           face=face, face_scores=face_scores)
+
+async def store_reply_audio(audio_file, accept):
+    # Encode once, at synthesis time, into the best format the client accepts
+    with tracer.span("reply.encode") as span:
+        data, ext = await scheduler.run("encode", encode_reply, audio_file, negotiate(accept))
+        span.attrs.update(format=ext, bytes=len(data))
+    audio_id = audio_store.add(data=data, path=audio_file if ext == "wav" else None, ext=ext, media_type=media_type(ext))
+    return f"/audio/{audio_id}"
+
+@app.post("/api/chat")
+async def chat(request: ChatRequest, http_request: Request):
+    print(f"Received chat: {request.text} ({request.emotion}), Gesture: {request.gesture}")
+    turn = turns.begin(request.session_id)
+    return await turns.run(turn, chat_turn(request, http_request, turn))
+
+async def chat_turn(request, http_request, turn):
+    await models.require("llm")
+    perceived = await perceive(request.session_id, text=request.text, face=request.emotion, face_scores=request.face_scores)
+    emotion = perceived["emotion"]
+    # Process input
+    response_text = await scheduler.run("llm", process_input, {"text": request.text, "emotion": emotion, "gesture": request.gesture, "session_id": request.session_id}, turn.cancelled)
+    
+    # Generate Audio (text-only reply if TTS is still loading, unless cached)
+    await models.wait_async("tts")
+    audio_file = await scheduler.run("tts", speech.speak, response_text, return_file=True)
+    
+    # Generate Face Animation using NVIDIA ACE
+    face_animation = None
+    if audio_file:
+        face_animation = await scheduler.run("ace", ace_client.process_audio, audio_file, turn.cancelled)
     
-    audio_url = f"/audio/{os.path.basename(audio_file)}" if audio_file else None
+    animations = pick_animations(response_text, request.gesture, emotion)
+    
+    audio_url = await store_reply_audio(audio_file, http_request.headers.get("accept")) if audio_file else None
     
     return {
+        "turn_id": turn.id,
+        "perception": perceived,
         "text": response_text,
         "audio_url": audio_url,
         "animations": animations, # Return list
         "face_animation": face_animation # New field for blendshapes
     }
 
+@app.websocket("/ws/chat")
+async def chat_stream(websocket: WebSocket):
+    """
+    Streaming variant of /api/chat. For every ChatRequest JSON received:
+      {"type": "turn", "turn_id": n}        the turn the following messages belong to
+      {"type": "text", "delta": ...}        as Gemini produces tokens
+      {"type": "audio", "index": n, ...}    one WAV (base64) + blendshapes per sentence
+      {"type": "done", "text": ..., "animations": [...]}
+    Every message carries turn_id. A new request (here or on any other
+    connection of the session) cancels the turn in flight, which then sends
+      {"type": "cancelled", "turn_id": n}   stop playing turn n
+    """
+    await websocket.accept()
+    active = set()
+    try:
+        while True:
+            request = ChatRequest(**await websocket.receive_json())
+            task = asyncio.create_task(serve_turn(websocket, request, turns.begin(request.session_id)))
+            active.add(task)
+            task.add_done_callback(active.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in active:
+            task.cancel()
+
+async def serve_turn(websocket, request, turn, perceived=None):
+    """Streams one turn over a WebSocket, reporting errors and cancellation as messages."""
+    try:
+        with tracer.trace("ws.turn", turn_id=turn.id, session=request.session_id):
+            await turns.run(turn, stream_turn(websocket, request, turn, perceived))
+        return
+    except TurnCancelled:
+        message = {"type": "cancelled", "turn_id": turn.id}
+    except QueueFullError as e:
+        message = {"type": "error", "turn_id": turn.id, "status": 503, "detail": f"AURA is busy ({e.pool_name}), try again shortly."}
+    except ModelUnavailableError as e:
+        message = {"type": "error", "turn_id": turn.id, "status": 503, "detail": f"AURA is starting up ({e.name} is {e.state}), try again shortly."}
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.send_json(message)
+
+async def stream_turn(websocket, request, turn, perceived=None):
+    print(f"Received stream chat: {request.text} ({request.emotion}), Gesture: {request.gesture} (turn {turn.id})")
+    await websocket.send_json({"type": "turn", "turn_id": turn.id})
+    await models.require("llm")
+    if perceived is None:
+        perceived = await perceive(request.session_id, text=request.text, face=request.emotion, face_scores=request.face_scores)
+    emotion = perceived["emotion"]
+    sentences = asyncio.Queue()
+    parts = []
+
+    async def produce():
+        # LLM tokens -> complete sentences
+        buffer = SentenceBuffer()
+        tokens = process_input_stream({"text": request.text, "emotion": emotion, "gesture": request.gesture, "session_id": request.session_id})
+        pending = None
+        finished = False
+        try:
+            while True:
+                pending = scheduler.pool("llm").submit(next, tokens, None)
+                chunk = await asyncio.wrap_future(pending)
+                if chunk is None:
+                    finished = True
+                    break
+                parts.append(chunk)
+                await websocket.send_json({"type": "text", "turn_id": turn.id, "delta": chunk})
+                for sentence in buffer.feed(chunk):
+                    await sentences.put(sentence)
+            for sentence in buffer.flush():
+                await sentences.put(sentence)
+        finally:
+            if pending is not None and not finished:
+                # The turn ended early (barge-in): stop the model stream. A
+                # generator cannot be closed while a pool thread is inside it,
+                # so this waits for the chunk being read, and closing runs on
+                # the llm pool because it may block (local model shutdown)
+                pending.add_done_callback(lambda _: scheduler.pool("llm").executor.submit(tokens.close))
+            await sentences.put(None)
+
+    async def consume():
+        # Sentence -> audio + face animation, in order. One animation stream
+        # covers the whole reply: each sentence's audio goes into it as soon
+        # as it is synthesized, while the next sentences are still rendering.
+        index = 0
+        face = None
+        await models.wait_async("tts")
+        try:
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    break
+                wav = await scheduler.run("tts", speech.synthesize, sentence)
+                if not wav:
+                    continue
+                pcm, rate = wav_to_pcm(wav)
+                if face is None:
+                    face = await scheduler.run("ace", ace_client.open_stream, rate, turn.cancelled)
+                face_animation = await scheduler.run("ace", face.animate, pcm)
+                await websocket.send_json({
+                    "type": "audio",
+                    "turn_id": turn.id,
+                    "index": index,
+                    "text": sentence,
+                    "audio": base64.b64encode(wav).decode("ascii"),
+                    "face_animation": face_animation
+                })
+                index += 1
+        finally:
+            if face is not None:
+                face.close()
+
+    await asyncio.gather(produce(), consume())
+
+    response_text = "".join(parts)
+    await websocket.send_json({
+        "type": "done",
+        "turn_id": turn.id,
+        "text": response_text,
+        "perception": perceived,
+        "animations": pick_animations(response_text, request.gesture, emotion)
+    })
+
+@app.websocket("/ws/audio")
+async def audio_stream(websocket: WebSocket):
+    """
+    Live voice input. The client sends one JSON message
+      {"type": "start", "sample_rate": 16000, "session_id": ..., "emotion": ...}
+    then binary frames of 16-bit mono PCM, {"type": "face", "emotion": ...}
+    when the face emotion changes, and {"type": "stop"} to end the current
+    utterance early. The server segments speech itself and sends
+      {"type": "vad", "state": "speech_start" | "speech_end"}
+      {"type": "partial", "text": ...}               while the user talks
+      {"type": "transcript", "text": ..., "emotion": ..., "perception": {...}}
+    followed by the same turn / text / audio / done messages as /ws/chat.
+    Speaking over AURA (barge-in) cancels her reply once the new utterance
+    is transcribed.
+    """
+    await websocket.accept()
+    try:
+        config = await websocket.receive_json()
+        session_id = config.get("session_id") or "default"
+        face = config.get("emotion")
+        await models.require("whisper")
+    except ModelUnavailableError as e:
+        await websocket.send_json({"type": "error", "status": 503, "detail": f"AURA is starting up ({e.name} is {e.state}), try again shortly."})
+        await websocket.close()
+        return
+    except WebSocketDisconnect:
+        return
+
+    transcriber = StreamingTranscriber(
+        run_whisper,
+        run_audio_emotion if models.ready("audio_emotion") else None,
+        websocket.send_json,
+        sample_rate=int(config.get("sample_rate", 16000)),
+        partial_interval=float(os.getenv("AURA_ASR_PARTIAL_INTERVAL", 1.0)),
+        end_ms=int(os.getenv("AURA_VAD_END_MS", 500)),
+    )
+    active = set()
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                control = json.loads(message["text"]) if message.get("text") else {}
+                if message.get("bytes"):
+                    result = await transcriber.feed(message["bytes"])
+                elif control.get("type") == "stop":
+                    result = await transcriber.flush()
+                else:
+                    if control.get("type") == "face":
+                        face = control.get("emotion")
+                    continue
+            except QueueFullError as e:
+                # This utterance is lost; keep listening
+                await websocket.send_json({"type": "error", "status": 503, "detail": f"AURA is busy ({e.pool_name}), try again shortly."})
+                continue
+            if not result or not result["text"]:
+                continue
+
+            perceived = await perceive(session_id, text=result["text"], audio_scores=result["emotion"], face=face)
+            print(f"Transcribed (stream): {result['text']}, Emotion: {perceived['emotion']} {perceived['sources']} ({result['seconds']}s)")
+            await websocket.send_json({"type": "transcript", **result, "emotion": perceived["emotion"], "perception": perceived})
+            request = ChatRequest(text=result["text"], emotion=face or "neutral", session_id=session_id)
+            task = asyncio.create_task(serve_turn(websocket, request, turns.begin(session_id), perceived))
+            active.add(task)
+            task.add_done_callback(active.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in active:
+            task.cancel()
+
 @app.post("/api/audio")
-async def upload_audio(file: UploadFile = File(...)):
-    temp_filename = f"temp_{uuid.uuid4()}.wav"
-    with open(temp_filename, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    print(f"Processing audio file: {temp_filename}")
-    # Transcribe
-    text = transcribe_audio_file(temp_filename)
-    emotion = analyze_emotion_file(temp_filename)
-    
-    os.remove(temp_filename)
+async def upload_audio(http_request: Request, file: UploadFile = File(...), session_id: str = Form("default"),
+                       face_emotion: Optional[str] = Form(None), gesture: str = Form("none")):
+    data = await file.read()
+    print(f"Processing audio upload: {file.filename} ({len(data)} bytes)")
+
+    # Decode once in memory, then transcribe and classify the same buffer in parallel
+    await models.require("whisper")
+    samples = await scheduler.run("decode", decode_audio, data)
+    text = None
+    audio_scores = None
+    if samples is not None:
+        # No audio emotion model (yet): fusion goes by text and face only
+        if models.ready("audio_emotion"):
+            text, audio_scores = await asyncio.gather(
+                run_whisper(samples),
+                run_audio_emotion(samples)
+            )
+        else:
+            text = await run_whisper(samples)
     
     if not text:
         return {"input_text": None, "text": None, "audio_url": None, "animations": ["idle"]}
-        
-    print(f"Transcribed: {text}, Emotion: {emotion}")
-    
+
+    perceived = await perceive(session_id, text=text, audio_scores=audio_scores, face=face_emotion)
+    emotion = perceived["emotion"]
+    print(f"Transcribed: {text}, Emotion: {emotion} {perceived['sources']}")
+
+    # The user spoke again: whatever AURA was still preparing is obsolete
+    turn = turns.begin(session_id)
+    return await turns.run(turn, audio_turn(text, emotion, gesture, perceived, session_id, http_request, turn))
+
+async def audio_turn(text, emotion, gesture, perceived, session_id, http_request, turn):
     # Process
-    response_text = process_input({"text": text, "emotion": emotion})
+    await models.require("llm")
+    response_text = await scheduler.run("llm", process_input, {"text": text, "emotion": emotion, "gesture": gesture, "session_id": session_id}, turn.cancelled)
     
     # Generate Audio
-    audio_file = speak(response_text, return_file=True)
+    await models.wait_async("tts")
+    audio_file = await scheduler.run("tts", speech.speak, response_text, return_file=True)
 
     # Generate Face Animation using NVIDIA ACE
     face_animation = None
     if audio_file:
-        face_animation = ace_client.process_audio(audio_file)
-    
-    # Determine animations (list)
-    animations = []
-    lower_resp = response_text.lower()
-    
-    if "hug" in lower_resp: animations.append("happy")
-    if "dance" in lower_resp: animations.append("dance")
-    if "happy" in lower_resp: animations.append("happy")
-    if "sad" in lower_resp or "cry" in lower_resp: animations.append("sad")
-    if "clap" in lower_resp: animations.append("clap")
-    if "pray" in lower_resp: animations.append("pray")
-    if "jump" in lower_resp: animations.append("jump")
+        face_animation = await scheduler.run("ace", ace_client.process_audio, audio_file, turn.cancelled)
     
-    if not animations:
-        animations = ["idle"]
+    animations = pick_animations(response_text, gesture, emotion)
     
-    audio_url = f"/audio/{os.path.basename(audio_file)}" if audio_file else None
+    audio_url = await store_reply_audio(audio_file, http_request.headers.get("accept")) if audio_file else None
     
     return {
+        "turn_id": turn.id,
         "input_text": text,
         "input_emotion": emotion,
+        "perception": perceived,
         "text": response_text,
         "audio_url": audio_url,
         "animations": animations,
@@ -179,11 +685,73 @@ async def upload_audio(file: UploadFile = File(...)):
     }
 
 @app.get("/audio/{filename}")
-async def get_audio(filename: str):
-    file_path = os.path.abspath(filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
-    return HTTPException(status_code=404, detail="File not found")
+async def get_audio(filename: str, request: Request):
+    found = audio_store.read(filename)
+    if found is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    entry, data = found
+
+    headers = {
+        "ETag": entry.etag,
+        "Accept-Ranges": "bytes",
+        # Ids are never reused, so the content behind a URL never changes
+        "Cache-Control": "private, max-age=3600, immutable",
+    }
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+
+    # If-Range: only honour the range if the client still has this version
+    if_range = request.headers.get("if-range")
+    range_header = request.headers.get("range") if not if_range or if_range == entry.etag else None
+    try:
+        byte_range = parse_range(range_header, len(data))
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{len(data)}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        return Response(data, media_type=entry.media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+    return Response(data[start:end + 1], status_code=206, media_type=entry.media_type, headers=headers)
+
+class SpeechRequest(BaseModel):
+    text: str
+
+@app.post("/api/speech")
+async def stream_speech(request: SpeechRequest, http_request: Request):
+    """
+    Speaks text as a raw PCM stream (audio/L16, 16-bit little-endian mono,
+    rate in X-Sample-Rate). The first bytes go out as soon as the first
+    sentence is synthesized; nothing is written out as a reply file.
+    """
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="No text to speak")
+    await models.require("tts")
+    stream = PcmStream(request.text, speech.synthesize)
+    chunks = iter(stream)
+    # Wait for the first chunk here: it carries the sample rate, and a full
+    # TTS queue can still become a 503
+    first = await run_in_threadpool(next, chunks, None)
+    if first is None:
+        raise HTTPException(status_code=503, detail="Speech synthesis failed")
+
+    async def body():
+        # Stops reading (and rendering) once the client is gone
+        try:
+            chunk = first
+            while chunk is not None and not await http_request.is_disconnected():
+                yield chunk
+                chunk = await run_in_threadpool(next, chunks, None)
+        finally:
+            stream.close()
+
+    # The background task runs when the response ends, also when Starlette
+    # cancels it on disconnect and leaves body() suspended: the sentences
+    # queued ahead are dropped instead of rendered for nobody
+    return StreamingResponse(body(), media_type=f"audio/L16;rate={stream.sample_rate};channels=1",
+                             headers={"X-Sample-Rate": str(stream.sample_rate), "Cache-Control": "no-store"},
+                             background=BackgroundTask(stream.close))
 
 @app.get("/")
 async def read_index():
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from src.core.scheduler import QueueFullError
+
+# Dynamic micro-batching: requests for one model are collected for up to
+# max_wait_ms (counted from the oldest waiting request) or until max_batch
+# are waiting, run through batch_fn(items) -> results as one call, and the
+# results fanned back to the callers' futures. Under light load a request
+# waits at most max_wait_ms; under heavy load batches fill up and the
+# per-call overhead is paid once per batch.
+# Settings per model: AURA_<NAME>_BATCH, AURA_<NAME>_BATCH_WAIT_MS,
+# AURA_<NAME>_BATCH_QUEUE.
+
+class MicroBatcher:
+    def __init__(self, name, batch_fn, max_batch=8, max_wait_ms=5.0, max_pending=32):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.pending = 0
+        self.rejected = 0
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.sizes = {}
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def submit(self, item):
+        """Queues one item; returns a Future for its result. Raises QueueFullError when saturated."""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(self.name)
+            self.pending += 1
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._loop, name=f"aura-batch-{self.name}", daemon=True)
+                self.worker.start()
+        future = Future()
+        self.queue.put((item, future, time.monotonic()))
+        return future
+
+    async def run(self, item):
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _loop(self):
+        while True:
+            first = self.queue.get()
+            batch = [first]
+            deadline = first[2] + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        started = time.monotonic()
+        # Callers that gave up (cancelled futures) are dropped from the batch
+        live = [(item, future, queued) for item, future, queued in batch if future.set_running_or_notify_cancel()]
+        try:
+            if live:
+                try:
+                    results = self.batch_fn([item for item, _, _ in live])
+                except Exception as e:
+                    if len(live) == 1:
+                        raise
+                    # One bad input should not fail its neighbours: retry one by one
+                    print(f"{self.name} batch of {len(live)} failed, retrying items singly: {e}")
+                    results = []
+                    for item, future, _ in live:
+                        try:
+                            results.append(self.batch_fn([item])[0])
+                        except Exception as item_error:
+                            results.append(item_error)
+                if len(results) != len(live):
+                    # Which result belongs to which item is unknown: fail them all
+                    # rather than leave some callers waiting forever
+                    raise ValueError(f"{self.name} batch returned {len(results)} results for {len(live)} items")
+                for (_, future, _), result in zip(live, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        except Exception as e:
+            for _, future, _ in live:
+                if not future.done():
+                    future.set_exception(e)
+            with self.lock:
+                self.errors += 1
+        finally:
+            finished = time.monotonic()
+            with self.lock:
+                self.pending -= len(batch)
+                if live:
+                    self.batches += 1
+                    self.items += len(live)
+                    self.sizes[len(live)] = self.sizes.get(len(live), 0) + 1
+                    self.wait_seconds += sum(started - queued for _, _, queued in live)
+                    self.run_seconds += finished - started
+
+    def stats(self):
+        with self.lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "pending": self.pending,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch": round(self.items / self.batches, 2) if self.batches else None,
+                "batch_sizes": dict(sorted(self.sizes.items())),
+                "mean_wait_ms": round(self.wait_seconds / self.items * 1000, 2) if self.items else None,
+                "mean_batch_ms": round(self.run_seconds / self.batches * 1000, 2) if self.batches else None,
+            }
+
+def batcher_from_env(name, batch_fn, max_batch=8, max_wait_ms=5.0, max_pending=32):
+    env = name.upper()
+    return MicroBatcher(
+        name,
+        batch_fn,
+        max_batch=int(os.getenv(f"AURA_{env}_BATCH", max_batch)),
+        max_wait_ms=float(os.getenv(f"AURA_{env}_BATCH_WAIT_MS", max_wait_ms)),
+        max_pending=int(os.getenv(f"AURA_{env}_BATCH_QUEUE", max_pending)),
+    )
@@ -0,0 +1,100 @@
+import os
+import random
+import re
+import time
+
+# Offline stand-in for genai.GenerativeModel, so the router, the streaming
+# path and load tests run without network or quota. Replies are canned but
+# shaped like AURA's (1-2 short sentences, gestures acknowledged).
+#
+# AURA_FAKE_LLM_FAILURES injects errors per model, e.g.
+#   "gemini-2.0-flash-exp=429,gemini-2.0-flash=0.3"
+# -> the first always answers 429, the second fails 30% of the time.
+
+GESTURE_REPLIES = {
+    "victory": "Peace!",
+    "thumbs_up": "Awesome!",
+    "open_palm": "High five!",
+    "fist": "Bump!",
+}
+
+EMOTION_REPLIES = {
+    "happy": "Love that energy!",
+    "sad": "I'm here for you. What's wrong?",
+    "angry": "That sounds frustrating. Want to talk about it?",
+}
+
+def parse_failures(spec):
+    failures = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, value = item.partition("=")
+        failures[name.strip()] = value.strip()
+    return failures
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeGenerativeModel:
+    def __init__(self, model_name, latency=0.3, token_delay=0.02, failure=None, seed=None):
+        self.model_name = model_name
+        # Time to first token, then per-word delay when streaming
+        self.latency = latency
+        self.token_delay = token_delay
+        # "429" / "404" -> always fail with that status; a float -> failure probability
+        self.failure = failure
+        self.random = random.Random(seed)
+
+    def _maybe_fail(self):
+        if not self.failure:
+            return
+        if self.failure in ("429", "404", "500"):
+            raise RuntimeError(f"{self.failure} {self.model_name} (fake)")
+        if self.random.random() < float(self.failure):
+            raise RuntimeError(f"500 {self.model_name} failed (fake)")
+
+    def reply(self, contents):
+        prompt = contents if isinstance(contents, str) else contents[-1]["parts"][-1]
+        said = re.search(r'User said: "(.*?)"', prompt)
+        gesture = re.search(r"Gesture: (\w+)", prompt)
+        emotion = re.search(r"Emotion: (\w+)", prompt)
+        parts = []
+        if gesture and gesture.group(1) in GESTURE_REPLIES:
+            parts.append(GESTURE_REPLIES[gesture.group(1)])
+        if emotion and emotion.group(1) in EMOTION_REPLIES:
+            parts.append(EMOTION_REPLIES[emotion.group(1)])
+        if said:
+            parts.append(f"You said \"{said.group(1)[:60]}\", tell me more.")
+        return " ".join(parts) or "I see you! What's on your mind?"
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        text = self.reply(contents)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency + self.token_delay * len(text.split()))
+        self._maybe_fail()
+        return FakeResponse(text)
+
+    def _stream(self, text):
+        time.sleep(self.latency)
+        self._maybe_fail()
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            yield FakeResponse(word if i == 0 else " " + word)
+
+_fake_models = {}
+
+def get_fake_model(model_name):
+    model = _fake_models.get(model_name)
+    if model is None:
+        failures = parse_failures(os.getenv("AURA_FAKE_LLM_FAILURES"))
+        model = FakeGenerativeModel(
+            model_name,
+            latency=float(os.getenv("AURA_FAKE_LLM_LATENCY", 0.3)),
+            token_delay=float(os.getenv("AURA_FAKE_LLM_TOKEN_DELAY", 0.02)),
+            failure=failures.get(model_name),
+        )
+        _fake_models[model_name] = model
+    return model
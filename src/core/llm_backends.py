@@ -0,0 +1,269 @@
+import datetime
+import os
+import queue
+import threading
+import time
+
+from src.core.llm_router import router_from_env
+from src.core.fake_llm import get_fake_model
+
+# Interchangeable reply generators behind brain.process_input. All of them
+# take the prompt builder's Gemini-style `contents`
+#   [{"role": "user" | "model", "parts": [text]}, ...]
+# with the system instruction fixed at construction, and support streaming.
+# Selected with AURA_LLM_BACKEND = gemini (default) | local | fake.
+
+class LLMBackend:
+    name = "base"
+
+    def load(self):
+        """Prepares the backend (imports, weights). True when ready to serve."""
+        return True
+
+    def generate(self, contents):
+        """Returns the full reply text."""
+        return "".join(self.stream(contents))
+
+    def stream(self, contents):
+        """Yields the reply in text chunks."""
+        raise NotImplementedError
+
+    def stats(self):
+        return {"backend": self.name}
+
+class RoutedBackend(LLMBackend):
+    """Backends made of several candidate models behind an LLMRouter."""
+
+    def __init__(self, candidates, factory):
+        self.router = router_from_env(candidates, factory)
+
+    def generate(self, contents):
+        return self.router.generate(contents)
+
+    def stream(self, contents):
+        return self.router.stream(contents)
+
+    def stats(self):
+        return {"backend": self.name, **self.router.stats()}
+
+class GeminiBackend(RoutedBackend):
+    name = "gemini"
+
+    # One model object per candidate, carrying the system instruction, instead
+    # of pasting the instruction into every prompt. With AURA_GEMINI_CONTEXT_CACHE=1
+    # the instruction is uploaded once as cached content and billed at the cached
+    # rate; models that reject it (e.g. below the minimum cacheable size) fall
+    # back to the inline system_instruction.
+    def __init__(self, candidates, system_instruction, api_key=None):
+        self.system_instruction = system_instruction
+        self.api_key = api_key
+        self._configured = False
+        self.use_context_cache = os.getenv("AURA_GEMINI_CONTEXT_CACHE", "0") == "1"
+        self.context_cache_ttl = int(os.getenv("AURA_GEMINI_CONTEXT_TTL", 3600))
+        self._models = {}   # model_name -> (model, expires_at)
+        self._models_lock = threading.Lock()
+        self.candidates = list(candidates)
+        super().__init__(candidates, self.get_model)
+
+    def load(self):
+        # Model objects are local; this only moves the SDK import and setup
+        # off the first request
+        for model_name in self.candidates:
+            self.get_model(model_name)
+        return True
+
+    def _create_model(self, model_name):
+        import google.generativeai as genai
+        if not self._configured:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+        if self.use_context_cache:
+            try:
+                from google.generativeai import caching
+                cached = caching.CachedContent.create(
+                    model=f"models/{model_name}",
+                    system_instruction=self.system_instruction,
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl),
+                )
+                # Recreate a little before the server drops it
+                return genai.GenerativeModel.from_cached_content(cached), time.monotonic() + self.context_cache_ttl * 0.9
+            except Exception as e:
+                print(f"Context cache unavailable for {model_name}, sending system instruction inline: {e}")
+        return genai.GenerativeModel(model_name, system_instruction=self.system_instruction), float("inf")
+
+    def get_model(self, model_name):
+        with self._models_lock:
+            entry = self._models.get(model_name)
+            if entry is None or time.monotonic() > entry[1]:
+                entry = self._create_model(model_name)
+                self._models[model_name] = entry
+            return entry[0]
+
+class FakeBackend(RoutedBackend):
+    name = "fake"
+
+    def __init__(self, candidates, system_instruction=None):
+        super().__init__(candidates, get_fake_model)
+
+def to_messages(system_instruction, contents):
+    """Gemini contents -> chat-template messages (role user / assistant / system)."""
+    messages = [{"role": "system", "content": system_instruction}] if system_instruction else []
+    for item in contents:
+        role = "assistant" if item["role"] == "model" else "user"
+        messages.append({"role": role, "content": "".join(item["parts"])})
+    return messages
+
+class LocalBackend(LLMBackend):
+    """
+    On-box generation with a small instruction-tuned model, either a GGUF file
+    through llama.cpp (AURA_LOCAL_LLM_GGUF) or a Hugging Face model through
+    transformers (AURA_LOCAL_LLM_MODEL). Replies are capped at
+    AURA_LOCAL_LLM_MAX_TOKENS, which is plenty for 1-2 sentences.
+    """
+    name = "local"
+
+    def __init__(self, system_instruction,
+                 model_name="Qwen/Qwen2.5-0.5B-Instruct", gguf_path=None,
+                 max_new_tokens=80, temperature=0.7, threads=None):
+        self.system_instruction = system_instruction
+        self.model_name = model_name
+        self.gguf_path = gguf_path
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.threads = threads
+        self.model = None
+        self.tokenizer = None
+        # One generation at a time: a CPU model gains nothing from overlapping calls.
+        # Only the generating thread holds it, never the consumer of a stream
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.calls = 0
+        self.chunks = 0
+        self.seconds = 0.0
+
+    def load(self):
+        with self.load_lock:
+            if self.model is None:
+                self._load()
+        return True
+
+    def _load(self):
+        if self.gguf_path:
+            from llama_cpp import Llama
+            print(f"Loading local LLM (llama.cpp): {self.gguf_path}")
+            self.model = Llama(model_path=self.gguf_path, n_ctx=2048,
+                               n_threads=self.threads, verbose=False)
+        else:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            print(f"Loading local LLM (transformers): {self.model_name}")
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModelForCausalLM.from_pretrained(self.model_name, torch_dtype=torch.float32)
+            self.model.eval()
+
+    def stream(self, contents):
+        # Generation runs on its own thread and hands chunks over a queue, so
+        # a consumer that goes away without closing the stream (barge-in,
+        # client disconnect) cannot keep the model lock
+        messages = to_messages(self.system_instruction, contents)
+        chunks = queue.Queue()
+        stop = threading.Event()
+        threading.Thread(target=self._generate, args=(messages, chunks, stop),
+                         name="aura-local-llm", daemon=True).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Closed or abandoned early: generation ends at the next token
+            stop.set()
+
+    def _generate(self, messages, chunks, stop):
+        try:
+            with self.lock:
+                self.load()
+                started = time.monotonic()
+                count = 0
+                source = self._stream_llama(messages) if self.gguf_path else self._stream_transformers(messages, stop)
+                try:
+                    for text in source:
+                        if stop.is_set():
+                            break
+                        count += 1
+                        chunks.put(text)
+                finally:
+                    source.close()
+                    self.calls += 1
+                    self.chunks += count
+                    self.seconds += time.monotonic() - started
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+
+    def _stream_llama(self, messages):
+        for chunk in self.model.create_chat_completion(
+                messages=messages, max_tokens=self.max_new_tokens,
+                temperature=self.temperature, stream=True):
+            text = chunk["choices"][0]["delta"].get("content")
+            if text:
+                yield text
+
+    def _stream_transformers(self, messages, stop):
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+        inputs = self.tokenizer.apply_chat_template(
+            messages, add_generation_prompt=True, return_tensors="pt", return_dict=True)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+        class StopWhenClosed(StoppingCriteria):
+            # The consumer went away (barge-in): end generation at the next token
+            def __call__(self, input_ids, scores, **kwargs):
+                return stop.is_set()
+
+        worker = threading.Thread(target=self.model.generate, kwargs=dict(
+            **inputs, streamer=streamer, max_new_tokens=self.max_new_tokens,
+            do_sample=self.temperature > 0, temperature=self.temperature,
+            pad_token_id=self.tokenizer.eos_token_id,
+            stopping_criteria=StoppingCriteriaList([StopWhenClosed()]),
+        ), daemon=True)
+        worker.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            stop.set()
+            worker.join()
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "model": self.gguf_path or self.model_name,
+            "loaded": self.model is not None,
+            "calls": self.calls,
+            "chunks_per_second": round(self.chunks / self.seconds, 1) if self.seconds else None,
+        }
+
+def create_backend(name, candidates, system_instruction, api_key=None):
+    name = (name or "gemini").lower()
+    if name == "fake":
+        return FakeBackend(candidates, system_instruction)
+    if name == "local":
+        threads = os.getenv("AURA_LOCAL_LLM_THREADS")
+        return LocalBackend(
+            system_instruction,
+            model_name=os.getenv("AURA_LOCAL_LLM_MODEL", "Qwen/Qwen2.5-0.5B-Instruct"),
+            gguf_path=os.getenv("AURA_LOCAL_LLM_GGUF") or None,
+            max_new_tokens=int(os.getenv("AURA_LOCAL_LLM_MAX_TOKENS", 80)),
+            temperature=float(os.getenv("AURA_LOCAL_LLM_TEMPERATURE", 0.7)),
+            threads=int(threads) if threads else None,
+        )
+    if name == "gemini":
+        return GeminiBackend(candidates, system_instruction, api_key)
+    raise ValueError(f"Unknown LLM backend '{name}' (expected gemini, local or fake)")
@@ -0,0 +1,284 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from src.core.tracing import tracer
+
+# Routes each LLM call to the healthiest candidate model instead of always
+# starting at the top of the list:
+# - per-model EWMA latency and error rate decide the order
+# - 429s open a circuit breaker with exponential backoff; 404s take the model
+#   out for a long while; repeated other errors open it too
+# - every request has a deadline; optionally a second model is started when
+#   the first has not answered after `hedge_after` seconds (first reply wins)
+# Model objects come from `factory(model_name)` and only need
+# generate_content(contents, stream=..., request_options=...).
+
+class DeadlineExceeded(Exception):
+    pass
+
+class StreamInterrupted(Exception):
+    """A stream failed after some of the reply had already been yielded."""
+
+def classify_error(error):
+    text = str(error)
+    if "429" in text or "quota" in text.lower() or "exhausted" in text.lower():
+        return "rate_limit"
+    if "404" in text:
+        return "not_found"
+    return "error"
+
+class ModelHealth:
+    def __init__(self, name, priority, alpha=0.2):
+        self.name = name
+        self.priority = priority
+        self.alpha = alpha
+        self.latency = None        # EWMA seconds, None until the first success
+        self.error_rate = 0.0      # EWMA of failures
+        self.failures = 0          # consecutive failures
+        self.open_until = 0.0      # circuit open until (monotonic)
+        self.backoff = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.rate_limits = 0
+
+    def available(self, now):
+        return now >= self.open_until
+
+    def score(self, default_latency):
+        latency = self.latency if self.latency is not None else default_latency
+        # Priority only breaks ties between similar models
+        return latency * (1 + 4 * self.error_rate) + self.priority * 0.05
+
+    def success(self, elapsed):
+        self.calls += 1
+        self.latency = elapsed if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * elapsed
+        self.error_rate *= 1 - self.alpha
+        self.failures = 0
+        self.backoff = 0.0
+        self.open_until = 0.0
+
+    def failure(self, kind, now, base_backoff, max_backoff, failure_threshold):
+        self.calls += 1
+        self.errors += 1
+        self.failures += 1
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+        if kind == "rate_limit":
+            self.rate_limits += 1
+            self.backoff = min(max_backoff, self.backoff * 2 if self.backoff else base_backoff)
+            self.open_until = now + self.backoff
+        elif kind == "not_found":
+            self.backoff = max_backoff
+            self.open_until = now + max_backoff
+        elif self.failures >= failure_threshold:
+            self.backoff = min(max_backoff, self.backoff * 2 if self.backoff else base_backoff)
+            self.open_until = now + self.backoff
+
+    def stats(self, now):
+        return {
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limits": self.rate_limits,
+            "circuit": "open" if not self.available(now) else "closed",
+            "retry_in": round(max(0.0, self.open_until - now), 1),
+        }
+
+class LLMRouter:
+    def __init__(self, models, factory, deadline=20.0, hedge_after=0.0,
+                 base_backoff=5.0, max_backoff=300.0, failure_threshold=3,
+                 default_latency=1.0, workers=8):
+        self.factory = factory
+        self.deadline = deadline
+        # 0 disables hedging
+        self.hedge_after = hedge_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.default_latency = default_latency
+        self.health = {name: ModelHealth(name, i) for i, name in enumerate(models)}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aura-llm")
+        self.hedges = 0
+        self.timeouts = 0
+        # Calls answered (or attempted) by a model other than the first choice
+        self.fallbacks = 0
+
+    def ranked(self):
+        """Available models, healthiest first. With every circuit open, the one that reopens first."""
+        now = time.monotonic()
+        with self.lock:
+            models = list(self.health.values())
+            available = [m for m in models if m.available(now)]
+            if not available:
+                return [min(models, key=lambda m: m.open_until).name]
+            available.sort(key=lambda m: m.score(self.default_latency))
+            return [m.name for m in available]
+
+    def _record(self, name, started, error=None, elapsed=None):
+        now = time.monotonic()
+        with self.lock:
+            health = self.health[name]
+            if error is None:
+                health.success(elapsed if elapsed is not None else now - started)
+            else:
+                health.failure(classify_error(error), now, self.base_backoff,
+                               self.max_backoff, self.failure_threshold)
+
+    def _submit(self, fn, *args):
+        # Keeps the caller's trace for the spans opened in fn
+        return self.pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def _call(self, name, contents, timeout):
+        started = time.monotonic()
+        with tracer.span("llm.call", model=name):
+            try:
+                model = self.factory(name)
+                text = model.generate_content(contents, request_options={"timeout": timeout}).text
+            except Exception as e:
+                self._record(name, started, e)
+                raise
+        self._record(name, started)
+        return text
+
+    def generate(self, contents):
+        """Returns the reply text from the first model that answers within the deadline."""
+        deadline = time.monotonic() + self.deadline
+        order = self.ranked()
+        pending = {}
+        last_error = None
+
+        def launch():
+            name = order.pop(0)
+            future = self._submit(self._call, name, contents, max(1.0, deadline - time.monotonic()))
+            pending[future] = name
+
+        launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            hedge = self.hedge_after > 0 and order
+            done, _ = wait(pending, timeout=min(remaining, self.hedge_after) if hedge else remaining,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if hedge:
+                    with self.lock:
+                        self.hedges += 1
+                    launch()
+                continue
+            for future in done:
+                name = pending.pop(future)
+                if future.exception() is None:
+                    # Slower hedged calls finish in the background and still update health
+                    tracer.annotate(model=name)
+                    return future.result()
+                last_error = future.exception()
+            if not pending and order:
+                with self.lock:
+                    self.fallbacks += 1
+                launch()
+
+        if pending:
+            with self.lock:
+                self.timeouts += 1
+            raise DeadlineExceeded(f"no model answered within {self.deadline}s")
+        raise last_error or DeadlineExceeded("no model available")
+
+    def _open_stream(self, name, contents, timeout):
+        # Blocks until the first chunk with text (or the end of the stream)
+        iterator = iter(self.factory(name).generate_content(
+            contents, stream=True, request_options={"timeout": timeout}))
+        for chunk in iterator:
+            if chunk.text:
+                return chunk.text, iterator
+        return "", iterator
+
+    @staticmethod
+    def _close_stream(future):
+        # A stream given up at the deadline is closed as soon as it opens,
+        # so the backend connection is not left streaming
+        if future.cancelled() or future.exception() is not None:
+            return
+        close = getattr(future.result()[1], "close", None)
+        if close:
+            close()
+
+    def stream(self, contents):
+        """
+        Yields reply chunks. Falls back to the next model only until the
+        first chunk arrives (the deadline applies to that first chunk);
+        after that a failure raises StreamInterrupted, so the caller can
+        tell a cut-off reply from a complete one. Streams are not hedged.
+        """
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+        for attempt, name in enumerate(self.ranked()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                with self.lock:
+                    self.fallbacks += 1
+            started = time.monotonic()
+            future = self._submit(self._open_stream, name, contents, remaining)
+            done, _ = wait([future], timeout=remaining)
+            if not done:
+                if not future.cancel():
+                    future.add_done_callback(self._close_stream)
+                self._record(name, started, DeadlineExceeded(name))
+                tracer.record("llm.first_chunk", time.monotonic() - started, model=name, error="DeadlineExceeded")
+                with self.lock:
+                    self.timeouts += 1
+                break
+            if future.exception() is not None:
+                last_error = future.exception()
+                self._record(name, started, last_error)
+                tracer.record("llm.first_chunk", time.monotonic() - started, model=name, error=type(last_error).__name__)
+                continue
+
+            first, iterator = future.result()
+            # Streams are scored on time to first chunk
+            first_chunk = time.monotonic() - started
+            tracer.record("llm.first_chunk", first_chunk, model=name)
+            try:
+                if first:
+                    yield first
+                for chunk in iterator:
+                    if chunk.text:
+                        yield chunk.text
+            except Exception as e:
+                self._record(name, started, e)
+                raise StreamInterrupted(f"stream from {name} interrupted: {e}") from e
+            finally:
+                # Also when the caller stops reading early (barge-in)
+                self._close_stream(future)
+            self._record(name, started, elapsed=first_chunk)
+            return
+        raise last_error or DeadlineExceeded(f"no model answered within {self.deadline}s")
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                "order": [m.name for m in sorted(self.health.values(), key=lambda m: m.score(self.default_latency))
+                          if m.available(now)],
+                "hedges": self.hedges,
+                "timeouts": self.timeouts,
+                "fallbacks": self.fallbacks,
+                "models": {name: health.stats(now) for name, health in self.health.items()},
+            }
+
+def router_from_env(models, factory):
+    return LLMRouter(
+        models,
+        factory,
+        deadline=float(os.getenv("AURA_LLM_DEADLINE", 20)),
+        hedge_after=float(os.getenv("AURA_LLM_HEDGE_AFTER", 0)),
+        base_backoff=float(os.getenv("AURA_LLM_BACKOFF", 5)),
+        max_backoff=float(os.getenv("AURA_LLM_MAX_BACKOFF", 300)),
+        failure_threshold=int(os.getenv("AURA_LLM_FAILURE_THRESHOLD", 3)),
+    )
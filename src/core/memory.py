@@ -0,0 +1,306 @@
+import contextvars
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.tracing import tracer
+
+# Long-term memory (ChromaDB) kept off the request path:
+# - add() only enqueues; a writer thread upserts in batches
+# - query_async() runs the lookup on a small pool so callers can overlap it
+#   with other pre-LLM work
+# - ids are a content hash, so the same exchange is stored once across restarts
+#   (hash() is randomized per process)
+# - every document carries session_id / kind ("turn" or "summary") / timestamp
+#   metadata; queries only see the caller's session
+# - a compaction thread enforces retention and folds old turns into summaries,
+#   so each session's footprint (and query cost) stays bounded
+# - the Chroma client is opened by open() (at server startup, in the
+#   background); writes queued before that are held until it is ready
+
+DEFAULT_SESSION = "default"
+
+def extractive_summary(documents):
+    """Fallback summarizer: keeps the user side of each exchange, one line each."""
+    lines = []
+    for document in documents:
+        user_part = document.split(" -> AURA:", 1)[0].strip()
+        if user_part and user_part not in lines:
+            lines.append(user_part)
+    return "Earlier conversation summary:\n" + "\n".join(lines)
+
+def memory_id(document):
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()[:32]
+
+class MemoryService:
+    def __init__(self, path="./aura_memory.db", collection_name="user_memory",
+                 batch_size=32, flush_interval=0.5, query_workers=2,
+                 max_age_days=30, compact_after=60, keep_recent=20, group_size=10,
+                 max_summaries=20, compact_interval=600):
+        self.path = path
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_age = max_age_days * 86400
+        self.compact_after = compact_after
+        self.keep_recent = keep_recent
+        self.group_size = group_size
+        self.max_summaries = max_summaries
+        self.compact_interval = compact_interval
+        # Turns a list of "query -> AURA: reply" documents into one document
+        self.summarizer = extractive_summary
+        self.dirty_sessions = set()
+        self.compactions = 0
+        self.deleted = 0
+        self._migrated = False
+        self._stop = threading.Event()
+        self._compactor = None
+        self.pending = queue.Queue()
+        self.query_pool = ThreadPoolExecutor(max_workers=query_workers, thread_name_prefix="aura-memory")
+        self.lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.errors = 0
+        self._closed = False
+        self.client = None
+        self.collection = None
+        self._opened = threading.Event()
+
+        self.writer = threading.Thread(target=self._write_loop, name="aura-memory-writer", daemon=True)
+        self.writer.start()
+
+    def open(self):
+        """Opens the Chroma collection. True on success."""
+        if self._opened.is_set():
+            return self.collection is not None
+        try:
+            import chromadb
+            self.client = chromadb.PersistentClient(path=self.path)
+            self.collection = self.client.get_or_create_collection(name=self.collection_name)
+            print("Memory system initialized.")
+        except Exception as e:
+            print(f"Error initializing memory: {e}")
+            self.client = None
+            self.collection = None
+        self._opened.set()
+        return self.collection is not None
+
+    # Reads
+
+    def query(self, query, n_results=3, session_id=DEFAULT_SESSION):
+        """Returns the session's most relevant stored exchanges joined into one context string."""
+        if not self.collection:
+            return ""
+        try:
+            with tracer.span("memory.query"):
+                results = self.collection.query(query_texts=[query], n_results=n_results,
+                                                where={"session_id": session_id})
+            if results['documents']:
+                return "\n".join(results['documents'][0])
+        except Exception as e:
+            print(f"Error querying memory: {e}")
+        return ""
+
+    def query_async(self, query, n_results=3, session_id=DEFAULT_SESSION):
+        """Starts query() in the background and returns its Future."""
+        return self.query_pool.submit(contextvars.copy_context().run, self.query, query, n_results, session_id)
+
+    # Writes
+
+    def add(self, document, session_id=DEFAULT_SESSION):
+        if self._closed or (self._opened.is_set() and not self.collection):
+            return
+        metadata = {"session_id": session_id, "kind": "turn", "timestamp": time.time()}
+        # Same text in another session is a different memory
+        self.pending.put((memory_id(f"{session_id}|{document}"), document, metadata))
+        with self.lock:
+            self.dirty_sessions.add(session_id)
+
+    def _write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            self._opened.wait()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        if not self.collection:
+            return
+        # Same content twice in one batch -> one row
+        unique = {}
+        for doc_id, document, metadata in batch:
+            unique[doc_id] = (document, metadata)
+        try:
+            ids = list(unique)
+            # upsert: ids are content hashes, so repeats overwrite instead of piling up
+            self.collection.upsert(
+                ids=ids,
+                documents=[unique[i][0] for i in ids],
+                metadatas=[unique[i][1] for i in ids],
+            )
+            with self.lock:
+                self.written += len(ids)
+                self.duplicates += len(batch) - len(ids)
+                self.batches += 1
+        except Exception as e:
+            print(f"Error saving to memory: {e}")
+            with self.lock:
+                self.errors += 1
+
+    # Retention / compaction
+
+    def start(self):
+        if not self.collection or (self._compactor and self._compactor.is_alive()):
+            return
+        self._stop.clear()
+        self._compactor = threading.Thread(target=self._compact_loop, name="aura-memory-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact_loop(self):
+        # Passes only look at sessions written to since the last one, except
+        # for a daily full pass so idle sessions still age out
+        sessions = None
+        last_full_pass = 0.0
+        while True:
+            if sessions is None:
+                last_full_pass = time.monotonic()
+            try:
+                self.compact(sessions)
+            except Exception as e:
+                print(f"Memory compaction failed: {e}")
+            if self._stop.wait(self.compact_interval):
+                return
+            with self.lock:
+                sessions, self.dirty_sessions = self.dirty_sessions, set()
+            if time.monotonic() - last_full_pass > 86400:
+                sessions = None
+
+    def _migrate_legacy(self):
+        # Documents written before sessions existed belong to the default session
+        records = self.collection.get(include=["metadatas"])
+        legacy = [doc_id for doc_id, meta in zip(records["ids"], records["metadatas"]) if not meta or "session_id" not in meta]
+        if legacy:
+            # Retention counts from the migration, not from the epoch
+            now = time.time()
+            self.collection.update(
+                ids=legacy,
+                metadatas=[{"session_id": DEFAULT_SESSION, "kind": "turn", "timestamp": now} for _ in legacy],
+            )
+            print(f"Assigned {len(legacy)} legacy memories to the default session.")
+        self._migrated = True
+
+    def _all_sessions(self):
+        records = self.collection.get(include=["metadatas"])
+        return {meta.get("session_id", DEFAULT_SESSION) for meta in records["metadatas"] if meta}
+
+    def compact(self, sessions=None):
+        """Applies retention and summarizes old turns for the given sessions (all if None)."""
+        if not self.collection:
+            return
+        if not self._migrated:
+            self._migrate_legacy()
+        for session_id in (self._all_sessions() if sessions is None else sessions):
+            self._compact_session(session_id)
+
+    def _session_records(self, session_id, kind):
+        records = self.collection.get(
+            where={"$and": [{"session_id": session_id}, {"kind": kind}]},
+            include=["documents", "metadatas"],
+        )
+        rows = sorted(zip(records["metadatas"], records["ids"], records["documents"]),
+                      key=lambda row: row[0].get("timestamp", 0.0))
+        return [(doc_id, document, meta) for meta, doc_id, document in rows]
+
+    def _compact_session(self, session_id):
+        cutoff = time.time() - self.max_age
+        turns = self._session_records(session_id, "turn")
+        expired = [doc_id for doc_id, _, meta in turns if meta.get("timestamp", 0.0) < cutoff]
+        turns = [row for row in turns if row[2].get("timestamp", 0.0) >= cutoff]
+
+        to_delete = list(expired)
+        if len(turns) > self.compact_after:
+            old = turns[:len(turns) - self.keep_recent]
+            summaries = []
+            for start in range(0, len(old), self.group_size):
+                group = old[start:start + self.group_size]
+                try:
+                    summary = self.summarizer([document for _, document, _ in group])
+                except Exception as e:
+                    print(f"Memory summarizer failed, using extractive summary: {e}")
+                    summary = extractive_summary([document for _, document, _ in group])
+                summaries.append((summary, group[-1][2].get("timestamp", 0.0)))
+                to_delete.extend(doc_id for doc_id, _, _ in group)
+            self.collection.upsert(
+                ids=[memory_id(f"{session_id}|summary|{text}") for text, _ in summaries],
+                documents=[text for text, _ in summaries],
+                metadatas=[{"session_id": session_id, "kind": "summary", "timestamp": ts} for _, ts in summaries],
+            )
+
+        summaries = self._session_records(session_id, "summary")
+        if len(summaries) > self.max_summaries:
+            to_delete.extend(doc_id for doc_id, _, _ in summaries[:len(summaries) - self.max_summaries])
+
+        if to_delete:
+            self.collection.delete(ids=to_delete)
+            with self.lock:
+                self.deleted += len(to_delete)
+                self.compactions += 1
+
+    def close(self, timeout=5):
+        """Flushes queued writes and stops the writer and compactor."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        # Never opened: let the writer drain (and drop) what was queued
+        self._opened.set()
+        self.pending.put(None)
+        self.writer.join(timeout)
+        self.query_pool.shutdown(wait=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.pending.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "duplicates": self.duplicates,
+                "errors": self.errors,
+                "compactions": self.compactions,
+                "deleted": self.deleted,
+            }
+
+# Singleton instance
+memory = MemoryService(
+    path=os.getenv("AURA_MEMORY_PATH", "./aura_memory.db"),
+    batch_size=int(os.getenv("AURA_MEMORY_BATCH", 32)),
+    flush_interval=float(os.getenv("AURA_MEMORY_FLUSH_INTERVAL", 0.5)),
+    max_age_days=float(os.getenv("AURA_MEMORY_MAX_AGE_DAYS", 30)),
+    compact_after=int(os.getenv("AURA_MEMORY_COMPACT_AFTER", 60)),
+    keep_recent=int(os.getenv("AURA_MEMORY_KEEP_RECENT", 20)),
+    group_size=int(os.getenv("AURA_MEMORY_GROUP", 10)),
+    max_summaries=int(os.getenv("AURA_MEMORY_MAX_SUMMARIES", 20)),
+    compact_interval=float(os.getenv("AURA_MEMORY_COMPACT_INTERVAL", 600)),
+)
@@ -0,0 +1,299 @@
+import argparse
+import os
+import secrets
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+# Allow `python src/core/model_server.py` as well as `python -m src.core.model_server`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.readiness import ModelRegistry, ModelUnavailableError
+from src.core.scheduler import scheduler
+
+# Keeps the inference models (Whisper, wav2vec2, distilroberta, Tacotron2)
+# in one process that any number of uvicorn workers share, so HTTP workers
+# scale across cores without each holding its own copy of the weights.
+#
+#   python -m src.core.model_server                      # 127.0.0.1:50600
+#   AURA_MODEL_SERVER=127.0.0.1:50600 uvicorn server:app --workers 4
+#
+# Calls go over a multiprocessing manager connection (local TCP or a Unix
+# socket path); audio travels through shared memory in both directions,
+# only the segment name crosses the socket. Whisper and the emotion models
+# run through the micro-batchers (calls from all workers share batches), TTS
+# on the bounded pool; QueueFullError still becomes a 503 in the worker.
+# Each worker's whisper / audio_emotion pool caps how many of its calls are
+# in flight - raise AURA_WHISPER_WORKERS there to feed bigger batches.
+#
+# The manager unpickles whatever reaches the socket, so connections are
+# authenticated with a secret key: AURA_MODEL_SERVER_KEY, or else a random
+# key the server writes to AURA_MODEL_SERVER_KEY_FILE (~/.aura/model_server.key,
+# mode 0600) on first start and the workers read from there.
+
+DEFAULT_ADDRESS = "127.0.0.1:50600"
+
+def parse_address(value):
+    """"host:port" -> (host, port); anything else is a Unix socket path."""
+    host, sep, port = (value or DEFAULT_ADDRESS).rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return value
+
+def authkey(create=False):
+    """The shared secret; create=True (server) generates the key file if missing."""
+    key = os.getenv("AURA_MODEL_SERVER_KEY")
+    if key:
+        return key.encode("utf-8")
+    path = os.path.expanduser(os.getenv("AURA_MODEL_SERVER_KEY_FILE", "~/.aura/model_server.key"))
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+        except FileExistsError:
+            pass  # Another server created it first
+    try:
+        if os.stat(path).st_mode & 0o077:
+            raise PermissionError(f"{path} must only be readable by its owner (chmod 600)")
+        with open(path) as f:
+            return f.read().strip().encode("utf-8")
+    except FileNotFoundError:
+        # Workers retry this like a server that is not listening yet
+        raise FileNotFoundError(f"No model server key: set AURA_MODEL_SERVER_KEY or start the model server first ({path})")
+
+# Shared memory
+
+def _untrack(shm):
+    # The segment's lifetime is owned by the other process; keep this
+    # process's resource tracker from unlinking it (or warning) at exit
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+def share_array(array):
+    """Copies an array into a new segment; returns (segment, ref). The caller unlinks."""
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def read_array(ref):
+    """Copy of the array behind ref (the segment stays owned by its creator)."""
+    name, shape, dtype = ref
+    shm = shared_memory.SharedMemory(name=name)
+    _untrack(shm)
+    try:
+        return np.ndarray(shape, dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+def read_bytes(ref):
+    """Copy of the bytes behind ref (the segment stays owned by its creator)."""
+    name, size = ref
+    shm = shared_memory.SharedMemory(name=name)
+    _untrack(shm)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+
+# Server side
+
+class ModelService:
+    def __init__(self, wait_timeout=10.0, share_ttl=60.0):
+        from src.output.tts import load_tts_model
+        from src.perception.audio import load_whisper_model, load_audio_emotion_model, load_text_emotion_model
+        self.registry = ModelRegistry(wait_timeout=wait_timeout)
+        self.registry.register("tts", load_tts_model)
+        self.registry.register("whisper", load_whisper_model)
+        self.registry.register("audio_emotion", load_audio_emotion_model, required=False)
+        self.registry.register("text_emotion", load_text_emotion_model, required=False)
+        self.registry.start()
+        # Server -> client segments stay owned (and tracked) here until the
+        # client releases them; ones nobody claims within share_ttl are
+        # unlinked, so a worker that disconnects or times out leaks nothing
+        self.share_ttl = share_ttl
+        self.shared = {}   # name -> (segment, expires_at)
+        self.shared_lock = threading.Lock()
+
+    def _share_bytes(self, data):
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        now = time.monotonic()
+        with self.shared_lock:
+            self.shared[shm.name] = (shm, now + self.share_ttl)
+            expired = [name for name, (_, expires_at) in self.shared.items() if expires_at < now]
+        for name in expired:
+            self.release(name)
+        return shm.name, len(data)
+
+    def release(self, name):
+        """Client done reading a segment returned by this service."""
+        with self.shared_lock:
+            entry = self.shared.pop(name, None)
+        if entry is not None:
+            entry[0].close()
+            entry[0].unlink()
+
+    def _wait(self, component):
+        if not self.registry.wait(component):
+            raise ModelUnavailableError(component, self.registry.components[component].state)
+
+    def _run(self, component, pool, fn, *args):
+        self._wait(component)
+        return scheduler.pool(pool).submit(fn, *args).result()
+
+    def _batched(self, component, batcher, item):
+        # Calls from all workers meet in the same batcher
+        self._wait(component)
+        return batcher.submit(item).result()
+
+    def status(self):
+        return self.registry.status()
+
+    def stats(self):
+        from src.perception.audio import whisper_batcher, audio_emotion_batcher, text_emotion_batcher
+        return {
+            "pools": scheduler.stats(),
+            "batching": {
+                "whisper": whisper_batcher.stats(),
+                "audio_emotion": audio_emotion_batcher.stats(),
+                "text_emotion": text_emotion_batcher.stats(),
+            },
+        }
+
+    def transcribe(self, ref):
+        from src.perception.audio import whisper_batcher
+        return self._batched("whisper", whisper_batcher, read_array(ref))
+
+    def audio_emotion_scores(self, ref):
+        from src.perception.audio import audio_emotion_batcher
+        return self._batched("audio_emotion", audio_emotion_batcher, read_array(ref))
+
+    def text_emotion_scores(self, text):
+        from src.perception.audio import text_emotion_batcher
+        return self._batched("text_emotion", text_emotion_batcher, text)
+
+    def synthesize(self, text):
+        """WAV bytes as a shared-memory ref (release() it after reading), or None. Also lands in the (shared) TTS cache."""
+        from src.output.tts import synthesize
+        wav = self._run("tts", "tts", synthesize, text)
+        return self._share_bytes(wav) if wav else None
+
+class _ModelManager(BaseManager):
+    pass
+
+def serve(address=DEFAULT_ADDRESS):
+    service = ModelService(wait_timeout=float(os.getenv("AURA_MODEL_WAIT", 10)),
+                           share_ttl=float(os.getenv("AURA_MODEL_SHARE_TTL", 60)))
+    _ModelManager.register("models", callable=lambda: service)
+    manager = _ModelManager(address=parse_address(address), authkey=authkey(create=True))
+    server = manager.get_server()
+    print(f"AURA model server listening on {address}")
+    server.serve_forever()
+
+# Client side (inside the FastAPI workers)
+
+class ModelServerClient:
+    """Same call signatures as the in-process model functions used by server.py."""
+
+    def __init__(self, address=DEFAULT_ADDRESS, connect_timeout=30.0):
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self.lock = threading.Lock()
+        self.service = None
+
+    def _models(self):
+        with self.lock:
+            if self.service is None:
+                _ModelManager.register("models")
+                deadline = time.monotonic() + self.connect_timeout
+                while True:
+                    try:
+                        manager = _ModelManager(address=parse_address(self.address), authkey=authkey())
+                        manager.connect()
+                        break
+                    except (ConnectionError, FileNotFoundError):
+                        if time.monotonic() > deadline:
+                            raise
+                        time.sleep(0.5)
+                # Proxies open one connection per calling thread
+                self.service = manager.models()
+            return self.service
+
+    def _with_audio(self, method, audio):
+        if isinstance(audio, str):
+            from src.perception.audio import decode_audio
+            with open(audio, "rb") as f:
+                audio = decode_audio(f.read())
+            if audio is None:
+                return None
+        shm, ref = share_array(np.asarray(audio, dtype=np.float32))
+        try:
+            return getattr(self._models(), method)(ref)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def transcribe_audio(self, audio):
+        return self._with_audio("transcribe", audio) or ""
+
+    def analyze_emotion(self, audio):
+        from src.perception.audio import top_emotion
+        return top_emotion(self.audio_emotion_scores(audio))
+
+    def audio_emotion_scores(self, audio):
+        return self._with_audio("audio_emotion_scores", audio) or {"neutral": 1.0}
+
+    def text_emotion_scores(self, text):
+        return self._models().text_emotion_scores(text)
+
+    def synthesize(self, text):
+        if not text.strip():
+            return None
+        models = self._models()
+        ref = models.synthesize(text)
+        if not ref:
+            return None
+        try:
+            return read_bytes(ref)
+        finally:
+            models.release(ref[0])
+
+    def speak(self, text, return_file=True):
+        """WAV path in the TTS cache (shared with the model server via the filesystem)."""
+        from src.output.tts import TTS_MODEL_NAME, VOICE_PARAMS
+        from src.output.tts_cache import tts_cache
+        key = tts_cache.make_key(TTS_MODEL_NAME, text, VOICE_PARAMS)
+        path = tts_cache.get(key)
+        if path is None:
+            wav = self.synthesize(text)
+            if wav is None:
+                return None
+            # The model server wrote the file; only write it here if it could not
+            path = tts_cache.get(key) or tts_cache.put(key, wav)
+        return path
+
+    def wait_for(self, name, timeout=600.0, poll=0.5):
+        """Readiness loader for the worker's registry: blocks until the server loaded `name`."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            state = self._models().status().get(name, {}).get("state")
+            if state in ("ready", "failed"):
+                return state == "ready"
+            time.sleep(poll)
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AURA model server (shared by FastAPI workers)")
+    parser.add_argument("--address", default=os.getenv("AURA_MODEL_SERVER", DEFAULT_ADDRESS),
+                        help="host:port or a Unix socket path")
+    args = parser.parse_args()
+    serve(args.address)
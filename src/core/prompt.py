@@ -0,0 +1,61 @@
+import os
+
+# Assembles the per-turn LLM input inside a token budget. The static system
+# instruction is not part of it - it is attached to the model object once
+# (see llm_backends.GeminiBackend.get_model) - so every turn only carries:
+#   recent turns (as chat history) + retrieved memory + the current situation
+
+def estimate_tokens(text):
+    # ~4 characters per token for English; good enough for budgeting
+    return max(1, len(text) // 4)
+
+def _truncate(text, tokens):
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:max(0, limit - 3)] + "..."
+
+class PromptBuilder:
+    def __init__(self, budget_tokens=1200, memory_share=0.4):
+        self.budget_tokens = budget_tokens
+        # At most this fraction of the budget goes to retrieved memory
+        self.memory_share = memory_share
+
+    def situation(self, context, query):
+        return (
+            f"Memory Context:\n{context}\n\n"
+            f"Current Situation:\n{query}\n"
+            f"Response:"
+        )
+
+    def build(self, context, query, history=()):
+        """
+        Returns Gemini `contents`: recent turns as alternating user/model
+        messages (newest kept first when over budget), then the current
+        situation with memory context.
+        """
+        budget = self.budget_tokens - estimate_tokens(self.situation("", query))
+        context = _truncate(context or "", max(0, int(self.budget_tokens * self.memory_share)))
+        budget -= estimate_tokens(context) if context else 0
+
+        turns = []
+        for user_text, aura_text in reversed(list(history)):
+            cost = estimate_tokens(user_text) + estimate_tokens(aura_text)
+            if cost > budget:
+                break
+            budget -= cost
+            turns.append((user_text, aura_text))
+        turns.reverse()
+
+        contents = []
+        for user_text, aura_text in turns:
+            contents.append({"role": "user", "parts": [user_text]})
+            contents.append({"role": "model", "parts": [aura_text]})
+        contents.append({"role": "user", "parts": [self.situation(context, query)]})
+        return contents
+
+# Singleton instance
+prompt_builder = PromptBuilder(
+    budget_tokens=int(os.getenv("AURA_PROMPT_TOKENS", 1200)),
+    memory_share=float(os.getenv("AURA_PROMPT_MEMORY_SHARE", 0.4)),
+)
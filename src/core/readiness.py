@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Tracks the heavy components (TTS, Whisper, classifiers, memory, ...) while
+# they load in background threads, so the server accepts connections right
+# away. Each component is pending -> loading -> ready | failed.
+# Requests call wait()/wait_async() with a timeout and then either use the
+# component or degrade; required components gate /readyz.
+
+class ModelUnavailableError(Exception):
+    """Raised when a request needs a component that is not (yet) loaded."""
+    def __init__(self, name, state):
+        super().__init__(f"{name} is {state}")
+        self.name = name
+        self.state = state
+
+    def __reduce__(self):
+        return (ModelUnavailableError, (self.name, self.state))
+
+class Component:
+    def __init__(self, name, loader, required):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = "pending"
+        self.error = None
+        self.started = None
+        self.seconds = None
+        self.event = threading.Event()
+
+    def status(self):
+        return {
+            "state": self.state,
+            "required": self.required,
+            "load_seconds": round(self.seconds, 2) if self.seconds is not None else None,
+            "error": self.error,
+        }
+
+class ModelRegistry:
+    def __init__(self, workers=4, wait_timeout=10.0):
+        self.workers = workers
+        # Default for how long a request waits on a component that is still loading
+        self.wait_timeout = wait_timeout
+        self.components = {}
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def register(self, name, loader, required=True):
+        """loader() raises or returns False on failure."""
+        with self.lock:
+            self.components[name] = Component(name, loader, required)
+
+    def start(self):
+        """Starts every pending loader concurrently; returns immediately."""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aura-load")
+            pending = [c for c in self.components.values() if c.state == "pending"]
+            for component in pending:
+                component.state = "loading"
+        for component in pending:
+            self.executor.submit(self._load, component)
+
+    def _load(self, component):
+        component.started = time.monotonic()
+        print(f"Loading {component.name}...")
+        try:
+            ok = component.loader()
+            component.state = "failed" if ok is False else "ready"
+        except Exception as e:
+            component.state = "failed"
+            component.error = str(e)
+        component.seconds = time.monotonic() - component.started
+        print(f"{component.name}: {component.state} in {component.seconds:.1f}s")
+        component.event.set()
+
+    def ready(self, name):
+        component = self.components.get(name)
+        # Unregistered components are not gated
+        return component is None or component.state == "ready"
+
+    def wait(self, name, timeout=None):
+        """Blocks until `name` finished loading (or timeout). True if it is ready."""
+        component = self.components.get(name)
+        if component is None:
+            return True
+        component.event.wait(self.wait_timeout if timeout is None else timeout)
+        return component.state == "ready"
+
+    async def wait_async(self, name, timeout=None, poll=0.05):
+        # Polls instead of parking a thread per waiting request
+        component = self.components.get(name)
+        if component is None:
+            return True
+        deadline = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        while not component.event.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+        return component.state == "ready"
+
+    async def require(self, name, timeout=None):
+        """wait_async(), raising ModelUnavailableError if the component is not ready."""
+        if not await self.wait_async(name, timeout):
+            raise ModelUnavailableError(name, self.components[name].state)
+
+    def is_ready(self):
+        return all(c.state == "ready" for c in self.components.values() if c.required)
+
+    def status(self):
+        return {name: c.status() for name, c in self.components.items()}
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+# Singleton instance
+models = ModelRegistry(
+    workers=int(os.getenv("AURA_LOAD_WORKERS", 4)),
+    wait_timeout=float(os.getenv("AURA_MODEL_WAIT", 10)),
+)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Settings (env overridable)
+# AURA_CACHE_SIZE           max cached replies (LRU eviction)
+# AURA_CACHE_TTL            seconds a reply stays valid
+# AURA_CACHE_MAX_WORDS      only turns with at most this many words are cached
+#                           (gesture / emotion-only turns have 0 words)
+# AURA_CACHE_CONTEXT_CHARS  how much of the memory context is part of the key:
+#                           0 = ignored (memory is not even queried on a hit),
+#                           -1 = all of it, N = first N characters
+# AURA_CACHE_SHARED         1 = text-free turns (gesture / emotion reactions)
+#                           share replies across sessions; everything else
+#                           is always cached per session
+# AURA_CACHE_SIMILARITY     cosine threshold for the embedding tier, 0 = off
+# AURA_CACHE_EMBED_MODEL    sentence-transformers model used for that tier
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+def normalize_text(text):
+    text = _PUNCTUATION.sub(" ", (text or "").lower())
+    return _SPACES.sub(" ", text).strip()
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl=600, max_words=4, context_chars=0,
+                 similarity=0.0, embed_model="all-MiniLM-L6-v2", shared=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_words = max_words
+        self.context_chars = context_chars
+        self.shared = shared
+        self.similarity = similarity
+        self.embed_model_name = embed_model
+        self.embedder = None
+        self._embedder_lock = threading.Lock()
+        # get() followed by put() for the same miss embeds the same text
+        self._last_embedding = (None, None)
+
+        # key -> (expires_at, response, bucket, text, embedding)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def uses_context(self):
+        return self.context_chars != 0
+
+    def cacheable(self, input_data):
+        return len(normalize_text(input_data.get('text', '')).split()) <= self.max_words
+
+    def _scope(self, input_data):
+        # A reply to what one user said is never served to another one
+        if self.shared and not normalize_text(input_data.get('text', '')):
+            return "*"
+        return input_data.get('session_id') or "default"
+
+    def _bucket(self, input_data, context, history=()):
+        # Everything except the user text must match exactly, including
+        # the conversation so far: "why?" means something else in every one.
+        # Text-free turns (a gesture or emotion reaction) do not depend on it,
+        # so repeating one in a session hits the cache.
+        emotion = (input_data.get('emotion') or 'neutral').lower()
+        gesture = (input_data.get('gesture') or 'none').lower()
+        if self.context_chars < 0:
+            context_key = context
+        else:
+            context_key = context[:self.context_chars]
+        context_hash = hashlib.sha1(context_key.encode("utf-8")).hexdigest() if context_key else ""
+        scope = self._scope(input_data)
+        history_hash = ""
+        if history and normalize_text(input_data.get('text', '')):
+            digest = hashlib.sha1()
+            for user_text, aura_text in history:
+                digest.update(f"{user_text}\0{aura_text}\0".encode("utf-8"))
+            history_hash = digest.hexdigest()
+        return f"{scope}|{emotion}|{gesture}|{context_hash}|{history_hash}"
+
+    def load_embedder(self):
+        with self._embedder_lock:
+            if self.embedder is None:
+                from sentence_transformers import SentenceTransformer
+                self.embedder = SentenceTransformer(self.embed_model_name, device="cpu")
+        return True
+
+    def _embed(self, text):
+        last_text, last_vector = self._last_embedding
+        if last_text == text:
+            return last_vector
+        self.load_embedder()
+        vector = np.asarray(self.embedder.encode(text, normalize_embeddings=True), dtype=np.float32)
+        self._last_embedding = (text, vector)
+        return vector
+
+    def get(self, input_data, context="", semantic=True, history=()):
+        """
+        Returns the cached reply or None. semantic=False is a cheap exact-only
+        probe that does not count as a miss (a full get() is expected next).
+        history: the session's (user, aura) turns before this one.
+        """
+        if not self.cacheable(input_data):
+            return None
+
+        text = normalize_text(input_data.get('text', ''))
+        bucket = self._bucket(input_data, context, history)
+        key = f"{bucket}|{text}"
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.entries[key]
+                self.expirations += 1
+
+        if not semantic:
+            return None
+
+        # Embedding tier: "hey there" vs "hi there" in the same situation
+        if self.similarity > 0 and text:
+            try:
+                vector = self._embed(text)
+            except Exception as e:
+                print(f"Response cache embedding failed: {e}")
+                vector = None
+            if vector is not None:
+                with self.lock:
+                    best_key, best_score = None, self.similarity
+                    for other_key, (expires_at, _, other_bucket, _, other_vector) in self.entries.items():
+                        if other_bucket != bucket or other_vector is None or expires_at <= now:
+                            continue
+                        score = float(np.dot(vector, other_vector))
+                        if score >= best_score:
+                            best_key, best_score = other_key, score
+                    if best_key is not None:
+                        self.entries.move_to_end(best_key)
+                        self.semantic_hits += 1
+                        return self.entries[best_key][1]
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, input_data, context, response, history=()):
+        if not self.cacheable(input_data):
+            return
+
+        text = normalize_text(input_data.get('text', ''))
+        bucket = self._bucket(input_data, context, history)
+        vector = None
+        if self.similarity > 0 and text:
+            try:
+                vector = self._embed(text)
+            except Exception as e:
+                print(f"Response cache embedding failed: {e}")
+
+        with self.lock:
+            key = f"{bucket}|{text}"
+            self.entries[key] = (time.monotonic() + self.ttl, response, bucket, text, vector)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+# Singleton instance
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("AURA_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("AURA_CACHE_TTL", 600)),
+    max_words=int(os.getenv("AURA_CACHE_MAX_WORDS", 4)),
+    context_chars=int(os.getenv("AURA_CACHE_CONTEXT_CHARS", 0)),
+    similarity=float(os.getenv("AURA_CACHE_SIMILARITY", 0)),
+    embed_model=os.getenv("AURA_CACHE_EMBED_MODEL", "all-MiniLM-L6-v2"),
+    shared=os.getenv("AURA_CACHE_SHARED", "0") == "1",
+)
@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.metrics import metrics
+
+# Each model gets its own bounded pool so a slow Whisper or Tacotron2 call
+# never blocks the event loop (or the other models).
+# Defaults can be overridden per model with AURA_<NAME>_WORKERS / AURA_<NAME>_QUEUE,
+# e.g. AURA_TTS_WORKERS=2 AURA_TTS_QUEUE=8
+# Jobs run in a copy of the submitter's context (so tracing spans opened
+# in a job belong to the submitting request).
+DEFAULT_POOLS = {
+    "decode": (2, 8),  # ffmpeg subprocesses
+    "encode": (2, 8),
+    "whisper": (1, 4),
+    "audio_emotion": (1, 4),
+    "text_emotion": (1, 8),
+    "tts": (1, 4),
+    "llm": (4, 16),   # Gemini is network bound, allow more in flight
+    "ace": (2, 8),
+}
+
+pool_wait_seconds = metrics.histogram("aura_pool_wait_seconds", "Time jobs spent queued before a pool worker picked them up", ["pool"])
+
+class QueueFullError(Exception):
+    """Raised when a model pool already has workers + queue_depth jobs pending."""
+    def __init__(self, pool_name):
+        super().__init__(f"{pool_name} queue is full")
+        self.pool_name = pool_name
+
+    def __reduce__(self):
+        # Keeps pool_name when re-raised from the model server process
+        return (QueueFullError, (self.pool_name,))
+
+class ModelPool:
+    def __init__(self, name, workers, queue_depth):
+        self.name = name
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"aura-{name}")
+        self.pending = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_depth
+
+    def submit(self, fn, *args, **kwargs):
+        with self.lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise QueueFullError(self.name)
+            self.pending += 1
+        queued = time.perf_counter()
+
+        def job():
+            pool_wait_seconds.observe(time.perf_counter() - queued, pool=self.name)
+            return fn(*args, **kwargs)
+
+        try:
+            future = self.executor.submit(contextvars.copy_context().run, job)
+        except Exception:
+            self._release()
+            raise
+        # Released when the job really finishes, even if the caller gave up waiting
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _release(self):
+        with self.lock:
+            self.pending -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "pending": self.pending,
+                "rejected": self.rejected,
+            }
+
+class ModelScheduler:
+    def __init__(self, pools=None):
+        self.pools = {}
+        for name, (workers, queue_depth) in (pools or DEFAULT_POOLS).items():
+            env = name.upper()
+            workers = int(os.getenv(f"AURA_{env}_WORKERS", workers))
+            queue_depth = int(os.getenv(f"AURA_{env}_QUEUE", queue_depth))
+            self.pools[name] = ModelPool(name, workers, queue_depth)
+
+    def pool(self, name):
+        return self.pools[name]
+
+    async def run(self, name, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the named pool; raises QueueFullError when saturated."""
+        return await self.pools[name].run(functools.partial(fn, *args, **kwargs))
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+
+# Singleton instance
+scheduler = ModelScheduler()
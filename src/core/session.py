@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Short-term conversation state: the last few turns of every active client,
+# kept in process. Long-term recall stays in memory.py; this is what lets
+# the LLM see "what we were just talking about" without a vector search.
+
+class SessionStore:
+    def __init__(self, max_turns=8, max_sessions=1000, idle_ttl=3600, max_chars=600):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # Each side of a turn is truncated to this many characters
+        self.max_chars = max_chars
+        self.sessions = OrderedDict()   # session_id -> (last_seen, deque of (user, aura))
+        self.lock = threading.Lock()
+
+    def history(self, session_id):
+        """Returns the session's recent (user, aura) turns, oldest first."""
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return []
+            if time.monotonic() - entry[0] > self.idle_ttl:
+                del self.sessions[session_id]
+                return []
+            return list(entry[1])
+
+    def append(self, session_id, user_text, aura_text):
+        turn = (user_text[:self.max_chars], aura_text[:self.max_chars])
+        with self.lock:
+            entry = self.sessions.pop(session_id, None)
+            turns = entry[1] if entry else deque(maxlen=self.max_turns)
+            turns.append(turn)
+            self.sessions[session_id] = (time.monotonic(), turns)
+            # Least recently active sessions go first
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+    def clear(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "turns": sum(len(turns) for _, turns in self.sessions.values()),
+            }
+
+# Singleton instance
+sessions = SessionStore(
+    max_turns=int(os.getenv("AURA_HISTORY_TURNS", 8)),
+    max_sessions=int(os.getenv("AURA_MAX_SESSIONS", 1000)),
+    idle_ttl=float(os.getenv("AURA_SESSION_TTL", 3600)),
+)
@@ -0,0 +1,234 @@
+import collections
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from src.core.metrics import metrics
+
+# Per-request tracing. A trace covers one HTTP request or WebSocket turn;
+# span(name) times one stage inside it (memory query, LLM call, TTS,
+# Whisper, blendshapes, ...). Every span also feeds the
+# aura_stage_seconds{stage} histogram, so stages are visible in /metrics
+# even when they run outside a request (batches, background writes).
+#
+# The current trace travels in a contextvar: asyncio tasks inherit it and
+# ModelPool jobs run in a copy of the caller's context, so spans opened on
+# pool threads land in the right trace. The last AURA_TRACE_KEEP traces
+# are kept for /api/traces; traces slower than AURA_TRACE_SLOW_MS are also
+# printed as one JSON line.
+#
+# Profiling: with AURA_PROFILING=1 (or POST /api/profiling at runtime) a
+# request sent with "X-Aura-Profile: 1" is sampled by SamplingProfiler and
+# its folded stacks are served at /api/traces/<id>/profile.
+
+_trace = contextvars.ContextVar("aura_trace", default=None)
+_span = contextvars.ContextVar("aura_span", default=None)
+
+stage_seconds = metrics.histogram("aura_stage_seconds", "Duration of pipeline stages", ["stage"])
+trace_seconds = metrics.histogram("aura_request_seconds", "Duration of traced requests and turns", ["name"])
+
+class Span:
+    def __init__(self, name, parent, start, attrs):
+        self.name = name
+        self.id = uuid.uuid4().hex[:8]
+        self.parent = parent
+        self.start = start
+        self.duration = None
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.lock = threading.Lock()
+        self.profile = None
+
+    def add(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started": self.started,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "profiled": self.profile is not None,
+            "spans": [{
+                "name": s.name,
+                "id": s.id,
+                "parent": s.parent,
+                "start_ms": round((s.start - self.origin) * 1000, 2),
+                "duration_ms": round(s.duration * 1000, 2) if s.duration is not None else None,
+                "thread": s.thread,
+                "attrs": s.attrs,
+            } for s in spans],
+        }
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread each `interval` seconds and
+    counts them as folded stacks ("outer;inner;leaf count", the input of
+    flamegraph.pl and speedscope). Work runs on pool threads, so all threads
+    are sampled: other requests in flight at the same time show up too.
+    Threads idling in a queue, lock or selector are skipped.
+    """
+    IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="aura-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.folded()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == me or frame.f_code.co_filename.endswith(self.IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+class Tracer:
+    def __init__(self, keep=200, slow_ms=0.0, profiling=False, profile_interval=0.005):
+        self.recent = collections.OrderedDict()
+        self.keep = keep
+        self.slow_ms = slow_ms
+        self.profiling = profiling
+        self.profile_interval = profile_interval
+        self.lock = threading.Lock()
+        # One profile at a time: the sampler sees the whole process
+        self.profile_lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name, profile=False, **attrs):
+        """Starts a trace in the current context (and profiles it when asked and enabled)."""
+        trace = Trace(name, attrs)
+        token = _trace.set(trace)
+        span_token = _span.set(None)
+        profiler = None
+        if profile and self.profiling and self.profile_lock.acquire(blocking=False):
+            profiler = SamplingProfiler(self.profile_interval)
+            profiler.start()
+        try:
+            yield trace
+        except BaseException as e:
+            trace.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            trace.duration = time.perf_counter() - trace.origin
+            if profiler is not None:
+                trace.profile = profiler.stop()
+                self.profile_lock.release()
+            _span.reset(span_token)
+            _trace.reset(token)
+            trace_seconds.observe(trace.duration, name=name)
+            self._keep(trace)
+
+    def _keep(self, trace):
+        with self.lock:
+            self.recent[trace.id] = trace
+            while len(self.recent) > self.keep:
+                self.recent.popitem(last=False)
+        if self.slow_ms and trace.duration * 1000 >= self.slow_ms:
+            print(f"Slow trace: {json.dumps(trace.to_dict())}")
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Times a stage; nests under the current span. Do not hold it across a yield."""
+        span = Span(name, getattr(_span.get(), "id", None), time.perf_counter(), attrs)
+        token = _span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            _span.reset(token)
+            self._finish(span)
+
+    def record(self, name, seconds, **attrs):
+        """A span measured by hand, e.g. across the chunks of a generator."""
+        span = Span(name, getattr(_span.get(), "id", None), time.perf_counter() - seconds, attrs)
+        span.duration = seconds
+        self._finish(span)
+
+    def annotate(self, **attrs):
+        """Adds attributes to the innermost open span (or the trace)."""
+        target = _span.get() or _trace.get()
+        if target is not None:
+            target.attrs.update(attrs)
+
+    def _finish(self, span):
+        stage_seconds.observe(span.duration, stage=span.name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(span)
+
+    def current(self):
+        return _trace.get()
+
+    def get(self, trace_id):
+        with self.lock:
+            return self.recent.get(trace_id)
+
+    def traces(self, limit=50):
+        """Most recent first, without spans."""
+        with self.lock:
+            recent = list(self.recent.values())[-limit:]
+        return [{
+            "trace_id": t.id,
+            "name": t.name,
+            "started": t.started,
+            "duration_ms": round(t.duration * 1000, 2),
+            "spans": len(t.spans),
+            "profiled": t.profile is not None,
+            "attrs": t.attrs,
+        } for t in reversed(recent)]
+
+# Singleton instance
+tracer = Tracer(
+    keep=int(os.getenv("AURA_TRACE_KEEP", 200)),
+    slow_ms=float(os.getenv("AURA_TRACE_SLOW_MS", 0)),
+    profiling=os.getenv("AURA_PROFILING", "0") == "1",
+    profile_interval=float(os.getenv("AURA_PROFILE_INTERVAL_MS", 5)) / 1000,
+)
+span = tracer.span
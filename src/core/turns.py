@@ -0,0 +1,85 @@
+import asyncio
+import itertools
+import threading
+
+# Barge-in: every request that produces a reply (/api/chat, /api/audio,
+# /ws/chat, /ws/audio) is a turn of its session, and a newer turn of the
+# same session cancels the older one wherever it is:
+#   - its asyncio task is cancelled, so it stops at the next await; pool and
+#     batcher jobs it queued are dropped before they start
+#   - work already running on a pool thread watches turn.cancelled (the LLM
+#     token stream, the Audio2Face stream) and stops early
+#   - the connection serving it tells the client to stop playback
+# Turn ids increase across the process, so a client can drop late messages
+# of a turn it has already replaced.
+
+class TurnCancelled(Exception):
+    """Raised when a newer turn of the same session superseded this one."""
+    def __init__(self, session_id, turn_id):
+        super().__init__(f"turn {turn_id} of session {session_id} was superseded")
+        self.session_id = session_id
+        self.turn_id = turn_id
+
+class Turn:
+    def __init__(self, session_id, turn_id):
+        self.session_id = session_id
+        self.id = turn_id
+        self.task = None
+        # Checked by code running on pool threads
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Event loop only. Returns False if the turn was already cancelled."""
+        if self.cancelled.is_set():
+            return False
+        self.cancelled.set()
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        return True
+
+class TurnTracker:
+    def __init__(self):
+        self.current = {}
+        self.ids = itertools.count(1)
+        self.started = 0
+        self.superseded = 0
+
+    def begin(self, session_id):
+        """Starts a new turn for the session, cancelling the one still in flight."""
+        turn = Turn(session_id, next(self.ids))
+        previous = self.current.get(session_id)
+        self.current[session_id] = turn
+        self.started += 1
+        if previous is not None and previous.cancel():
+            self.superseded += 1
+            print(f"Turn {previous.id} of session {session_id} superseded by turn {turn.id}")
+        return turn
+
+    def finish(self, turn):
+        if self.current.get(turn.session_id) is turn:
+            del self.current[turn.session_id]
+
+    async def run(self, turn, coro):
+        """Runs coro as the turn's task; raises TurnCancelled if the turn gets superseded."""
+        if turn.cancelled.is_set():
+            coro.close()
+            raise TurnCancelled(turn.session_id, turn.id)
+        turn.task = asyncio.ensure_future(coro)
+        try:
+            return await turn.task
+        except asyncio.CancelledError:
+            if turn.cancelled.is_set():
+                raise TurnCancelled(turn.session_id, turn.id) from None
+            raise
+        finally:
+            self.finish(turn)
+
+    def stats(self):
+        return {
+            "active": len(self.current),
+            "started": self.started,
+            "superseded": self.superseded,
+        }
+
+# Singleton instance
+turns = TurnTracker()
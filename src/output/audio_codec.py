@@ -0,0 +1,97 @@
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+
+# Delivery formats for reply audio: file extension -> (media type, ffmpeg output args).
+# WAV is always available; the compressed ones need an ffmpeg build with
+# libopus / libmp3lame and can be restricted with AURA_AUDIO_FORMATS.
+FORMATS = {
+    "ogg": ("audio/ogg", ["-c:a", "libopus", "-b:a", "32k", "-f", "ogg"]),
+    "mp3": ("audio/mpeg", ["-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3"]),
+    "wav": ("audio/wav", None),
+}
+
+ENABLED_FORMATS = [f.strip() for f in os.getenv("AURA_AUDIO_FORMATS", "ogg,mp3").split(",") if f.strip() in FORMATS]
+
+# Which Accept media types each format satisfies
+_ACCEPT_TYPES = {
+    "ogg": ("audio/ogg", "audio/opus", "audio/*"),
+    "mp3": ("audio/mpeg", "audio/mp3", "audio/*"),
+    "wav": ("audio/wav", "audio/x-wav", "audio/wave", "audio/*"),
+}
+
+def media_type(ext):
+    return FORMATS[ext][0]
+
+def parse_accept(header):
+    """Returns [(media_type, q)] from an Accept header, parameters other than q dropped."""
+    accepted = []
+    for part in (header or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted.append((fields[0].lower(), q))
+    return accepted
+
+def negotiate(accept_header):
+    """
+    Picks the delivery format for a client. Clients that do not list any
+    audio type get WAV, which is what every browser could always play.
+    Ties go to the smaller format (ogg, then mp3).
+    """
+    accepted = parse_accept(accept_header)
+    best, best_q = "wav", 0.0
+    for ext in ENABLED_FORMATS + ["wav"]:
+        q = max((q for t, q in accepted if t in _ACCEPT_TYPES[ext]), default=0.0)
+        if q > best_q:
+            best, best_q = ext, q
+    return best
+
+def transcode(wav_bytes, ext):
+    """Encodes WAV bytes to ext with ffmpeg; returns None if that fails."""
+    args = FORMATS[ext][1]
+    if args is None:
+        return wav_bytes
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0"] + args + ["pipe:1"]
+    try:
+        return subprocess.run(cmd, input=wav_bytes, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        print(f"Error encoding audio to {ext}: {e.stderr.decode(errors='ignore')[-300:]}")
+    except Exception as e:
+        print(f"Error encoding audio to {ext}: {e}")
+    return None
+
+# TTS cache files are content addressed, so their encodings can be reused
+_encoded = OrderedDict()
+_encoded_lock = threading.Lock()
+ENCODED_CACHE_ENTRIES = 128
+
+def encode_reply(wav_path, ext):
+    """Returns (data, ext) for a reply WAV, falling back to WAV if encoding fails."""
+    key = (os.path.basename(wav_path), ext)
+    with _encoded_lock:
+        if key in _encoded:
+            _encoded.move_to_end(key)
+            return _encoded[key], ext
+
+    with open(wav_path, "rb") as f:
+        wav_bytes = f.read()
+    if ext == "wav":
+        return wav_bytes, "wav"
+    data = transcode(wav_bytes, ext)
+    if not data:
+        return wav_bytes, "wav"
+
+    with _encoded_lock:
+        _encoded[key] = data
+        while len(_encoded) > ENCODED_CACHE_ENTRIES:
+            _encoded.popitem(last=False)
+    return data, ext
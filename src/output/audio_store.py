@@ -0,0 +1,317 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Every reply's audio gets a short-lived id in this store; /audio/<id> reads
+# from it. Entries are pinned until the client has fetched them once, then
+# kept for fetched_ttl seconds (replays, seeking) before the sweeper drops
+# them. Unfetched entries expire after max_age, and the whole store is
+# bounded by max_bytes (fetched entries go first).
+#
+# mode "disk"   - files under directory (hard-linked from the TTS cache when possible),
+#                 the most recent memory_bytes worth also kept in RAM
+# mode "memory" - bytes kept in process, nothing touches disk
+#
+# Ids carry the delivery format: <hex>.wav / <hex>.ogg / <hex>.mp3
+
+# Files older versions left in the working directory
+_LEGACY_FILE = re.compile(r"^(output|temp)_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.wav$")
+
+AUDIO_EXTENSIONS = (".wav", ".ogg", ".mp3")
+
+class AudioEntry:
+    __slots__ = ("size", "created", "fetched_at", "fetches", "path", "data", "etag", "media_type")
+
+    def __init__(self, size, path=None, data=None, etag=None, media_type="audio/wav"):
+        self.size = size
+        self.created = time.monotonic()
+        self.fetched_at = None
+        self.fetches = 0
+        self.path = path
+        self.data = data
+        self.etag = etag
+        self.media_type = media_type
+
+class AudioStore:
+    def __init__(self, mode="disk", directory="audio_store", max_bytes=128 * 1024 * 1024,
+                 max_age=600, fetched_ttl=60, sweep_interval=30, memory_bytes=32 * 1024 * 1024):
+        if mode not in ("disk", "memory"):
+            raise ValueError(f"Unknown audio store mode: {mode}")
+        self.mode = mode
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fetched_ttl = fetched_ttl
+        self.sweep_interval = sweep_interval
+        self.memory_bytes = memory_bytes
+
+        self.entries = OrderedDict()   # audio_id -> AudioEntry, oldest first
+        self.total_bytes = 0
+        self.hot = OrderedDict()       # disk mode: audio_id -> size of entries also held in RAM
+        self.hot_bytes = 0
+        self.lock = threading.Lock()
+        self.added = 0
+        self.fetched = 0
+        self.evicted = 0
+        self.expired_unfetched = 0
+
+        self._stop = threading.Event()
+        self._sweeper = None
+
+        if self.mode == "disk":
+            os.makedirs(self.directory, exist_ok=True)
+
+    def add(self, data=None, path=None, ext="wav", media_type="audio/wav"):
+        """
+        Stores a reply's audio - encoded bytes, or an existing file already in
+        that format - and returns its id.
+        """
+        audio_id = f"{uuid.uuid4().hex}.{ext}"
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        etag = f'"{hashlib.sha1(data).hexdigest()}"'
+
+        if self.mode == "memory":
+            entry = AudioEntry(len(data), data=data, etag=etag, media_type=media_type)
+        else:
+            target = os.path.join(self.directory, audio_id)
+            if path is None:
+                with open(target, "wb") as f:
+                    f.write(data)
+            else:
+                try:
+                    # Zero copy; survives the TTS cache evicting its own name
+                    os.link(path, target)
+                except OSError:
+                    shutil.copyfile(path, target)
+            entry = AudioEntry(len(data), path=target, data=data, etag=etag, media_type=media_type)
+
+        with self.lock:
+            self.entries[audio_id] = entry
+            self.total_bytes += entry.size
+            self.added += 1
+            if self.mode == "disk":
+                self.hot[audio_id] = entry.size
+                self.hot_bytes += entry.size
+                self._trim_hot()
+            victims = self._evict_over_budget()
+        self._delete(victims)
+        return audio_id
+
+    def _trim_hot(self):
+        # Caller holds the lock. Oldest entries fall back to being read from disk.
+        while self.hot_bytes > self.memory_bytes and self.hot:
+            audio_id, size = self.hot.popitem(last=False)
+            self.hot_bytes -= size
+            entry = self.entries.get(audio_id)
+            if entry is not None:
+                entry.data = None
+
+    def get(self, audio_id):
+        """Returns the AudioEntry (path or data set) and marks it fetched, or None."""
+        with self.lock:
+            return self._get(audio_id)
+
+    def read(self, audio_id):
+        """
+        Like get(), but returns (entry, audio bytes) or None. The file is
+        opened under the lock, so the sweeper cannot delete it between the
+        lookup and the read (an open file stays readable after unlink).
+        """
+        with self.lock:
+            entry = self._get(audio_id)
+            if entry is None:
+                return None
+            data = entry.data
+            if data is None:
+                try:
+                    f = open(entry.path, "rb")
+                except FileNotFoundError:
+                    # Removed behind our back (another worker's sweeper)
+                    return None
+        if data is None:
+            with f:
+                data = f.read()
+        return entry, data
+
+    def _get(self, audio_id):
+        # Caller holds the lock
+        entry = self.entries.get(audio_id)
+        if entry is None:
+            return self._foreign_file(audio_id)
+        if entry.fetches == 0:
+            self.fetched += 1
+        entry.fetches += 1
+        entry.fetched_at = time.monotonic()
+        if audio_id in self.hot:
+            self.hot.move_to_end(audio_id)
+        return entry
+
+    def _foreign_file(self, audio_id):
+        # Written by another server worker sharing the directory
+        if self.mode != "disk" or os.path.basename(audio_id) != audio_id:
+            return None
+        path = os.path.join(self.directory, audio_id)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        # Files never change once written, so inode + size + ctime identifies the content
+        entry = AudioEntry(stat.st_size, path=path, etag=f'"{stat.st_ino:x}-{stat.st_size:x}-{int(stat.st_ctime):x}"',
+                           media_type=_media_type(audio_id))
+        entry.fetches = 1
+        return entry
+
+    def _evict_over_budget(self):
+        # Caller holds the lock. Fetched entries first, then oldest unfetched.
+        victims = []
+        if self.total_bytes <= self.max_bytes:
+            return victims
+        for fetched_only in (True, False):
+            for audio_id in list(self.entries):
+                if self.total_bytes <= self.max_bytes or len(self.entries) <= 1:
+                    return victims
+                entry = self.entries[audio_id]
+                if fetched_only and entry.fetches == 0:
+                    continue
+                victims.append(self._pop(audio_id))
+        return victims
+
+    def _pop(self, audio_id):
+        entry = self.entries.pop(audio_id)
+        self.total_bytes -= entry.size
+        self.hot_bytes -= self.hot.pop(audio_id, 0)
+        self.evicted += 1
+        return entry
+
+    def _delete(self, victims):
+        for entry in victims:
+            if entry.path:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def sweep(self):
+        now = time.monotonic()
+        victims = []
+        with self.lock:
+            for audio_id, entry in list(self.entries.items()):
+                if entry.fetched_at is not None:
+                    expired = now - entry.fetched_at > self.fetched_ttl
+                else:
+                    expired = now - entry.created > self.max_age
+                    if expired:
+                        self.expired_unfetched += 1
+                if expired:
+                    victims.append(self._pop(audio_id))
+            known = set(self.entries)
+        self._delete(victims)
+        return len(victims) + self._sweep_orphans(known)
+
+    def _sweep_orphans(self, known):
+        # Files from a previous run (or a worker that died) nobody tracks any more
+        if self.mode != "disk":
+            return 0
+        removed = 0
+        cutoff = time.time() - self.max_age
+        for name in os.listdir(self.directory):
+            if name in known or not name.endswith(AUDIO_EXTENSIONS):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                # ctime: a fresh hard link to an old TTS cache file still counts as new
+                if os.stat(path).st_ctime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def start(self):
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="aura-audio-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Audio store sweep failed: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "mode": self.mode,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "memory_bytes": self.hot_bytes if self.mode == "disk" else self.total_bytes,
+                "unfetched": sum(1 for e in self.entries.values() if e.fetches == 0),
+                "added": self.added,
+                "fetched": self.fetched,
+                "evicted": self.evicted,
+                "expired_unfetched": self.expired_unfetched,
+            }
+
+def _media_type(audio_id):
+    ext = os.path.splitext(audio_id)[1]
+    return {".ogg": "audio/ogg", ".mp3": "audio/mpeg"}.get(ext, "audio/wav")
+
+def parse_range(header, size):
+    """
+    Parses a single "bytes=" Range header into an inclusive (start, end).
+    Returns None when the header is absent or not something we honour
+    (multiple ranges -> full response), raises ValueError when unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[6:].strip().partition("-")
+    try:
+        if not start:
+            # Suffix range: last N bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        raise ValueError(f"bad range: {header}")
+    if start >= size or end < start:
+        raise ValueError(f"unsatisfiable range: {header}")
+    return start, min(end, size - 1)
+
+def cleanup_legacy_files(directory="."):
+    """Deletes output_<uuid>.wav / temp_<uuid>.wav files earlier versions left behind."""
+    removed = 0
+    for name in os.listdir(directory):
+        if _LEGACY_FILE.match(name):
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+# Singleton instance
+audio_store = AudioStore(
+    mode=os.getenv("AURA_AUDIO_STORE_MODE", "disk"),
+    directory=os.getenv("AURA_AUDIO_STORE_DIR", "audio_store"),
+    max_bytes=int(float(os.getenv("AURA_AUDIO_STORE_MB", 128)) * 1024 * 1024),
+    max_age=float(os.getenv("AURA_AUDIO_MAX_AGE", 600)),
+    fetched_ttl=float(os.getenv("AURA_AUDIO_FETCHED_TTL", 60)),
+    sweep_interval=float(os.getenv("AURA_AUDIO_SWEEP_INTERVAL", 30)),
+    memory_bytes=int(float(os.getenv("AURA_AUDIO_MEMORY_MB", 32)) * 1024 * 1024),
+)
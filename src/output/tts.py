@@ -1,47 +1,310 @@
-from TTS.api import TTS
+import collections
+import io
 import os
+import re
 import subprocess
+import threading
+import wave
+import numpy as np
 
-# Global TTS variable
-tts = None
+from src.core.scheduler import scheduler, QueueFullError
+from src.core.tracing import tracer
+from src.output.tts_cache import tts_cache
 
-def load_tts_model():
-    global tts
-    if tts is None:
-        try:
-            # Using a faster/smaller model if possible, or stick to the one requested but handle errors
-            tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=False)
-            print("TTS model loaded.")
-        except Exception as e:
-            print(f"Error loading TTS model: {e}")
-            tts = None
+# Speech engines, selected with AURA_TTS_ENGINE:
+#   tacotron2      Coqui Tacotron2-DDC (default; autoregressive, slow on CPU)
+#   glow_tts       Coqui Glow-TTS (non-autoregressive, flow based)
+#   speedy_speech  Coqui SpeedySpeech (non-autoregressive, smallest)
+#   fast_pitch     Coqui FastPitch (non-autoregressive)
+#   vits           Coqui VITS (non-autoregressive, end to end: no vocoder)
+#   coqui:<model>  any other Coqui model name
+#   piper:<path>   a Piper voice (VITS exported to ONNX, <voice>.onnx with its
+#                  .onnx.json next to it; needs the piper-tts package)
+# benchmarks/tts_engines.py measures real-time factor and memory of each
+# one on the same sentences. Audio is cached per model, so switching
+# engines never serves another voice's audio.
+ENGINES = {
+    "tacotron2": "tts_models/en/ljspeech/tacotron2-DDC",
+    "glow_tts": "tts_models/en/ljspeech/glow-tts",
+    "speedy_speech": "tts_models/en/ljspeech/speedy-speech",
+    "fast_pitch": "tts_models/en/ljspeech/fast_pitch",
+    "vits": "tts_models/en/ljspeech/vits",
+}
+AUTOREGRESSIVE = {"tacotron2"}
 
-import uuid
+class TTSEngine:
+    name = "base"
 
-# ... (imports)
+    def __init__(self, model_name, voice_params=None, autoregressive=False):
+        self.model_name = model_name
+        # Extra synthesis arguments (speaker / language for multi-speaker models)
+        self.voice_params = voice_params or {}
+        self.autoregressive = autoregressive
+        self.sample_rate = None
 
-def speak(text, return_file=False):
-    if not tts:
-        print(f"TTS not available. Text: {text}")
-        return None
+    @property
+    def loaded(self):
+        return self.sample_rate is not None
+
+    def load(self):
+        """Loads the model and sets sample_rate. Raises on failure."""
+        raise NotImplementedError
+
+    def render(self, text):
+        """Returns float32 samples in [-1, 1] at sample_rate."""
+        raise NotImplementedError
+
+    def stats(self):
+        return {
+            "engine": self.name,
+            "model": self.model_name,
+            "autoregressive": self.autoregressive,
+            "loaded": self.loaded,
+            "sample_rate": self.sample_rate,
+        }
+
+class CoquiEngine(TTSEngine):
+    name = "coqui"
+
+    def load(self):
+        # Imported here: Coqui TTS pulls in torch and friends
+        from TTS.api import TTS
+        from src.perception.inference import configure_threads
+        configure_threads()
+        self.model = TTS(model_name=self.model_name, progress_bar=False, gpu=False)
+        self.sample_rate = self.model.synthesizer.output_sample_rate
+
+    def render(self, text):
+        return np.asarray(self.model.tts(text=text, **self.voice_params), dtype=np.float32)
+
+class PiperEngine(TTSEngine):
+    name = "piper"
 
+    def load(self):
+        from piper import PiperVoice
+        self.voice = PiperVoice.load(self.model_name)
+        self.sample_rate = self.voice.config.sample_rate
+
+    def render(self, text):
+        if hasattr(self.voice, "synthesize_stream_raw"):
+            # piper-tts < 1.3: raw 16-bit PCM
+            pcm = b"".join(self.voice.synthesize_stream_raw(text, **self.voice_params))
+            return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
+        chunks = [chunk.audio_float_array for chunk in self.voice.synthesize(text)]
+        return np.concatenate(chunks).astype(np.float32) if chunks else np.zeros(0, np.float32)
+
+def create_engine(spec, voice_params=None):
+    """tacotron2 / vits / ... (see ENGINES), coqui:<model name> or piper:<voice.onnx>."""
+    spec = (spec or "tacotron2").strip()
+    kind, _, target = spec.partition(":")
+    if kind == "piper" and target:
+        return PiperEngine(target, voice_params)
+    if kind == "coqui" and target:
+        return CoquiEngine(target, voice_params, autoregressive="tacotron" in target)
+    if spec not in ENGINES:
+        raise ValueError(f"Unknown TTS engine '{spec}' (expected one of {', '.join(ENGINES)}, coqui:<model> or piper:<path>)")
+    return CoquiEngine(ENGINES[spec], voice_params, autoregressive=spec in AUTOREGRESSIVE)
+
+try:
+    engine = create_engine(os.getenv("AURA_TTS_ENGINE"))
+except ValueError as e:
+    # A bad setting must not keep the server from starting
+    print(f"{e}; using tacotron2.")
+    engine = create_engine("tacotron2")
+# Part of the audio cache key (with VOICE_PARAMS)
+TTS_MODEL_NAME = engine.model_name
+VOICE_PARAMS = engine.voice_params
+_load_lock = threading.Lock()
+# Streaming synthesis: sentences rendered ahead of the one being played,
+# and the size of the PCM chunks handed to the response
+TTS_LOOKAHEAD = int(os.getenv("AURA_TTS_LOOKAHEAD", 2))
+TTS_CHUNK_MS = int(os.getenv("AURA_TTS_CHUNK_MS", 200))
+
+def load_tts_model():
+    with _load_lock:
+        if not engine.loaded:
+            try:
+                engine.load()
+                print(f"TTS model loaded ({engine.name}: {engine.model_name}).")
+            except Exception as e:
+                print(f"Error loading TTS model: {e}")
+    return engine.loaded
+
+def speak(text, return_file=False):
+    """
+    Synthesizes text (or reuses the cached audio for it) and returns the
+    WAV path when return_file is set, otherwise plays it locally.
+    Cached audio is served even while the model is not loaded.
+    """
     try:
-        if return_file:
-            unique_filename = f"output_{uuid.uuid4()}.wav"
-            output_file = unique_filename
-        else:
-            output_file = "output.wav"
-            if os.path.exists(output_file):
-                os.remove(output_file)
-            
-        tts.tts_to_file(text=text, file_path=output_file)
+        key = tts_cache.make_key(TTS_MODEL_NAME, text, VOICE_PARAMS)
+        output_file = tts_cache.get(key)
+        if output_file is None:
+            if not engine.loaded:
+                print(f"TTS not available. Text: {text}")
+                return None
+            wav = render_wav(text)
+            if wav is None:
+                return None
+            with tracer.span("tts.cache_write"):
+                output_file = tts_cache.put(key, wav)
         
         if return_file:
-            return os.path.abspath(output_file)
+            return output_file
         
         # Play audio using afplay (macOS default)
         subprocess.run(["afplay", output_file])
         return None
     except Exception as e:
         print(f"Error in speak: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def synthesize(text):
+    """
+    Returns text as a 16-bit mono WAV (bytes), from the audio cache when
+    possible. None if TTS is unavailable and the text is not cached.
+    """
+    if not text.strip():
+        return None
+
+    key = tts_cache.make_key(TTS_MODEL_NAME, text, VOICE_PARAMS)
+    cached = tts_cache.get(key)
+    if cached:
+        try:
+            with open(cached, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+
+    if not engine.loaded:
+        return None
+    wav = render_wav(text)
+    if wav is not None:
+        try:
+            with tracer.span("tts.cache_write"):
+                tts_cache.put(key, wav)
+        except OSError as e:
+            print(f"Error caching TTS audio: {e}")
+    return wav
+
+def render_wav(text):
+    """Runs the TTS model (no cache) and returns WAV bytes or None."""
+    try:
+        with tracer.span("tts.render", chars=len(text), engine=engine.name) as span:
+            samples = engine.render(text)
+            span.attrs["audio_seconds"] = round(len(samples) / engine.sample_rate, 2)
+        return to_wav_bytes(samples, engine.sample_rate)
+    except Exception as e:
+        print(f"Error in synthesize: {e}")
+        return None
+
+def to_wav_bytes(samples, sample_rate):
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+def wav_to_pcm(wav):
+    """WAV bytes -> (16-bit mono PCM bytes, sample rate)."""
+    with wave.open(io.BytesIO(wav), "rb") as wf:
+        return wf.readframes(wf.getnframes()), wf.getframerate()
+
+def split_sentences(text, min_chars=8):
+    buffer = SentenceBuffer(min_chars)
+    return buffer.feed(text) + buffer.flush()
+
+class PcmStream:
+    """
+    Streams text as raw 16-bit little-endian mono PCM, sentence by sentence.
+    Up to `lookahead` sentences are queued on the "tts" pool ahead of the
+    one being played, so the first chunk is ready once the first sentence
+    is rendered and later sentences are (usually) done by the time they
+    are needed. With the default single TTS worker sentences render in
+    order; AURA_TTS_WORKERS > 1 renders them in parallel (only for models
+    that tolerate concurrent calls - Tacotron2 does not).
+
+    sample_rate is known once the first chunk has been produced. Closing
+    the iterator early (client gone, barge-in) drops the sentences that
+    have not started yet.
+    """
+    def __init__(self, text, synthesize_fn=None, lookahead=TTS_LOOKAHEAD, chunk_ms=TTS_CHUNK_MS):
+        self.sentences = split_sentences(text)
+        # Model server mode passes the client's synthesize
+        self.synthesize_fn = synthesize_fn or synthesize
+        self.lookahead = max(1, lookahead)
+        self.chunk_ms = chunk_ms
+        self.sample_rate = None
+        self.pending = collections.deque()
+        self.submitted = 0
+
+    def _fill(self):
+        pool = scheduler.pool("tts")
+        while self.submitted < len(self.sentences) and len(self.pending) < self.lookahead:
+            try:
+                future = pool.submit(self.synthesize_fn, self.sentences[self.submitted])
+            except QueueFullError:
+                if self.pending:
+                    return  # Try again once a queued sentence is done
+                raise
+            self.pending.append(future)
+            self.submitted += 1
+
+    def __iter__(self):
+        try:
+            self._fill()
+            while self.pending:
+                wav = self.pending.popleft().result()
+                self._fill()
+                if not wav:
+                    continue
+                pcm, sample_rate = wav_to_pcm(wav)
+                if self.sample_rate is None:
+                    self.sample_rate = sample_rate
+                step = max(2, sample_rate * self.chunk_ms // 1000 * 2)
+                for start in range(0, len(pcm), step):
+                    yield pcm[start:start + step]
+        finally:
+            self.close()
+
+    def close(self):
+        # Nothing more gets queued, even by an iteration still in progress
+        self.submitted = len(self.sentences)
+        while self.pending:
+            self.pending.popleft().cancel()
+
+# Sentence end: . ! ? (optionally followed by quotes/brackets) and whitespace
+_SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+class SentenceBuffer:
+    """
+    Accumulates streamed LLM text and hands back complete sentences as soon
+    as they end, so each one can be synthesized without waiting for the
+    rest of the reply.
+    """
+    def __init__(self, min_chars=8):
+        # Very short fragments ("Hi." / "Oh!") are merged with the next
+        # sentence - Tacotron2 handles them poorly on their own.
+        self.min_chars = min_chars
+        self.pending = ""
+
+    def feed(self, text):
+        self.pending += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self.pending):
+            candidate = self.pending[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.pending = self.pending[start:]
+        return sentences
+
+    def flush(self):
+        rest = self.pending.strip()
+        self.pending = ""
+        return [rest] if rest else []
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+# Synthesized speech is stored as <sha256>.wav where the hash covers
+# (model name, text, voice params), so the same sentence is only ever
+# synthesized once per model/voice. Least recently used files are deleted
+# once the directory grows past max_bytes.
+#
+# Several processes may share the directory (uvicorn workers next to a
+# model server): files another process wrote are picked up on lookup, and
+# only the process with evict=True deletes files - the others would evict
+# by their own, partial view of the directory.
+
+class TTSCache:
+    def __init__(self, directory="tts_cache", max_bytes=256 * 1024 * 1024, evict=True):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.evict = evict
+        self.lock = threading.Lock()
+        self.files = OrderedDict()   # key -> size, oldest first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".wav"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        # Recency survives restarts through mtime (touched on every hit)
+        for _, key, size in sorted(entries):
+            self.files[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def make_key(model_name, text, params=None):
+        text = " ".join(text.split())
+        payload = json.dumps([model_name, text, params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def owns(self, filename):
+        """True if filename (a basename) is an entry of this cache."""
+        return filename.endswith(".wav") and filename[:-4] in self.files
+
+    def get(self, key):
+        """Returns the cached file path or None."""
+        path = self.path(key)
+        with self.lock:
+            if key not in self.files:
+                try:
+                    # Written by another process sharing the directory
+                    self.files[key] = os.path.getsize(path)
+                    self.total_bytes += self.files[key]
+                except OSError:
+                    self.misses += 1
+                    return None
+            self.files.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back
+            with self.lock:
+                self.total_bytes -= self.files.pop(key, 0)
+            return None
+        return path
+
+    def put(self, key, wav_bytes):
+        path = self.path(key)
+        # Write then rename, so readers never see half a file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(wav_bytes)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.total_bytes -= self.files.pop(key, 0)
+            self.files[key] = len(wav_bytes)
+            self.total_bytes += len(wav_bytes)
+            evicted = []
+            while self.evict and self.total_bytes > self.max_bytes and len(self.files) > 1:
+                old_key, size = self.files.popitem(last=False)
+                self.total_bytes -= size
+                self.evictions += 1
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            try:
+                os.remove(self.path(old_key))
+            except FileNotFoundError:
+                pass
+        return path
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.files),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Singleton instance
+tts_cache = TTSCache(
+    directory=os.getenv("AURA_TTS_CACHE_DIR", "tts_cache"),
+    max_bytes=int(float(os.getenv("AURA_TTS_CACHE_MB", 256)) * 1024 * 1024),
+)
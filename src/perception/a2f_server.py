@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+from concurrent import futures
+
+import grpc
+import numpy as np
+
+# Allow `python src/perception/a2f_server.py` as well as `python -m src.perception.a2f_server`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.perception.nv_ace import load_protocol, BlendshapeStream, BLENDSHAPE_NAMES
+
+# Local stand-in for the Audio2Face service (protos/aura_a2f.proto).
+# Generates frames with the same energy-based model the client falls back
+# to, streaming them back as audio arrives. --latency-ms adds an artificial
+# per-chunk delay so load tests can mimic a remote GPU service.
+
+def make_servicer(latency_ms=0):
+    messages, services = load_protocol()
+
+    class Audio2FaceStandIn(services.Audio2FaceStreamServicer):
+        def StreamAudio(self, request_iterator, context):
+            first = next(request_iterator, None)
+            if first is None or not first.HasField("header"):
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "first message must be an AudioHeader")
+            header = first.header
+            fps = header.fps or 60
+            stream = BlendshapeStream(header.sample_rate, fps)
+            sent_names = False
+
+            for chunk in request_iterator:
+                if latency_ms:
+                    time.sleep(latency_ms / 1000)
+                samples = np.frombuffer(chunk.pcm, "<i2").astype(np.float32) / 32768.0
+                first_frame = stream.frames
+                weights = stream.feed(samples)
+                if not len(weights):
+                    continue
+                yield messages.BlendshapeFrames(
+                    names=[] if sent_names else BLENDSHAPE_NAMES,
+                    fps=fps,
+                    first_frame=first_frame,
+                    frame_count=len(weights),
+                    weights=weights.ravel().tolist(),
+                )
+                sent_names = True
+
+    return Audio2FaceStandIn()
+
+def serve(port=50051, workers=8, latency_ms=0):
+    _, services = load_protocol()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers))
+    services.add_Audio2FaceStreamServicer_to_server(make_servicer(latency_ms), server)
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    print(f"Audio2Face stand-in listening on port {port} ({workers} workers)")
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Audio2Face stand-in server")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    serve(args.port, args.workers, args.latency_ms).wait_for_termination()
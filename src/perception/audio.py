@@ -1,63 +1,121 @@
-import whisper
-import torchaudio
-import torch
+import subprocess
+import threading
+import numpy as np
 
-# Monkeypatch torchaudio.list_audio_backends for speechbrain compatibility
-if not hasattr(torchaudio, "list_audio_backends"):
-    torchaudio.list_audio_backends = lambda: ["soundfile"] # Mock return
+from src.core.batcher import batcher_from_env
+from src.core.tracing import tracer
+from src.perception.inference import profile_for, build_whisper, build_pipeline
 
-import speechbrain as sb
-from speechbrain.inference.classifiers import EncoderClassifier
-import os
-from transformers import pipeline
+# whisper / torch / transformers are imported by the loaders, not at module
+# import, so the server can start accepting connections while they load.
+
+# Both Whisper and wav2vec2-superb-er expect 16 kHz mono
+SAMPLE_RATE = 16000
+
+WHISPER_MODEL = "tiny"
+AUDIO_EMOTION_MODEL = "superb/wav2vec2-base-superb-er"
+TEXT_EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
 
 # Global model variables
 model = None
 emotion_model = None
 text_emotion_classifier = None
+# Inference profile each model actually runs with (see inference.py)
+active_profiles = {}
 
-def load_audio_models():
-    global model, emotion_model
-    if model is None:
-        try:
-            print("Loading Whisper model (tiny)...")
-            model = whisper.load_model("tiny")
-            print("Whisper model loaded.")
-        except Exception as e:
-            print(f"Error loading Whisper model: {e}")
-            model = None
+# A request that arrives while a model is loading waits for that load
+# instead of starting a second one
+_load_lock = threading.Lock()
+_emotion_load_lock = threading.Lock()
+_text_load_lock = threading.Lock()
 
+def load_whisper_model():
+    global model
+    with _load_lock:
+        if model is None:
+            try:
+                profile = profile_for("whisper")
+                print(f"Loading Whisper model ({WHISPER_MODEL}, {profile})...")
+                model, active_profiles["whisper"] = build_whisper(WHISPER_MODEL, profile)
+                print("Whisper model loaded.")
+            except Exception as e:
+                print(f"Error loading Whisper model: {e}")
+                model = None
+    return model is not None
 
-    if emotion_model is None:
-        try:
-            print("Loading Audio Emotion model (Transformers)...")
-            from transformers import pipeline
-            # Use a robust model from HuggingFace
-            emotion_model = pipeline("audio-classification", model="superb/wav2vec2-base-superb-er")
-            print("Audio Emotion model loaded (Transformers).")
-        except Exception as e:
-            print(f"Error loading Audio Emotion model: {e}")
-            emotion_model = None
+def load_audio_emotion_model():
+    global emotion_model
+    with _emotion_load_lock:
+        if emotion_model is None:
+            try:
+                profile = profile_for("audio_emotion")
+                print(f"Loading Audio Emotion model (Transformers, {profile})...")
+                # Use a robust model from HuggingFace
+                emotion_model, active_profiles["audio_emotion"] = build_pipeline(
+                    "audio-classification", AUDIO_EMOTION_MODEL, profile)
+                print("Audio Emotion model loaded (Transformers).")
+            except Exception as e:
+                print(f"Error loading Audio Emotion model: {e}")
+                emotion_model = None
+    return emotion_model is not None
+
+def load_audio_models():
+    whisper_ok = load_whisper_model()
+    emotion_ok = load_audio_emotion_model()
+    return whisper_ok and emotion_ok
 
 def load_text_emotion_model():
     global text_emotion_classifier
-    if text_emotion_classifier is None:
-        try:
-            print("Loading text emotion model...")
-            text_emotion_classifier = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=1)
-            print("Text emotion model loaded.")
-        except Exception as e:
-            print(f"Error loading Text Emotion model: {e}")
-            text_emotion_classifier = None
+    with _text_load_lock:
+        if text_emotion_classifier is None:
+            try:
+                profile = profile_for("text_emotion")
+                print(f"Loading text emotion model ({profile})...")
+                text_emotion_classifier, active_profiles["text_emotion"] = build_pipeline(
+                    "text-classification", TEXT_EMOTION_MODEL, profile, top_k=None)
+                print("Text emotion model loaded.")
+            except Exception as e:
+                print(f"Error loading Text Emotion model: {e}")
+                text_emotion_classifier = None
+    return text_emotion_classifier is not None
+
+def decode_audio(data, sample_rate=SAMPLE_RATE):
+    """
+    Decodes an uploaded clip (webm/ogg from MediaRecorder, wav, ...) straight
+    from memory into a mono float32 array, the same way whisper.load_audio
+    does for files. The array can be handed to both transcribe_audio and
+    analyze_emotion without copying. Returns None if ffmpeg fails.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+        "pipe:1"
+    ]
+    try:
+        with tracer.span("audio.decode", bytes=len(data)):
+            out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        print(f"Error decoding audio: {e.stderr.decode(errors='ignore')[-300:]}")
+        return None
+    except Exception as e:
+        print(f"Error decoding audio: {e}")
+        return None
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
 
 def transcribe_audio_file(file_path):
-    global model
+    return transcribe_audio(file_path)
+
+def transcribe_audio(audio):
+    """audio: a file path or a 16 kHz float32 array from decode_audio."""
     if model is None:
-        load_audio_models()
+        load_whisper_model()
     
     if model:
         try:
-            result = model.transcribe(file_path)
+            # fp16 is a GPU-only path; on CPU it only triggers a warning
+            with tracer.span("whisper.transcribe"):
+                result = model.transcribe(audio, fp16=False)
             return result["text"]
         except Exception as e:
             print(f"Error transcribing file: {e}")
@@ -65,28 +123,121 @@ def transcribe_audio_file(file_path):
     return ""
 
 def analyze_emotion_file(file_path):
-    global emotion_model
+    return analyze_emotion(file_path)
+
+def analyze_emotion(audio):
+    """audio: a file path or a 16 kHz float32 array from decode_audio."""
     if emotion_model is None:
-        load_audio_models()
+        load_audio_emotion_model()
         
     if emotion_model:
         try:
             # Classify using Transformers Pipeline
             # Returns list of dicts: [{'score': 0.9, 'label': 'neutral'}, ...]
-            preds = emotion_model(file_path)
+            with tracer.span("audio_emotion.classify"):
+                preds = emotion_model(audio)
             # Get top prediction
-            top_pred = preds[0]
-            label = top_pred['label']
-            
-            # Map labels if needed (Superb model uses abbreviations)
-            label_map = {
-                "neu": "neutral",
-                "hap": "happy",
-                "ang": "angry",
-                "sad": "sad",
-            }
-            return label_map.get(label, label)
+            label = preds[0]['label']
+            return AUDIO_EMOTION_LABELS.get(label, label)
         except Exception as e:
             print(f"Audio Emotion classification failed: {e}")
             return "neutral"
-    return "neutral"
\ No newline at end of file
+    return "neutral"
+
+# Map labels if needed (Superb model uses abbreviations)
+AUDIO_EMOTION_LABELS = {
+    "neu": "neutral",
+    "hap": "happy",
+    "ang": "angry",
+    "sad": "sad",
+}
+
+# distilroberta labels -> the face-api names the rest of AURA uses
+TEXT_EMOTION_LABELS = {
+    "neutral": "neutral",
+    "joy": "happy",
+    "sadness": "sad",
+    "anger": "angry",
+    "surprise": "surprised",
+    "fear": "fearful",
+    "disgust": "disgusted",
+}
+
+def top_emotion(scores):
+    return max(scores, key=scores.get) if scores else "neutral"
+
+def classify_text_emotion(text):
+    """Top emotion label for a piece of text ("neutral" without the model)."""
+    return top_emotion(text_emotion_scores_batch([text])[0])
+
+# Batched variants, used through the micro-batchers below. Each takes a list
+# of inputs and returns one result per input, in order.
+
+def transcribe_batch(audios):
+    """
+    Clips up to 30 s are padded to Whisper's window and decoded as one
+    batch; longer clips (and file paths) go through transcribe() one by one.
+    """
+    if model is None:
+        load_whisper_model()
+    if not model:
+        return [""] * len(audios)
+
+    import torch
+    import whisper
+    results = [""] * len(audios)
+    short = [i for i, audio in enumerate(audios)
+             if not isinstance(audio, str) and len(audio) <= whisper.audio.N_SAMPLES]
+    for i in range(len(audios)):
+        if i not in short:
+            results[i] = transcribe_audio(audios[i])
+    if not short:
+        return results
+
+    if len(short) == 1:
+        results[short[0]] = transcribe_audio(audios[short[0]])
+        return results
+    with tracer.span("whisper.batch", size=len(short)):
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(audios[i], dtype=np.float32)))
+            for i in short
+        ]).to(model.device)
+        decoded = whisper.decode(model, mels, whisper.DecodingOptions(fp16=False))
+    for i, result in zip(short, decoded):
+        results[i] = result.text
+    return results
+
+# The emotion batchers return every label's score ({"happy": 0.7, ...}),
+# which is what perception fusion (fusion.py) needs
+
+def audio_emotion_scores_batch(audios):
+    if emotion_model is None:
+        load_audio_emotion_model()
+    if not emotion_model:
+        return [{"neutral": 1.0} for _ in audios]
+    # Only clips of the same length share a forward pass. Padding would change
+    # the scores: wav2vec2-base normalizes over the whole (padded) input and
+    # takes no attention mask, so a clip must score the same as it would alone.
+    groups = {}
+    for index, audio in enumerate(audios):
+        groups.setdefault(len(audio), []).append(index)
+    scores = [None] * len(audios)
+    with tracer.span("audio_emotion.batch", size=len(audios), groups=len(groups)):
+        for indices in groups.values():
+            preds = emotion_model([audios[i] for i in indices], batch_size=len(indices))
+            for i, pred in zip(indices, preds):
+                scores[i] = {AUDIO_EMOTION_LABELS.get(p["label"], p["label"]): p["score"] for p in pred}
+    return scores
+
+def text_emotion_scores_batch(texts):
+    if text_emotion_classifier is None:
+        load_text_emotion_model()
+    if not text_emotion_classifier:
+        return [{"neutral": 1.0} for _ in texts]
+    with tracer.span("text_emotion.batch", size=len(texts)):
+        preds = text_emotion_classifier(list(texts), batch_size=len(texts), truncation=True)
+    return [{TEXT_EMOTION_LABELS.get(p["label"], p["label"]): p["score"] for p in pred} for pred in preds]
+
+whisper_batcher = batcher_from_env("whisper", transcribe_batch, max_batch=8, max_wait_ms=10)
+audio_emotion_batcher = batcher_from_env("audio_emotion", audio_emotion_scores_batch, max_batch=8, max_wait_ms=10)
+text_emotion_batcher = batcher_from_env("text_emotion", text_emotion_scores_batch, max_batch=32, max_wait_ms=5)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.perception.audio import top_emotion
+
+# Perception fusion: one emotion per turn from what the user said (text
+# emotion model on the transcript or typed message), how they said it
+# (audio emotion model on the voice) and how they looked (face-api label
+# or expression scores from the browser). Each source gives scores over
+# EMOTIONS; they are combined as a weighted average (AURA_EMOTION_WEIGHTS,
+# e.g. "text=0.4,audio=0.35,face=0.25"), renormalized over the sources
+# present.
+#
+# Per session, the last reading of every source is kept for
+# AURA_EMOTION_TTL seconds and keeps contributing, with a weight fading to
+# zero over that time: a typed message still takes the tone of voice heard
+# a moment ago into account, and a face-triggered turn with no text runs no
+# model at all. A message identical to the last one scored in the session
+# reuses its text scores.
+
+EMOTIONS = ("neutral", "happy", "sad", "angry", "surprised", "fearful", "disgusted")
+SOURCES = ("text", "audio", "face")
+DEFAULT_WEIGHTS = {"text": 0.4, "audio": 0.35, "face": 0.25}
+
+def parse_weights(value):
+    """"text=0.5,face=0.5" -> {"text": 0.5, "audio": 0.0, "face": 0.5}; empty -> defaults."""
+    if not value:
+        return dict(DEFAULT_WEIGHTS)
+    weights = {source: 0.0 for source in SOURCES}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in weights:
+            raise ValueError(f"unknown emotion source '{name.strip()}'")
+        weights[name.strip()] = float(weight)
+    return weights
+
+def normalize(scores):
+    """Keeps known labels and scales them to sum to 1 ({} if nothing is left)."""
+    kept = {label: max(0.0, float(score)) for label, score in (scores or {}).items() if label in EMOTIONS}
+    total = sum(kept.values())
+    return {label: score / total for label, score in kept.items()} if total > 0 else {}
+
+class SessionEmotion:
+    def __init__(self):
+        self.readings = {}      # source -> (scores, monotonic time)
+        self.text = None        # last scored text and its scores
+        self.text_scores = None
+        self.last_seen = time.monotonic()
+        self.fused = None
+
+class EmotionFusion:
+    def __init__(self, weights=None, ttl=30.0, max_sessions=1000, idle_ttl=3600):
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.fusions = 0
+        self.text_reused = 0
+
+    def _session(self, session_id):
+        # Caller holds the lock
+        state = self.sessions.pop(session_id, None)
+        now = time.monotonic()
+        if state is None or now - state.last_seen > self.idle_ttl:
+            state = SessionEmotion()
+        state.last_seen = now
+        self.sessions[session_id] = state
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return state
+
+    def cached_text_scores(self, session_id, text):
+        """Text scores from the session's last turn if the text is the same, else None."""
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is not None and state.text == text and state.text_scores is not None:
+                self.text_reused += 1
+                return state.text_scores
+        return None
+
+    def fuse(self, session_id, text=None, text_scores=None, audio_scores=None, face=None, face_scores=None):
+        """
+        Records this turn's readings and returns the fused emotion:
+          {"emotion", "confidence", "scores", "sources": {source: label}}
+        face is a label (face-api's dominant expression); face_scores, when
+        the client sends them, take precedence.
+        """
+        readings = {
+            "text": normalize(text_scores),
+            "audio": normalize(audio_scores),
+            "face": normalize(face_scores) or normalize({face: 1.0} if face else None),
+        }
+        now = time.monotonic()
+        with self.lock:
+            state = self._session(session_id)
+            for source, scores in readings.items():
+                if scores:
+                    state.readings[source] = (scores, now)
+            if text_scores is not None:
+                state.text, state.text_scores = text, text_scores
+
+            fused = dict.fromkeys(EMOTIONS, 0.0)
+            total = 0.0
+            sources = {}
+            for source, (scores, seen) in list(state.readings.items()):
+                age = now - seen
+                if age >= self.ttl:
+                    del state.readings[source]
+                    continue
+                # Readings from earlier turns fade out over ttl
+                weight = self.weights.get(source, 0.0) * (1.0 - age / self.ttl)
+                if weight <= 0:
+                    continue
+                for label, score in scores.items():
+                    fused[label] += weight * score
+                total += weight
+                sources[source] = top_emotion(scores)
+
+            if total > 0:
+                fused = {label: round(score / total, 4) for label, score in fused.items()}
+            else:
+                fused = {"neutral": 1.0}
+            emotion = top_emotion(fused)
+            state.fused = {"emotion": emotion, "confidence": fused[emotion], "scores": fused, "sources": sources}
+            self.fusions += 1
+            return state.fused
+
+    def state(self, session_id):
+        """Last fused emotion of the session, or None."""
+        with self.lock:
+            state = self.sessions.get(session_id)
+            return state.fused if state is not None else None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "weights": self.weights,
+                "ttl": self.ttl,
+                "sessions": len(self.sessions),
+                "fusions": self.fusions,
+                "text_reused": self.text_reused,
+            }
+
+def _weights_from_env():
+    try:
+        return parse_weights(os.getenv("AURA_EMOTION_WEIGHTS"))
+    except ValueError as e:
+        # A bad setting must not keep the server from starting
+        print(f"Invalid AURA_EMOTION_WEIGHTS ({e}), using the defaults.")
+        return dict(DEFAULT_WEIGHTS)
+
+# Singleton instance
+perception = EmotionFusion(
+    weights=_weights_from_env(),
+    ttl=float(os.getenv("AURA_EMOTION_TTL", 30)),
+    max_sessions=int(os.getenv("AURA_MAX_SESSIONS", 1000)),
+    idle_ttl=float(os.getenv("AURA_SESSION_TTL", 3600)),
+)
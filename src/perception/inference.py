@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+
+# CPU inference profiles for the perception models:
+#   fp32     eager PyTorch, as loaded (default)
+#   int8     dynamic int8 quantization of the Linear layers
+#   onnx     ONNX Runtime through optimum (transformers models; exported once
+#            to AURA_ONNX_DIR and reused)
+#   compile  torch.compile
+# Per model with AURA_<NAME>_PROFILE (WHISPER, AUDIO_EMOTION, TEXT_EMOTION),
+# or for all of them with AURA_INFERENCE_PROFILE. A profile that cannot be
+# applied (missing package, unsupported model) falls back to fp32 with a
+# warning, so a bad setting never keeps a model from loading.
+#
+# Threads: AURA_TORCH_THREADS / AURA_TORCH_INTEROP_THREADS for PyTorch,
+# AURA_ONNX_THREADS for ONNX Runtime sessions.
+
+PROFILES = ("fp32", "int8", "onnx", "compile")
+
+ONNX_DIR = os.getenv("AURA_ONNX_DIR", "./onnx_models")
+
+_threads_configured = False
+_threads_lock = threading.Lock()
+
+def profile_for(name):
+    profile = (os.getenv(f"AURA_{name.upper()}_PROFILE") or os.getenv("AURA_INFERENCE_PROFILE") or "fp32").lower()
+    if profile not in PROFILES:
+        print(f"Unknown inference profile '{profile}' for {name}, using fp32.")
+        return "fp32"
+    return profile
+
+def configure_threads():
+    """Applies the PyTorch thread settings once per process (before the first model runs)."""
+    global _threads_configured
+    with _threads_lock:
+        if _threads_configured:
+            return
+        _threads_configured = True
+        import torch
+        threads = os.getenv("AURA_TORCH_THREADS")
+        interop = os.getenv("AURA_TORCH_INTEROP_THREADS")
+        if threads:
+            torch.set_num_threads(int(threads))
+        if interop:
+            try:
+                torch.set_num_interop_threads(int(interop))
+            except RuntimeError as e:
+                # Only allowed before any inter-op parallel work has started
+                print(f"Could not set inter-op threads: {e}")
+
+def _plain_linears(module):
+    # Dynamic quantization only swaps exact nn.Linear instances; Whisper uses
+    # a subclass that only adds dtype casting, which fp32 does not need
+    import torch.nn as nn
+    for name, child in module.named_children():
+        if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+            plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _plain_linears(child)
+
+def quantize_int8(module):
+    import torch
+    import torch.nn as nn
+    _plain_linears(module)
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+def optimize_module(module, profile, name="model"):
+    """Returns (module, applied_profile) for the int8 / compile profiles; others are passed through."""
+    import torch
+    module.eval()
+    try:
+        if profile == "int8":
+            return quantize_int8(module), "int8"
+        if profile == "compile":
+            return torch.compile(module), "compile"
+    except Exception as e:
+        print(f"{profile} profile failed for {name}, using fp32: {e}")
+    return module, "fp32"
+
+def build_whisper(model_name="tiny", profile="fp32"):
+    """Returns (whisper model, applied_profile)."""
+    configure_threads()
+    import torch
+    import whisper
+    model = whisper.load_model(model_name, device="cpu")
+    if profile == "onnx":
+        # The decoding loop (kv-cache hooks, per-token timestamps logic) is
+        # not exportable as one graph
+        print("onnx profile is not supported for Whisper, using int8.")
+        profile = "int8"
+    if profile == "compile":
+        # The encoder has fixed shapes (30 s window); the decoder's growing
+        # kv-cache would recompile constantly, so it stays eager
+        try:
+            model.encoder = torch.compile(model.encoder)
+            return model, "compile"
+        except Exception as e:
+            print(f"compile profile failed for Whisper, using fp32: {e}")
+            return model, "fp32"
+    return optimize_module(model, profile, "whisper")
+
+def onnx_session_options():
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    threads = os.getenv("AURA_ONNX_THREADS") or os.getenv("AURA_TORCH_THREADS")
+    if threads:
+        options.intra_op_num_threads = int(threads)
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+def _onnx_model(task, model_name):
+    from optimum.onnxruntime import ORTModelForAudioClassification, ORTModelForSequenceClassification
+    model_class = {
+        "audio-classification": ORTModelForAudioClassification,
+        "text-classification": ORTModelForSequenceClassification,
+    }[task]
+    path = os.path.join(ONNX_DIR, re.sub(r"[^\w.-]", "_", model_name))
+    if os.path.isdir(path):
+        return model_class.from_pretrained(path, session_options=onnx_session_options())
+    model = model_class.from_pretrained(model_name, export=True, session_options=onnx_session_options())
+    model.save_pretrained(path)
+    return model
+
+def build_pipeline(task, model_name, profile="fp32", **kwargs):
+    """Returns (transformers pipeline, applied_profile)."""
+    configure_threads()
+    from transformers import pipeline
+    if profile == "onnx":
+        try:
+            preprocessor = "feature_extractor" if task == "audio-classification" else "tokenizer"
+            pipe = pipeline(task, model=_onnx_model(task, model_name), **{preprocessor: model_name}, **kwargs)
+            return pipe, "onnx"
+        except Exception as e:
+            print(f"onnx profile failed for {model_name}, using fp32: {e}")
+            profile = "fp32"
+    pipe = pipeline(task, model=model_name, **kwargs)
+    pipe.model, applied = optimize_module(pipe.model, profile, model_name)
+    return pipe, applied
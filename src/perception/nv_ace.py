@@ -1,93 +1,462 @@
 import os
-import grpc
+import base64
+import itertools
+import queue
+import sys
+import threading
 import time
+import uuid
+import wave
 import numpy as np
 
-# Note: In a real implementation, you would need the generated protobuf classes 
-# from NVIDIA ACE (e.g. nvidia_ace.audio2face.v1_pb2).
-# Since these are not publicly available in a simple pip package, we will
-# structure this client to be easily pluggable once those files are generated.
-# For now, we will simulate the connection or use a generic structure.
+from src.core.tracing import tracer
+
+# Audio -> blendshape animation.
+# When AURA_A2F_URL is set, audio is streamed over gRPC (see
+# protos/aura_a2f.proto) to an Audio2Face service and frames are yielded as
+# they come back. a2f_server.py implements the same contract locally, so the
+# whole path can run and be load-tested offline:
+#   python -m src.perception.a2f_server --port 50051
+#   AURA_A2F_URL=localhost:50051 uvicorn server:app
+# Without AURA_A2F_URL (or if the stream fails) frames are estimated
+# in-process from the audio energy.
+# grpc is only imported when Audio2Face is configured, so the server runs
+# without it.
+
+PROTO_PATH = "src/perception/protos/aura_a2f.proto"
+
+# Long-lived streams through proxies/load balancers need keepalives
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    # Give each pooled channel its own connection
+    ("grpc.use_local_subchannel_pool", 1),
+]
+
+RETRYABLE_CODES = ("UNAVAILABLE", "RESOURCE_EXHAUSTED")
+
+_protocol = None
+_protocol_lock = threading.Lock()
+
+def load_protocol():
+    """Returns (messages, services) compiled from the .proto at runtime (needs grpcio-tools)."""
+    global _protocol
+    with _protocol_lock:
+        if _protocol is None:
+            import grpc
+            # protos_and_services resolves the path against sys.path
+            root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            if root not in sys.path:
+                sys.path.append(root)
+            _protocol = grpc.protos_and_services(PROTO_PATH)
+        return _protocol
+
+class ChannelPool:
+    """A fixed set of channels handed out round-robin, shared by all requests."""
+    def __init__(self, target, size=2, credentials=None, options=None):
+        import grpc
+        if credentials is not None:
+            self.channels = [grpc.secure_channel(target, credentials, options) for _ in range(size)]
+        else:
+            self.channels = [grpc.insecure_channel(target, options) for _ in range(size)]
+        self._order = itertools.cycle(range(size))
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            return self.channels[next(self._order)]
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
 
 class NvidiaACEClient:
-    def __init__(self, api_key=None, url="grpc.nvcf.nvidia.com:443", function_id=None):
+    def __init__(self, api_key=None, url=None, function_id=None):
         self.api_key = api_key or os.getenv("NV_API_KEY")
-        self.url = url
+        self.url = url or os.getenv("AURA_A2F_URL")
         self.function_id = function_id or "760ca5ed-e18e-4f51-8763-7935df626c9f" # Example Audio2Face Function ID
-        self.channel = None
-        self.stub = None
-        
-        if not self.api_key:
-            print("WARNING: NV_API_KEY is not set. serialization will fail.")
+        # Plaintext for the local stand-in server
+        self.insecure = os.getenv("AURA_A2F_INSECURE") == "1" or (self.url or "").startswith(("localhost", "127.0.0.1"))
+        self.pool_size = int(os.getenv("AURA_A2F_CHANNELS", 2))
+        self.deadline = float(os.getenv("AURA_A2F_DEADLINE", 10))
+        self.retries = int(os.getenv("AURA_A2F_RETRIES", 2))
+        self.chunk_ms = 100
+        self.pool = None
+        self.lock = threading.Lock()
+        self.fps = int(os.getenv("AURA_ACE_FPS", 60))
+        # float16 halves the payload again; blendshape weights don't need more precision
+        self.dtype = os.getenv("AURA_ACE_DTYPE", "float16")
+        try:
+            import grpc
+        except ImportError:
+            grpc = None
+            if self.url:
+                print("WARNING: grpcio is not installed. Face animation is estimated locally.")
+        self.grpc = grpc
+
+        if self.url and not self.insecure and not self.api_key:
+            print("WARNING: NV_API_KEY is not set. Audio2Face requests will fail.")
 
     def connect(self):
-        if not self.api_key:
-            return False
-            
-        try:
-            creds = grpc.ssl_channel_credentials()
-            call_creds = grpc.metadata_call_credentials(
-                lambda context, callback: callback((("authorization", f"Bearer {self.api_key}"),), None)
-            )
-            composite_creds = grpc.composite_channel_credentials(creds, call_creds)
-            self.channel = grpc.secure_channel(self.url, composite_creds)
-            
-            # self.stub = A2FStub(self.channel) # Requires generated proto
-            print(f"Connected to NVIDIA ACE at {self.url}")
-            return True
-        except Exception as e:
-            print(f"Failed to connect to NVIDIA ACE: {e}")
-            return False
+        """Creates the shared channel pool once; later calls reuse it."""
+        with self.lock:
+            if self.pool is not None:
+                return True
+            if not self.url or self.grpc is None:
+                return False
+
+            grpc = self.grpc
+            try:
+                credentials = None
+                if not self.insecure:
+                    if not self.api_key:
+                        return False
+                    creds = grpc.ssl_channel_credentials()
+                    call_creds = grpc.metadata_call_credentials(
+                        lambda context, callback: callback((("authorization", f"Bearer {self.api_key}"),), None)
+                    )
+                    credentials = grpc.composite_channel_credentials(creds, call_creds)
+                self.pool = ChannelPool(self.url, self.pool_size, credentials, CHANNEL_OPTIONS)
+                print(f"Connected to Audio2Face at {self.url} ({self.pool_size} channels)")
+                return True
+            except Exception as e:
+                print(f"Failed to connect to NVIDIA ACE: {e}")
+                return False
+
+    def close(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
 
-    def process_audio(self, audio_file_path):
+    def stream_frames(self, pcm_chunks, sample_rate, timeout=-1):
         """
-        Sends audio to ACE and returns animation data.
-        Returns a dictionary or list of blendshape frames.
+        Streams 16-bit mono PCM chunks (any iterable - e.g. as TTS produces
+        them) and yields (names, weights) blocks as the service returns them.
+        Until the first frame arrives, UNAVAILABLE / RESOURCE_EXHAUSTED are
+        retried with backoff, replaying the chunks already sent. timeout
+        bounds the whole call: the deadline by default, None for a stream
+        that stays open while the audio is still being produced.
         """
-        if not self.channel:
-            if not self.connect():
-                print("NVIDIA ACE not connected. Returning empty animation.")
-                return None
+        messages, services = load_protocol()
+        if not self.connect():
+            raise RuntimeError("Audio2Face is not configured")
+
+        source = iter(pcm_chunks)
+        sent = []
+        request_id = uuid.uuid4().hex
+        metadata = () if self.insecure else (("function-id", self.function_id),)
+        names = None
+
+        for attempt in range(self.retries + 1):
+            def requests():
+                yield messages.AudioChunk(header=messages.AudioHeader(sample_rate=sample_rate, fps=self.fps, request_id=request_id))
+                for pcm in list(sent):
+                    yield messages.AudioChunk(pcm=pcm)
+                for pcm in source:
+                    sent.append(pcm)
+                    yield messages.AudioChunk(pcm=pcm)
+
+            stub = services.Audio2FaceStreamStub(self.pool.get())
+            received = False
+            try:
+                for message in stub.StreamAudio(requests(), timeout=self.deadline if timeout == -1 else timeout, metadata=metadata):
+                    received = True
+                    if message.names:
+                        names = list(message.names)
+                    weights = np.asarray(message.weights, np.float32).reshape(message.frame_count, -1)
+                    yield names or BLENDSHAPE_NAMES, weights
+                return
+            except self.grpc.RpcError as e:
+                if received or attempt >= self.retries or e.code().name not in RETRYABLE_CODES:
+                    raise
+                delay = 0.1 * (2 ** attempt)
+                print(f"Audio2Face stream failed ({e.code().name}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def open_stream(self, sample_rate, cancelled=None):
+        """One AnimationStream for a reply synthesized sentence by sentence."""
+        return AnimationStream(self, sample_rate, cancelled)
+
+    def process_audio(self, audio_file_path, cancelled=None):
+        """
+        Sends audio (WAV path or file object) to ACE and returns animation
+        data in the compact encode_frames format. Setting cancelled
+        (threading.Event) stops the stream early; the result is then None.
+        """
+        def stopped():
+            return cancelled is not None and cancelled.is_set()
+
+        with tracer.span("ace.blendshapes") as span:
+            return self._process_audio(audio_file_path, stopped, span)
 
-        print(f"Sending {audio_file_path} to NVIDIA ACE...")
-        
-        # Mock Response for now since we don't have the real protos generated in this environment
-        # In a real scenario, this would yield frames from a response stream
-        
-        # Simulating processing delay
-        # time.sleep(0.5)
-        
-        # Mock Blendshapes (Basic ARKit 52 subset)
-        # We will generate a fake wave of 'jawOpen' synchronized with file duration
+    def _process_audio(self, audio_file_path, stopped, span):
         try:
-            # Get duration
-            import wave
-            with wave.open(audio_file_path, 'rb') as wf:
-                duration = wf.getnframes() / wf.getframerate()
-            
-            fps = 60
-            total_frames = int(duration * fps)
-            animations = []
-            
-            for i in range(total_frames):
-                # Simple sine wave for jaw movement to simulate talking
-                jaw_open = abs(np.sin(i * 0.2)) * 0.8
-                
-                frame = {
-                    "time": i / fps,
-                    "blendshapes": {
-                        "jawOpen": float(jaw_open),
-                        "mouthSmile": 0.1
-                    }
-                }
-                animations.append(frame)
-                
-            print(f"Generated {len(animations)} frames of mock animation data.")
-            return animations
-            
+            samples, sample_rate = read_wav(audio_file_path)
         except Exception as e:
             print(f"Error processing audio for ACE: {e}")
             return None
 
+        if self.url and self.connect():
+            try:
+                pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+                step = int(sample_rate * self.chunk_ms / 1000) * 2
+
+                def chunks():
+                    for i in range(0, len(pcm), step):
+                        if stopped():
+                            return
+                        yield pcm[i:i + step]
+
+                names, blocks = BLENDSHAPE_NAMES, []
+                for names, weights in self.stream_frames(chunks(), sample_rate):
+                    if stopped():
+                        return None
+                    blocks.append(weights)
+                if stopped():
+                    return None
+                weights = np.concatenate(blocks) if blocks else np.zeros((0, len(names)), np.float32)
+                span.attrs.update(backend="audio2face", frames=len(weights))
+                return encode_frames(weights, self.fps, self.dtype, names)
+            except Exception as e:
+                print(f"Audio2Face stream failed, estimating locally: {e}")
+
+        if stopped():
+            return None
+        try:
+            weights = generate_blendshapes(samples, sample_rate, self.fps)
+            span.attrs.update(backend="local", frames=len(weights))
+            return encode_frames(weights, self.fps, self.dtype)
+        except Exception as e:
+            print(f"Error processing audio for ACE: {e}")
+            return None
+
+# Blendshape columns produced by generate_blendshapes (ARKit names)
+BLENDSHAPE_NAMES = ["jawOpen", "mouthFunnel", "mouthStretchLeft", "mouthStretchRight", "mouthSmile"]
+
+def read_wav(audio_file):
+    """Reads a WAV path or file object into (mono float32 samples in [-1, 1], sample_rate)."""
+    with wave.open(audio_file, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, "<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(raw, "<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+def _frame_features(samples, bounds):
+    """Per-frame RMS and zero-crossing rate for frames samples[bounds[i]:bounds[i+1]]."""
+    lengths = np.maximum(np.diff(bounds), 1)
+    # Cumulative sums handle uneven frame lengths without a Python loop
+    energy = np.concatenate(([0.0], np.cumsum(samples.astype(np.float64) ** 2)))
+    rms = np.sqrt((energy[bounds[1:]] - energy[bounds[:-1]]) / lengths)
+    crossings = np.concatenate(([0], np.cumsum(np.signbit(samples[1:]) != np.signbit(samples[:-1]))))
+    zcr = (crossings[np.minimum(bounds[1:], len(crossings) - 1)] - crossings[bounds[:-1]]) / lengths
+    return rms, zcr
+
+def _shape_weights(level, sibilance):
+    weights = np.empty((len(level), len(BLENDSHAPE_NAMES)), np.float32)
+    weights[:, 0] = level * 0.8                           # jawOpen
+    weights[:, 1] = level * (1.0 - sibilance) * 0.4       # mouthFunnel
+    weights[:, 2] = level * sibilance * 0.3               # mouthStretchLeft
+    weights[:, 3] = weights[:, 2]                         # mouthStretchRight
+    weights[:, 4] = 0.1                                   # mouthSmile
+    return weights
+
+def generate_blendshapes(samples, sample_rate, fps=60):
+    """
+    Derives a (frames x len(BLENDSHAPE_NAMES)) float32 array from the audio
+    itself: per-frame RMS energy drives the jaw, and the zero-crossing rate
+    (high for s/f/sh, low for vowels) splits it between rounded and
+    stretched mouth shapes. Fully vectorized - no per-frame Python.
+    """
+    hop = sample_rate / fps
+    total_frames = int(len(samples) / hop)
+    if total_frames == 0:
+        return np.zeros((0, len(BLENDSHAPE_NAMES)), np.float32)
+
+    bounds = (np.arange(total_frames + 1) * hop).astype(np.int64)
+    rms, zcr = _frame_features(samples, bounds)
+
+    # Normalize against loud speech, gate the noise floor, smooth ~50 ms
+    reference = np.percentile(rms, 95) or 1.0
+    level = np.clip((rms / reference - 0.05) / 0.95, 0.0, 1.0)
+    kernel = np.ones(3) / 3
+    level = np.convolve(level, kernel, mode="same")
+    sibilance = np.convolve(np.clip(zcr / 0.25, 0.0, 1.0), kernel, mode="same")
+    return _shape_weights(level, sibilance)
+
+class BlendshapeStream:
+    """
+    Incremental generate_blendshapes for audio that arrives in pieces:
+    feed() returns the frames completed so far. Loudness is normalized
+    against a slowly decaying running peak instead of the whole clip, and
+    smoothing is causal.
+    """
+    def __init__(self, sample_rate, fps=60, decay=0.995):
+        self.hop = sample_rate / fps
+        self.decay = decay
+        self.pending = np.zeros(0, np.float32)
+        self.consumed = 0        # samples before self.pending
+        self.frames = 0          # frames emitted so far
+        self.reference = 1e-3
+        self.history = np.zeros((2, 2))   # last two (level, sibilance) for smoothing
+
+    def feed(self, samples):
+        buffer = np.concatenate((self.pending, np.asarray(samples, np.float32)))
+        count = int((self.consumed + len(buffer)) / self.hop) - self.frames
+        if count <= 0:
+            self.pending = buffer
+            return np.zeros((0, len(BLENDSHAPE_NAMES)), np.float32)
+
+        bounds = (np.arange(self.frames, self.frames + count + 1) * self.hop).astype(np.int64) - self.consumed
+        rms, zcr = _frame_features(buffer[:bounds[-1]], bounds)
+
+        self.reference = max(self.reference * self.decay ** count, float(np.percentile(rms, 95)))
+        raw = np.stack((
+            np.clip((rms / self.reference - 0.05) / 0.95, 0.0, 1.0),
+            np.clip(zcr / 0.25, 0.0, 1.0),
+        ), axis=1)
+        padded = np.concatenate((self.history, raw))
+        smoothed = (padded[:-2] + padded[1:-1] + padded[2:]) / 3
+        self.history = padded[-2:]
+
+        self.pending = buffer[bounds[-1]:]
+        self.consumed += int(bounds[-1])
+        self.frames += count
+        return _shape_weights(smoothed[:, 0], smoothed[:, 1])
+
+class AnimationStream:
+    """
+    Face animation for a reply that TTS renders sentence by sentence: one
+    Audio2Face stream (or one local BlendshapeStream) covers the whole
+    reply, and each sentence's PCM goes into it as soon as it is
+    synthesized. animate(pcm) returns that sentence's frames (encode_frames
+    format), so the animation carries on across sentences instead of
+    restarting with every clip. If the service fails or stops answering
+    within the deadline, the rest of the reply is estimated locally.
+    """
+    def __init__(self, client, sample_rate, cancelled=None):
+        self.client = client
+        self.sample_rate = sample_rate
+        self.cancelled = cancelled
+        self.hop = sample_rate / client.fps
+        self.fed = 0            # samples fed so far
+        self.frames = 0         # frames handed out so far
+        self.names = BLENDSHAPE_NAMES
+        self.received = []      # frames from the service not handed out yet
+        self.available = 0
+        self.done = False
+        self.cond = threading.Condition()
+        self.chunks = queue.Queue()
+        self.local = None
+        if client.url and client.connect():
+            threading.Thread(target=self._run, name="aura-a2f-stream", daemon=True).start()
+        else:
+            self.local = BlendshapeStream(sample_rate, client.fps)
+
+    def _requests(self):
+        while True:
+            pcm = self.chunks.get()
+            if pcm is None:
+                return
+            yield pcm
+
+    def _run(self):
+        try:
+            # Open while the reply is being synthesized; each sentence waits
+            # at most the deadline for its frames (see _take)
+            for names, weights in self.client.stream_frames(self._requests(), self.sample_rate, timeout=None):
+                with self.cond:
+                    self.names = names
+                    self.received.append(weights)
+                    self.available += len(weights)
+                    self.cond.notify_all()
+        except Exception as e:
+            print(f"Audio2Face stream failed, estimating locally: {e}")
+        finally:
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def _stopped(self):
+        return self.cancelled is not None and self.cancelled.is_set()
+
+    def _take(self, count):
+        """Waits for the next `count` frames from the service; None if it failed or went quiet."""
+        deadline = time.monotonic() + self.client.deadline
+        with self.cond:
+            while self.available < count and not self.done and not self._stopped():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                # Short waits so a cancelled turn is noticed quickly
+                self.cond.wait(min(remaining, 0.1))
+            if self.available < count:
+                return None
+            weights = np.concatenate(self.received)
+            self.received = [weights[count:]]
+            self.available -= count
+            return weights[:count]
+
+    def animate(self, pcm):
+        """pcm: one sentence of 16-bit mono PCM. Returns its frames, or None if the turn was cancelled."""
+        samples = np.frombuffer(pcm, "<i2").astype(np.float32) / 32768.0
+        self.fed += len(samples)
+        count = int(self.fed / self.hop) - self.frames
+        with tracer.span("ace.blendshapes", frames=count) as span:
+            weights = None
+            if self.local is None:
+                step = int(self.sample_rate * self.client.chunk_ms / 1000) * 2
+                for i in range(0, len(pcm), step):
+                    self.chunks.put(pcm[i:i + step])
+                weights = self._take(count)
+                if self._stopped():
+                    return None
+                if weights is None:
+                    print("Audio2Face stream did not keep up, estimating the rest of the reply locally")
+                    self.close()
+                    self.local = BlendshapeStream(self.sample_rate, self.client.fps)
+            if weights is None:
+                weights = self.local.feed(samples)
+                span.attrs["backend"] = "local"
+            else:
+                span.attrs["backend"] = "audio2face"
+            self.frames += count
+            return encode_frames(weights, self.client.fps, self.client.dtype,
+                                 self.names if self.local is None else BLENDSHAPE_NAMES)
+
+    def close(self):
+        """Ends the Audio2Face request (no more audio follows)."""
+        self.chunks.put(None)
+
+def encode_frames(weights, fps=60, dtype="float16", names=BLENDSHAPE_NAMES):
+    """
+    Compact wire format: column names once, then the frames x names matrix
+    as a little-endian, row-major typed array in base64. The browser indexes
+    it directly with frame = floor(time * fps).
+    """
+    packed = np.ascontiguousarray(weights, dtype="<f2" if dtype == "float16" else "<f4")
+    return {
+        "format": "blendshapes/v1",
+        "fps": fps,
+        "frames": int(weights.shape[0]),
+        "names": list(names),
+        "dtype": "float16" if dtype == "float16" else "float32",
+        "data": base64.b64encode(packed.tobytes()).decode("ascii"),
+    }
+
 # Singleton instance
 ace_client = NvidiaACEClient()
@@ -0,0 +1,137 @@
+import asyncio
+
+import numpy as np
+
+from src.perception.vad import VoiceActivityDetector, UtteranceSegmenter
+
+# Live speech input for /ws/audio: PCM frames in, utterances out.
+# - the segmenter (server-side VAD) decides where an utterance starts and ends
+# - while the user talks, the utterance so far is re-transcribed every
+#   partial_interval seconds (sent as "partial" messages) and emotion
+#   analysis starts once emotion_after seconds are in
+# - at end of speech the final transcript reuses the last partial when it
+#   already covered (almost) all the audio, otherwise one more pass runs on
+#   the complete utterance - short, because the model is warm and the clip
+#   is already in memory
+# transcribe / analyze_emotion are async callables taking float32 16 kHz
+# audio (server.py passes the batched model calls; analyze_emotion returns
+# emotion scores, fused with text and face by the server); send posts JSON
+# to the client.
+
+SAMPLE_RATE = 16000
+
+def pcm16_to_float(data):
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+def resample(samples, source_rate, target_rate=SAMPLE_RATE):
+    if source_rate == target_rate or not len(samples):
+        return samples
+    count = int(round(len(samples) * target_rate / source_rate))
+    positions = np.linspace(0, len(samples) - 1, count)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+class StreamingTranscriber:
+    def __init__(self, transcribe, analyze_emotion, send, sample_rate=SAMPLE_RATE,
+                 partial_interval=1.0, emotion_after=1.5, end_ms=500, reuse_margin=0.3):
+        self.transcribe = transcribe
+        self.analyze_emotion = analyze_emotion
+        self.send = send
+        self.input_rate = sample_rate
+        self.partial_samples = int(partial_interval * SAMPLE_RATE)
+        self.emotion_samples = int(emotion_after * SAMPLE_RATE)
+        # A partial missing at most this much of the final audio is reused as is
+        self.reuse_samples = int(reuse_margin * SAMPLE_RATE)
+        self.vad = VoiceActivityDetector(SAMPLE_RATE)
+        self.segmenter = UtteranceSegmenter(self.vad, end_ms=end_ms)
+        self._reset()
+
+    def _reset(self):
+        self.partial_task = None
+        self.partial = ("", 0)          # (text, samples covered)
+        self.next_partial_at = self.partial_samples
+        self.emotion_task = None
+        self.emotion_covered = 0
+
+    async def feed(self, data):
+        """
+        data: little-endian 16-bit mono PCM at the configured sample rate.
+        Returns {"text", "emotion", "seconds"} when an utterance ended, else None.
+        """
+        samples = resample(pcm16_to_float(data), self.input_rate)
+        result = None
+        for event, audio in self.segmenter.feed(samples):
+            if event == "start":
+                self._reset()
+                await self.send({"type": "vad", "state": "speech_start"})
+            else:
+                await self.send({"type": "vad", "state": "speech_end"})
+                # Frames after the end belong to the next utterance; only
+                # one result per call, the last one wins
+                result = await self._finalize(audio)
+                self._reset()
+
+        if self.segmenter.in_speech:
+            self._maybe_start_work()
+        return result
+
+    async def flush(self):
+        """Client stopped the stream: treat what was heard so far as a finished utterance."""
+        audio = self.segmenter.flush()
+        if audio is None or not len(audio):
+            return None
+        result = await self._finalize(audio)
+        self._reset()
+        return result
+
+    def _maybe_start_work(self):
+        heard = self.segmenter.samples
+        if heard >= self.next_partial_at and (self.partial_task is None or self.partial_task.done()):
+            self.next_partial_at = heard + self.partial_samples
+            self.partial_task = asyncio.create_task(self._partial(self.segmenter.utterance()))
+        if self.analyze_emotion and self.emotion_task is None and heard >= self.emotion_samples:
+            audio = self.segmenter.utterance()
+            self.emotion_covered = len(audio)
+            self.emotion_task = asyncio.create_task(self.analyze_emotion(audio))
+
+    async def _partial(self, audio):
+        try:
+            text = (await self.transcribe(audio) or "").strip()
+        except Exception as e:
+            # Partials are best effort (e.g. the Whisper queue is full)
+            print(f"Partial transcription skipped: {e}")
+            return ""
+        self.partial = (text, len(audio))
+        if text:
+            await self.send({"type": "partial", "text": text})
+        return text
+
+    async def _finalize(self, audio):
+        if self.partial_task is not None:
+            try:
+                await self.partial_task
+            except Exception as e:
+                print(f"Partial transcription failed: {e}")
+
+        text, covered = self.partial
+        if not text or len(audio) - covered > self.reuse_samples:
+            transcription = self.transcribe(audio)
+        else:
+            transcription = None
+
+        emotion = None
+        if self.analyze_emotion:
+            # Early estimate if it heard most of the utterance, otherwise redo it
+            # on the whole clip alongside the final transcription
+            if self.emotion_task is None or self.emotion_covered < len(audio) * 0.6:
+                if self.emotion_task is not None:
+                    self.emotion_task.cancel()
+                self.emotion_task = asyncio.ensure_future(self.analyze_emotion(audio))
+
+        if transcription is not None:
+            text = (await transcription or "").strip()
+        if self.emotion_task is not None:
+            try:
+                emotion = await self.emotion_task
+            except Exception as e:
+                print(f"Emotion analysis failed: {e}")
+        return {"text": text, "emotion": emotion, "seconds": round(len(audio) / SAMPLE_RATE, 2)}
@@ -0,0 +1,120 @@
+import numpy as np
+
+# Server-side voice activity detection for live PCM (see streaming_asr.py).
+# Uses webrtcvad when it is installed; otherwise an energy detector whose
+# threshold follows the background noise floor, so a fan or a noisy room
+# does not read as speech and quiet rooms still pick up soft voices.
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=16000, frame_ms=30, aggressiveness=2,
+                 ratio=3.0, min_level=0.008, noise_alpha=0.05):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_size = sample_rate * frame_ms // 1000
+        # Speech = frame RMS above max(noise floor * ratio, min_level)
+        self.ratio = ratio
+        self.min_level = min_level
+        self.noise_alpha = noise_alpha
+        self.noise = None
+        self.webrtc = None
+        try:
+            import webrtcvad
+            if sample_rate in (8000, 16000, 32000, 48000) and frame_ms in (10, 20, 30):
+                self.webrtc = webrtcvad.Vad(aggressiveness)
+        except ImportError:
+            pass
+
+    @property
+    def backend(self):
+        return "webrtcvad" if self.webrtc else "energy"
+
+    def is_speech(self, frame):
+        """frame: float32 samples in [-1, 1], frame_size long."""
+        rms = float(np.sqrt(np.mean(frame * frame))) if len(frame) else 0.0
+        if self.webrtc is not None:
+            pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+            return self.webrtc.is_speech(pcm, self.sample_rate)
+        if self.noise is None:
+            self.noise = rms
+        speech = rms > max(self.noise * self.ratio, self.min_level)
+        if not speech:
+            # Only non-speech frames move the noise floor
+            self.noise += self.noise_alpha * (rms - self.noise)
+        return speech
+
+class UtteranceSegmenter:
+    """
+    Turns a stream of samples into utterances. Speech starts after start_ms
+    of consecutive voiced frames and ends after end_ms of silence; pre_roll_ms
+    of audio before the start is kept so the first syllable is not clipped.
+    Utterances are cut at max_seconds (Whisper's window is 30 s).
+    """
+    def __init__(self, vad, start_ms=90, end_ms=500, pre_roll_ms=300, max_seconds=25.0):
+        self.vad = vad
+        self.start_frames = max(1, start_ms // vad.frame_ms)
+        self.end_frames = max(1, end_ms // vad.frame_ms)
+        self.pre_roll_frames = pre_roll_ms // vad.frame_ms
+        self.max_samples = int(max_seconds * vad.sample_rate)
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.recent = []        # frames before speech (pre-roll + start detection)
+        self.frames = []        # frames of the current utterance
+        self.samples = 0
+        self.in_speech = False
+        self.voiced_run = 0
+        self.silent_run = 0
+
+    def utterance(self):
+        """Audio of the current utterance, without the trailing silence once it ended."""
+        frames = self.frames[:-self.silent_run] if self.silent_run else self.frames
+        return np.concatenate(frames) if frames else np.zeros(0, dtype=np.float32)
+
+    def feed(self, samples):
+        """
+        Returns the events the new samples caused, in order: ("start", None)
+        and ("end", utterance_audio).
+        """
+        events = []
+        data = np.concatenate([self.remainder, samples]) if len(self.remainder) else samples
+        size = self.vad.frame_size
+        usable = len(data) - len(data) % size
+        self.remainder = data[usable:]
+        for offset in range(0, usable, size):
+            frame = data[offset:offset + size]
+            voiced = self.vad.is_speech(frame)
+            if not self.in_speech:
+                self.recent.append(frame)
+                self.voiced_run = self.voiced_run + 1 if voiced else 0
+                if self.voiced_run >= self.start_frames:
+                    self.in_speech = True
+                    self.silent_run = 0
+                    self.frames = self.recent[-(self.start_frames + self.pre_roll_frames):]
+                    self.samples = sum(len(f) for f in self.frames)
+                    self.recent = []
+                    events.append(("start", None))
+                else:
+                    del self.recent[:-(self.start_frames + self.pre_roll_frames)]
+                continue
+
+            self.frames.append(frame)
+            self.samples += len(frame)
+            self.silent_run = 0 if voiced else self.silent_run + 1
+            if self.silent_run >= self.end_frames or self.samples >= self.max_samples:
+                events.append(("end", self.utterance()))
+                self.in_speech = False
+                self.voiced_run = 0
+                self.frames = []
+                self.samples = 0
+                self.silent_run = 0
+        return events
+
+    def flush(self):
+        """Ends the current utterance now (client stopped sending); its audio or None."""
+        if not self.in_speech:
+            return None
+        audio = self.utterance()
+        self.in_speech = False
+        self.voiced_run = 0
+        self.frames = []
+        self.samples = 0
+        self.silent_run = 0
+        return audio
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# Offline: the fake LLM answers and memory lives in a temporary directory.
+# Must be set before brain (and the singletons it imports) is loaded.
+_workdir = tempfile.mkdtemp(prefix="aura-test-")
+os.environ["AURA_LLM_FAKE"] = "1"
+os.environ["AURA_MEMORY_PATH"] = os.path.join(_workdir, "memory.db")
+os.environ.pop("AURA_CACHE_SHARED", None)
+
+from src.core import brain
+from src.core.response_cache import ResponseCache
+
+class SessionIsolationTest(unittest.TestCase):
+    """Two sessions asking the same short question never share a reply or history."""
+
+    def setUp(self):
+        brain.response_cache.clear()
+        self.calls = []
+        self.generate = brain.llm.generate
+
+        def counted(contents):
+            self.calls.append(contents)
+            return self.generate(contents)
+        brain.llm.generate = counted
+
+    def tearDown(self):
+        brain.llm.generate = self.generate
+
+    def test_same_question_is_answered_per_session(self):
+        brain.process_input({"text": "my name is Alice", "session_id": "test-alice"})
+        brain.process_input({"text": "what is my name", "session_id": "test-alice"})
+        calls = len(self.calls)
+
+        brain.process_input({"text": "what is my name", "session_id": "test-bob"})
+        # Not served from alice's cached reply
+        self.assertEqual(len(self.calls), calls + 1)
+        # And the prompt carried none of alice's conversation
+        self.assertNotIn("Alice", str(self.calls[-1]))
+
+    def test_history_stays_in_its_session(self):
+        brain.process_input({"text": "my name is Alice", "session_id": "test-alice-2"})
+        brain.process_input({"text": "hello", "session_id": "test-bob-2"})
+
+        bob = brain.session_history({"session_id": "test-bob-2"})
+        self.assertEqual(len(bob), 1)
+        self.assertNotIn("Alice", str(bob))
+        self.assertIn("Alice", str(brain.session_history({"session_id": "test-alice-2"})))
+
+    def test_cache_keys(self):
+        cache = ResponseCache(shared=True)
+        alice = {"text": "what is my name", "session_id": "alice"}
+        cache.put(alice, "", "Your name is Alice.")
+        self.assertIsNone(cache.get({**alice, "session_id": "bob"}))
+        self.assertEqual(cache.get(alice), "Your name is Alice.")
+        # A follow-up means something else after a different conversation
+        self.assertIsNone(cache.get(alice, history=(("hi", "hello"),)))
+
+        # Text-free reactions are shared only when opted in
+        wave = {"text": "", "gesture": "wave", "session_id": "alice"}
+        cache.put(wave, "", "Hi there!")
+        self.assertEqual(cache.get({**wave, "session_id": "bob"}), "Hi there!")
+        private = ResponseCache()
+        private.put(wave, "", "Hi there!")
+        self.assertIsNone(private.get({**wave, "session_id": "bob"}))
+
+if __name__ == "__main__":
+    unittest.main()
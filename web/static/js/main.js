@@ -3,6 +3,9 @@ import { GestureHandler } from './gesture.js';
 
 const avatar = new Avatar();
 let currentEmotion = "neutral";
+// All face-api expression scores of the last detection; the server fuses
+// them with the voice and the words (see src/perception/fusion.py)
+let currentFaceScores = null;
 // Emotion Trigger State
 let lastTriggeredEmotion = null;
 let emotionStartTime = 0;
@@ -12,15 +15,29 @@ const gestureHandler = new GestureHandler(avatar, (gesture) => {
     // Send gesture to backend
     log(`Sending gesture: ${gesture} (Emotion: ${currentEmotion})`);
     addMessage(`(Gesture: ${gesture})`, 'user');
-    fetch('/api/chat', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: "", emotion: currentEmotion, gesture: gesture })
-    })
-        .then(res => res.json())
-        .then(data => handleResponse(data))
-        .catch(err => console.error("Error sending gesture:", err));
+    sendChat({ text: "", emotion: currentEmotion, gesture: gesture });
 });
+// Reply audio formats this browser can play, best first; the server encodes
+// replies into the first one it supports (see audio_url in /api/chat).
+const AUDIO_ACCEPT = (() => {
+    const probe = new Audio();
+    const types = [];
+    if (probe.canPlayType('audio/ogg; codecs="opus"')) types.push('audio/ogg');
+    if (probe.canPlayType('audio/mpeg')) types.push('audio/mpeg;q=0.9');
+    types.push('audio/wav;q=0.5');
+    return `application/json, ${types.join(', ')}`;
+})();
+
+// Keeps AURA's long-term memory per browser
+const SESSION_ID = (() => {
+    let id = localStorage.getItem('aura_session_id');
+    if (!id) {
+        id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`);
+        localStorage.setItem('aura_session_id', id);
+    }
+    return id;
+})();
+
 let isRecording = false;
 let mediaRecorder;
 let audioChunks = [];
@@ -147,14 +164,7 @@ function triggerManualGesture(gesture) {
         audioContext.resume();
     }
 
-    fetch('/api/chat', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: "", emotion: currentEmotion, gesture: gesture })
-    })
-        .then(res => res.json())
-        .then(data => handleResponse(data))
-        .catch(err => console.error("Error sending gesture:", err));
+    sendChat({ text: "", emotion: currentEmotion, gesture: gesture });
 }
 
 
@@ -169,18 +179,237 @@ async function sendMessage() {
     addMessage(text, 'user');
     input.value = '';
 
-    try {
-        const response = await fetch('/api/chat', {
+    sendChat({ text: text, emotion: currentEmotion });
+}
+
+// Streaming chat over /ws/chat: text arrives token by token and audio
+// arrives one sentence at a time, so playback starts after the first sentence.
+let chatSocket = null;
+let streamState = null;
+
+function getChatSocket() {
+    // CONNECTING (0) or OPEN (1) sockets are reused
+    if (chatSocket && chatSocket.readyState <= WebSocket.OPEN) return chatSocket;
+
+    const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+    chatSocket = new WebSocket(`${protocol}://${location.host}/ws/chat`);
+    chatSocket.onmessage = (event) => handleStreamMessage(JSON.parse(event.data));
+    chatSocket.onerror = () => log("Chat stream error.");
+    chatSocket.onclose = () => { chatSocket = null; };
+    return chatSocket;
+}
+
+function sendChat(payload) {
+    payload = { ...payload, session_id: SESSION_ID };
+    if (currentFaceScores && !payload.face_scores) payload.face_scores = currentFaceScores;
+    if (!window.WebSocket) {
+        // Old browsers: single-shot endpoint
+        fetch('/api/chat', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ text: text, emotion: currentEmotion })
-        });
+            headers: { 'Content-Type': 'application/json', 'Accept': AUDIO_ACCEPT },
+            body: JSON.stringify(payload)
+        })
+            .then(res => res.json())
+            .then(data => handleResponse(data))
+            .catch(err => {
+                console.error('Error sending message:', err);
+                addMessage("Error connecting to AURA.", 'aura');
+            });
+        return;
+    }
 
-        const data = await response.json();
-        handleResponse(data);
-    } catch (error) {
-        console.error('Error sending message:', error);
-        addMessage("Error connecting to AURA.", 'aura');
+    beginStreamTurn();
+    const socket = getChatSocket();
+    const send = () => socket.send(JSON.stringify(payload));
+    if (socket.readyState === WebSocket.OPEN) {
+        send();
+    } else {
+        socket.addEventListener('open', send, { once: true });
+    }
+}
+
+function stopPlayback() {
+    if (window.currentAudio) {
+        window.currentAudio.pause();
+        window.currentAudio = null;
+        stopFaceSync();
+        avatar.setTalking(false);
+    }
+}
+
+function beginStreamTurn() {
+    // A new turn replaces whatever is still playing. The server cancels the
+    // old turn too; its late messages (turn_id up to lastTurnId) are dropped
+    stopPlayback();
+    const lastTurnId = streamState ? Math.max(streamState.turnId || 0, streamState.lastTurnId) : 0;
+    streamState = { messageDiv: null, text: '', queue: [], playing: false, played: false, done: false, turnId: null, lastTurnId };
+}
+
+function handleStreamMessage(msg) {
+    const state = streamState;
+    if (!state) return;
+
+    if (msg.type === 'turn') {
+        // The newest turn wins, even if an older one announced itself first
+        if (msg.turn_id > Math.max(state.turnId || 0, state.lastTurnId)) {
+            if (state.turnId !== null) {
+                stopPlayback();
+                Object.assign(state, { text: '', queue: [], playing: false, played: false, done: false });
+                if (state.messageDiv) state.messageDiv.textContent = '';
+            }
+            state.turnId = msg.turn_id;
+        }
+        return;
+    }
+    if (msg.turn_id !== undefined && msg.turn_id !== state.turnId) return;
+
+    if (msg.type === 'cancelled') {
+        // Superseded by a turn from elsewhere (another tab, an upload)
+        log(`Turn ${msg.turn_id} cancelled.`);
+        state.queue = [];
+        state.done = true;
+        stopPlayback();
+        avatar.playAnimation('idle');
+    } else if (msg.type === 'error') {
+        log(`AURA: ${msg.detail}`);
+    } else if (msg.type === 'text') {
+        if (!state.messageDiv) state.messageDiv = addMessage('', 'aura');
+        state.text += msg.delta;
+        state.messageDiv.textContent = state.text;
+    } else if (msg.type === 'audio') {
+        state.queue.push(msg);
+        if (!state.playing) playNextChunk(state);
+    } else if (msg.type === 'done') {
+        state.done = true;
+        if (!state.messageDiv) addMessage(msg.text, 'aura');
+        playAnimations(msg.animations);
+        // Last chunk may have finished before 'done' arrived
+        if (state.played && !state.playing) onPlaybackFinished();
+    }
+}
+
+function playNextChunk(state) {
+    const chunk = state.queue.shift();
+    if (!chunk) {
+        state.playing = false;
+        if (state.done) onPlaybackFinished();
+        return;
+    }
+
+    state.playing = true;
+    state.played = true;
+    log(`Playing sentence ${chunk.index}: ${chunk.text}`);
+    const audio = new Audio(`data:audio/wav;base64,${chunk.audio}`);
+    window.currentAudio = audio;
+
+    audio.play().then(() => {
+        avatar.setTalking(true);
+        if (chunk.face_animation) startFaceSync(audio, chunk.face_animation);
+    }).catch(e => {
+        log(`Audio playback failed: ${e.message}`);
+    });
+
+    audio.onended = () => {
+        stopFaceSync();
+        // Ignore chunks of a turn that has been superseded
+        if (streamState === state) playNextChunk(state);
+    };
+}
+
+// Live microphone over /ws/audio: an AudioWorklet streams 16 kHz PCM and the
+// server finds the end of speech (~0.5 s of silence instead of the 2.5 s
+// below), transcribing while the user talks. The mic stays open between
+// turns and keeps sending while AURA speaks (the browser's echo
+// cancellation keeps her own voice out), so the user can interrupt her:
+// her voice is ducked when speech starts and the reply is cancelled once
+// the new utterance is transcribed. Browsers without AudioWorklet use the
+// MediaRecorder path below.
+const LIVE_MIC_SUPPORTED = !!(window.AudioWorkletNode && window.WebSocket);
+let liveMic = null;
+
+async function startLiveMic() {
+    log("Requesting microphone access...");
+    const stream = await navigator.mediaDevices.getUserMedia({
+        audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+    });
+    log("Microphone access granted (live stream).");
+
+    let context;
+    try {
+        context = new AudioContext({ sampleRate: 16000 });
+    } catch (e) {
+        // Some browsers refuse custom rates; the worklet downsamples instead
+        context = new AudioContext();
+    }
+    try {
+        await context.audioWorklet.addModule('/static/js/pcm-worklet.js');
+    } catch (e) {
+        stream.getTracks().forEach(track => track.stop());
+        context.close();
+        throw e;
+    }
+    const source = context.createMediaStreamSource(stream);
+    const node = new AudioWorkletNode(context, 'pcm-capture', { processorOptions: { targetRate: 16000 } });
+
+    const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${location.host}/ws/audio`);
+    socket.binaryType = 'arraybuffer';
+    socket.onopen = () => {
+        socket.send(JSON.stringify({ type: 'start', sample_rate: 16000, session_id: SESSION_ID, emotion: currentEmotion }));
+        log("Listening (live)...");
+    };
+    socket.onmessage = (event) => handleLiveMessage(JSON.parse(event.data));
+    socket.onerror = () => log("Live audio stream error.");
+    socket.onclose = () => {
+        if (liveMic && liveMic.socket === socket) stopLiveMic();
+    };
+
+    node.port.onmessage = (event) => {
+        if (socket.readyState === WebSocket.OPEN) socket.send(event.data);
+    };
+    source.connect(node);
+
+    liveMic = { stream, context, source, node, socket };
+    document.getElementById('mic-btn').classList.add('active');
+}
+
+function stopLiveMic() {
+    if (!liveMic) return;
+    const { stream, context, source, node, socket } = liveMic;
+    liveMic = null;
+    if (socket.readyState === WebSocket.OPEN) {
+        // Whatever was said so far still gets answered
+        socket.send(JSON.stringify({ type: 'stop' }));
+    }
+    source.disconnect();
+    node.port.onmessage = null;
+    stream.getTracks().forEach(track => track.stop());
+    context.close();
+    // Give the server a moment to answer the last utterance
+    setTimeout(() => socket.close(), 15000);
+
+    const micBtn = document.getElementById('mic-btn');
+    micBtn.classList.remove('active');
+    micBtn.classList.remove('speaking');
+    log("Microphone closed.");
+}
+
+function handleLiveMessage(msg) {
+    const micBtn = document.getElementById('mic-btn');
+    if (msg.type === 'vad') {
+        const speaking = msg.state === 'speech_start';
+        micBtn.classList.toggle('speaking', speaking);
+        // Barge-in: duck AURA while the user talks over her
+        if (window.currentAudio) window.currentAudio.volume = speaking ? 0.3 : 1.0;
+    } else if (msg.type === 'partial') {
+        log(`Hearing: ${msg.text}`);
+    } else if (msg.type === 'transcript') {
+        addMessage(`${msg.text} (${msg.emotion || currentEmotion})`, 'user');
+        beginStreamTurn();
+    } else if (msg.type === 'error' && msg.turn_id === undefined) {
+        log(`Live audio: ${msg.detail}`);
+    } else {
+        handleStreamMessage(msg);
     }
 }
 
@@ -192,6 +421,19 @@ let isSpeaking = false;
 let vadInterval;
 
 async function toggleMicrophone() {
+    if (liveMic) {
+        stopLiveMic();
+        return;
+    }
+    if (LIVE_MIC_SUPPORTED && !isRecording) {
+        try {
+            await startLiveMic();
+            return;
+        } catch (err) {
+            log(`Live microphone unavailable (${err.message}), falling back to recording.`);
+        }
+    }
+
     if (isRecording) {
         log("Manual stop requested. Sending audio...");
         stopRecording();
@@ -303,12 +545,15 @@ async function sendAudio() {
     const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
     const formData = new FormData();
     formData.append('file', audioBlob, 'input.wav');
+    formData.append('session_id', SESSION_ID);
+    formData.append('face_emotion', currentEmotion);
 
     // addMessage("🎤 Processing...", 'user'); 
 
     try {
         const response = await fetch('/api/audio', {
             method: 'POST',
+            headers: { 'Accept': AUDIO_ACCEPT },
             body: formData
         });
 
@@ -327,6 +572,8 @@ async function sendAudio() {
 }
 
 function handleResponse(data) {
+    // Superseded by a newer turn (409)
+    if (data.cancelled) return;
     addMessage(data.text, 'aura');
 
     // Play Audio
@@ -347,7 +594,7 @@ function handleResponse(data) {
 
             // Sync Face Animation
             if (data.face_animation) {
-                log(`Starting Face Animation (${data.face_animation.length} frames)`);
+                log(`Starting Face Animation (${data.face_animation.frames} frames)`);
                 startFaceSync(audio, data.face_animation);
             }
 
@@ -355,62 +602,94 @@ function handleResponse(data) {
             log(`Audio playback failed: ${e.message}`);
         });
 
-        audio.onended = () => {
-            avatar.setTalking(false);
-            stopFaceSync();
-            avatar.playAnimation('idle');
-            window.currentAudio = null;
-            // Loop functionality: If "Always On", maybe restart listening?
-            // For now, user has to click to start loop again or we can auto-restart.
-            // But strict "Google Meet" implies we stay listening.
-            // Let's AUTO-RESTART listening for "Always On" feel if the mic was active?
-            // Actually, best "Google Meet" UX is: Microphone stays open.
-            // But we stopped recording to send. So we should restart recording now.
-            // HOWEVER, playing audio while recording causes echo.
-            // So we restart recording AFTER audio finishes.
-            // Auto-restart listening loop (Google Meet style)
-            // Wait a moment before listening to avoid self-triggering from echo
-            setTimeout(() => {
-                log("Auto-restarting listener...");
-                toggleMicrophone(); // Changed from startRecording()
-            }, 500);
-        };
+        audio.onended = onPlaybackFinished;
     }
 
     // Animation based on emotion/keywords
     if (data.animations && data.animations.length > 0) {
-        // If it's just one and it's 'talk', we might want to ignore it if we handle lip sync separately
-        // But for now, let's play the sequence.
-        // If the sequence contains 'talk', we might want to skip it or handle it differently?
-        // Let's filter out 'talk' if we have other animations, or just play it.
-
-        const anims = data.animations.filter(a => a !== 'talk');
-
-        if (anims.length > 0) {
-            avatar.playSequence(anims, () => {
-                // Only return to idle if not talking
-                if (window.currentAudio && !window.currentAudio.paused) {
-                    // do nothing, let talk continue
-                } else {
-                    avatar.playAnimation('idle');
-                }
-            });
-        }
+        playAnimations(data.animations);
     } else if (data.animation && data.animation !== 'talk') {
         // Fallback for old API
         avatar.playAnimation(data.animation, true);
     }
 }
 
+function onPlaybackFinished() {
+    avatar.setTalking(false);
+    stopFaceSync();
+    avatar.playAnimation('idle');
+    window.currentAudio = null;
+    // Loop functionality: If "Always On", maybe restart listening?
+    // For now, user has to click to start loop again or we can auto-restart.
+    // But strict "Google Meet" implies we stay listening.
+    // Let's AUTO-RESTART listening for "Always On" feel if the mic was active?
+    // Actually, best "Google Meet" UX is: Microphone stays open.
+    // But we stopped recording to send. So we should restart recording now.
+    // HOWEVER, playing audio while recording causes echo.
+    // So we restart recording AFTER audio finishes.
+    // Auto-restart listening loop (Google Meet style)
+    // The live mic never stopped; it resumes sending on its own
+    if (liveMic) return;
+    // Wait a moment before listening to avoid self-triggering from echo
+    setTimeout(() => {
+        log("Auto-restarting listener...");
+        toggleMicrophone(); // Changed from startRecording()
+    }, 500);
+}
+
+function playAnimations(animations) {
+    if (!animations || animations.length === 0) return;
+
+    // If it's just one and it's 'talk', we might want to ignore it if we handle lip sync separately
+    // But for now, let's play the sequence.
+    // If the sequence contains 'talk', we might want to skip it or handle it differently?
+    // Let's filter out 'talk' if we have other animations, or just play it.
+
+    const anims = animations.filter(a => a !== 'talk');
+
+    if (anims.length > 0) {
+        avatar.playSequence(anims, () => {
+            // Only return to idle if not talking
+            if (window.currentAudio && !window.currentAudio.paused) {
+                // do nothing, let talk continue
+            } else {
+                avatar.playAnimation('idle');
+            }
+        });
+    }
+}
+
+// Decodes the compact face animation payload from the server
+// ({fps, frames, names, dtype, data: base64 little-endian typed array}).
+function decodeFaceAnimation(payload) {
+    const bytes = Uint8Array.from(atob(payload.data), c => c.charCodeAt(0));
+    let values;
+    if (payload.dtype === 'float16') {
+        const halves = new Uint16Array(bytes.buffer);
+        values = new Float32Array(halves.length);
+        for (let i = 0; i < halves.length; i++) values[i] = halfToFloat(halves[i]);
+    } else {
+        values = new Float32Array(bytes.buffer);
+    }
+    return { fps: payload.fps, frames: payload.frames, names: payload.names, values };
+}
+
+function halfToFloat(h) {
+    const sign = (h & 0x8000) ? -1 : 1;
+    const exponent = (h >> 10) & 0x1f;
+    const fraction = h & 0x3ff;
+    if (exponent === 0) return sign * Math.pow(2, -14) * (fraction / 1024);
+    if (exponent === 0x1f) return fraction ? NaN : sign * Infinity;
+    return sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+}
+
 let faceSyncInterval;
-function startFaceSync(audio, frames) {
+function startFaceSync(audio, payload) {
     if (faceSyncInterval) clearInterval(faceSyncInterval);
 
-    // Sort frames by time just in case
-    // frames.sort((a, b) => a.time - b.time);
-
-    // Use requestAnimationFrame for smoother look? 
-    // Or setInterval aligned to fps (e.g. 60fps = 16ms)
+    const anim = decodeFaceAnimation(payload);
+    const width = anim.names.length;
+    const blendshapes = {};
 
     faceSyncInterval = setInterval(() => {
         if (!audio || audio.paused || audio.ended) {
@@ -418,15 +697,13 @@ function startFaceSync(audio, frames) {
             return;
         }
 
-        const currentTime = audio.currentTime;
+        // Frames are evenly spaced, so the current one is a direct index
+        const frame = Math.floor(audio.currentTime * anim.fps);
+        if (frame >= anim.frames) return;
 
-        // Find the frame closest to current time
-        // Optimization: track last index to avoid full search
-        const frame = frames.find(f => Math.abs(f.time - currentTime) < 0.05); // 50ms window
-
-        if (frame) {
-            avatar.updateFace(frame.blendshapes);
-        }
+        const offset = frame * width;
+        for (let i = 0; i < width; i++) blendshapes[anim.names[i]] = anim.values[offset + i];
+        avatar.updateFace(blendshapes);
 
     }, 16); // ~60fps
 }
@@ -447,6 +724,7 @@ function addMessage(text, sender) {
     // Scroll to bottom
     const container = document.getElementById('chat-container');
     container.scrollTop = container.scrollHeight;
+    return msgDiv;
 }
 
 let cameraStream = null;
@@ -513,7 +791,11 @@ function startFaceDetection(video) {
                 // if (Math.random() < 0.1) log(`Face detected: ${dominant[0]} (${(dominant[1]*100).toFixed(0)}%)`);
 
                 if (dominant[1] > 0.2) { // Extremely low threshold for debugging
+                    if (dominant[0] !== currentEmotion && liveMic && liveMic.socket.readyState === WebSocket.OPEN) {
+                        liveMic.socket.send(JSON.stringify({ type: 'face', emotion: dominant[0] }));
+                    }
                     currentEmotion = dominant[0];
+                    currentFaceScores = Object.fromEntries(sorted);
                     statusSpan.textContent = currentEmotion.charAt(0).toUpperCase() + currentEmotion.slice(1) + ` (${(dominant[1] * 100).toFixed(0)}%)`;
                     statusSpan.style.color = "#00ff00";
 
@@ -562,14 +844,7 @@ function triggerEmotionReaction(emotion) {
     // Play sound or visual feedback?
     // For now just console log and send
 
-    fetch('/api/chat', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text: "", emotion: emotion, gesture: "none" })
-    })
-        .then(res => res.json())
-        .then(data => handleResponse(data))
-        .catch(err => console.error("Error triggering emotion:", err));
+    sendChat({ text: "", emotion: emotion, gesture: "none" });
 }
 
 function stopFaceDetection() {
@@ -0,0 +1,36 @@
+// Microphone capture for /ws/audio: converts the input to 16-bit mono PCM
+// at 16 kHz (downsampling if the AudioContext runs at another rate) and
+// posts ~40 ms chunks to the main thread as transferable ArrayBuffers.
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        this.targetRate = (options.processorOptions && options.processorOptions.targetRate) || 16000;
+        this.step = sampleRate / this.targetRate;
+        this.position = 0;
+        this.chunk = new Int16Array(Math.round(this.targetRate * 0.04));
+        this.filled = 0;
+    }
+
+    process(inputs) {
+        const input = inputs[0];
+        if (!input || input.length === 0) return true;
+        const channel = input[0];
+
+        // Decimation by picking the nearest earlier sample; step is 1 when
+        // the context already runs at 16 kHz
+        while (this.position < channel.length) {
+            const sample = channel[Math.floor(this.position)];
+            this.chunk[this.filled++] = Math.max(-1, Math.min(1, sample)) * 0x7fff;
+            if (this.filled === this.chunk.length) {
+                this.port.postMessage(this.chunk.buffer, [this.chunk.buffer]);
+                this.chunk = new Int16Array(this.chunk.length);
+                this.filled = 0;
+            }
+            this.position += this.step;
+        }
+        this.position -= channel.length;
+        return true;
+    }
+}
+
+registerProcessor('pcm-capture', PcmCaptureProcessor);